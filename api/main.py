@@ -1,14 +1,31 @@
 import logging
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.routers import health, market_data, llm
+from app.services.prefetch import prefetcher
 from app.settings import settings
+from app.sources import http as upstream_http
 
 
-app = FastAPI(title="liquidity-pulse API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared keep-alive pools for upstream data sources
+    await upstream_http.open_clients()
+    # Refresh series right after their scheduled upstream releases
+    if settings.prefetch_enabled:
+        prefetcher.start()
+    try:
+        yield
+    finally:
+        await prefetcher.stop()
+        await upstream_http.close_clients()
+
+
+app = FastAPI(title="liquidity-pulse API", version="0.1.0", lifespan=lifespan)
 
 # CORS
 _cors_origins = [
@@ -1,13 +1,16 @@
 """Live market data endpoints - fetch directly from source APIs, no database."""
 from __future__ import annotations
 
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional
 import traceback
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
-from app.sources import treasury
-from app.services import market_data, cache
+from app.sources import treasury, upstream
+from app.sources import http as upstream_http
+from app.services import market_data, cache, rolling
+from app.services.materialized import indicator_store
+from app.services.prefetch import prefetcher
 
 router = APIRouter(prefix="/live", tags=["live"])
 
@@ -25,19 +28,34 @@ def list_series() -> List[Dict[str, Any]]:
 
 @router.get("/cache/stats")
 def cache_stats() -> Dict[str, Any]:
-    """Return cache statistics for both L1 (memory) and L2 (CSV) caches."""
+    """Return cache statistics for both L1 (memory) and L2 (series store) caches."""
     return {
         "memory": cache.memory_cache.stats(),
-        "csv": cache.csv_cache.stats()
+        "series": cache.series_cache.stats(),
+        "datasets": cache.dataset_cache.stats(),
+        "singleflight": market_data.series_flight.stats(),
+        "prefetch": prefetcher.stats(),
+        "indicators": indicator_store.stats(),
+    }
+
+
+@router.get("/upstream/stats")
+def upstream_stats() -> Dict[str, Any]:
+    """Return per-host upstream scheduler state (queue depth, waits, retries, breaker)."""
+    return {
+        "hosts": upstream.stats(),
+        "pool": upstream_http.stats(),
     }
 
 
 @router.post("/cache/clear")
 def cache_clear() -> Dict[str, Any]:
-    """Clear all cached data (both memory and CSV)."""
+    """Clear all cached data (both memory and series store)."""
     cache.memory_cache.clear()
-    csv_count = cache.csv_cache.clear()
-    return {"status": "cleared", "csv_files_deleted": csv_count}
+    cache.dataset_cache.clear()
+    indicator_store.clear()
+    series_count = cache.series_cache.clear()
+    return {"status": "cleared", "series_deleted": series_count}
 
 
 @router.get("/debug/tga")
@@ -77,10 +95,18 @@ async def get_series(series_id: str, days: int = 180) -> Dict[str, Any]:
 
 
 @router.get("/indicators/{indicator_id}")
-async def get_indicator_live(indicator_id: str, days: int = 180) -> Dict[str, Any]:
+async def get_indicator_live(
+    indicator_id: str,
+    days: int = 180,
+    with_: Optional[str] = Query(None, alias="with", description="Rolling statistics to add, e.g. z20,pctrank60"),
+) -> Dict[str, Any]:
     """Fetch live data for an indicator and compute its value."""
     try:
-        return await market_data.get_indicator_live(indicator_id, days)
+        extras = rolling.parse_specs(with_.split(",")) if with_ else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await market_data.get_indicator_live(indicator_id, days, extras=[token for token, _, _ in extras])
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
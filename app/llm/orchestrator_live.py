@@ -3,7 +3,6 @@ from __future__ import annotations
 import asyncio
 import json
 import math
-import statistics
 import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional, AsyncGenerator
@@ -12,7 +11,7 @@ from app.settings import settings
 from app.llm.providers import get_provider
 from app.llm.prompts import build_brief_prompt, build_agent_system_prompt, build_agent_step_prompt
 from app.llm.context import build_brief_context
-from app.services import market_data
+from app.services import market_data, rolling
 
 # -----------------------------------------------------------------------------
 # Z-Score Helper
@@ -24,14 +23,12 @@ def compute_z_score(values: List[float], window: int = 20) -> Optional[float]:
     if len(recent) < 2:
         return None
     try:
-        avg = statistics.mean(recent)
-        stdev = statistics.stdev(recent)
-        if stdev == 0:
-            return 0.0
-        current = recent[-1]
-        return (current - avg) / stdev
+        point = rolling.latest(recent, len(recent))
     except Exception:
         return None
+    if point.std == 0:
+        return 0.0
+    return point.z
 
 # -----------------------------------------------------------------------------
 # Data Fetching (Live)
@@ -44,18 +41,17 @@ async def fetch_snapshot_data(horizon: str = "1w") -> Dict[str, Any]:
     # 1. List all indicators
     indicators_meta = market_data.list_indicators()
     
-    # 2. Fetch data for each (parallel)
+    # 2. Fetch data for all of them from one plan (each series loaded once, in parallel)
     # Filter to 'core' or 'key' indicators to save time/tokens? 
     # For now, fetch all but maybe limit history length.
-    tasks = []
-    for ind in indicators_meta:
-        tasks.append(market_data.get_indicator_live(ind["id"], days=60))  # need enough for z-score
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await market_data.get_indicators_live(
+        [ind["id"] for ind in indicators_meta], days=60  # need enough for z-score
+    )
     
     indicator_data = []
-    for meta, res in zip(indicators_meta, results):
-        if isinstance(res, Exception):
+    for meta in indicators_meta:
+        res = results.get(meta["id"])
+        if res is None or isinstance(res, Exception):
             continue
         
         items = res.get("items", [])
@@ -1,12 +1,61 @@
 import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
 import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List, Dict, Optional, Tuple
+from typing import IO, Any, Callable, List, Dict, Iterator, Optional, Tuple, Union
 
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+import numpy as np
+
+from app.registry_loader import SERIES_REGISTRY
+from app.services import releases
+from app.services.timeseries import DATE_DTYPE, VALUE_DTYPE, TimeSeries, iso, to_ordinal
 from app.settings import settings
 
-class CSVCache:
-    """File-based CSV cache for series data (L2 Cache)."""
+SeriesData = Union[TimeSeries, List[Dict[str, Any]]]
+
+
+def _as_series(data: SeriesData) -> TimeSeries:
+    return data if isinstance(data, TimeSeries) else TimeSeries.from_items(data)
+
+
+def _replace_atomically(path: Path, write: Callable[[IO[bytes]], None]) -> None:
+    """Write a temp file next to `path`, fsync it and rename it over `path`.
+    
+    Readers see either the old or the new file, never a truncated one.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class SeriesCache:
+    """Base class for file-based series stores (L2 Cache).
+    
+    Subclasses define the on-disk format (`read`, `write`, `append`); freshness
+    (file mtime + release schedule), sidecar metadata and merging are shared.
+    """
+    
+    backend = ""
+    suffixes: Tuple[str, ...] = ()  # first one is the primary file (mtime = fetched_at)
     
     def __init__(self, cache_dir: str, ttl_seconds: int = 3600):
         self._cache_dir = Path(cache_dir) / "series"
@@ -14,122 +63,842 @@ class CSVCache:
         self._cache_dir.mkdir(parents=True, exist_ok=True)
     
     def _get_path(self, series_id: str) -> Path:
-        return self._cache_dir / f"{series_id.upper()}.csv"
+        return self._cache_dir / f"{series_id.upper()}{self.suffixes[0]}"
     
-    def is_valid(self, series_id: str) -> bool:
-        """Check if cache file exists and is fresh."""
-        if settings.cache_disabled:
-            return False
-        path = self._get_path(series_id)
-        if not path.exists():
-            return False
-        age = time.time() - path.stat().st_mtime
-        return age < self._ttl
+    def _get_meta_path(self, series_id: str) -> Path:
+        return self._cache_dir / f"{series_id.upper()}.meta.json"
     
-    def read(self, series_id: str) -> Optional[List[Dict[str, Any]]]:
-        """Read cached data from CSV file."""
+    def get_meta(self, series_id: str) -> Dict[str, Any]:
+        """Read sidecar metadata (e.g. HTTP validators) stored next to the series."""
         if settings.cache_disabled:
-            return None
-        path = self._get_path(series_id)
+            return {}
+        path = self._get_meta_path(series_id)
         if not path.exists():
-            return None
-        
+            return {}
         try:
-            items = []
-            with open(path, "r", newline="") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    items.append({
-                        "date": row["date"],
-                        "value": float(row["value"])
-                    })
-            return items
+            with open(path, "r") as f:
+                return json.load(f) or {}
         except Exception:
-            return None
+            return {}
     
-    def write(self, series_id: str, items: List[Dict[str, Any]]) -> None:
-        """Write data to CSV file."""
+    def set_meta(self, series_id: str, meta: Dict[str, Any]) -> None:
+        """Write sidecar metadata for a cached series."""
         if settings.cache_disabled:
             return
-        path = self._get_path(series_id)
+        body = json.dumps(meta).encode()
         try:
-            with open(path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=["date", "value"])
-                writer.writeheader()
-                for item in items:
-                    writer.writerow({"date": item["date"], "value": item["value"]})
+            _replace_atomically(self._get_meta_path(series_id), lambda f: f.write(body))
         except Exception:
             pass  # Silently fail on write errors
     
+    def _fetched_at(self, series_id: str) -> Optional[float]:
+        """Epoch time the series was last written or revalidated (file mtime)."""
+        path = self._get_path(series_id)
+        if not path.exists():
+            return None
+        return path.stat().st_mtime
+    
+    def _set_fetched_at(self, series_id: str, fetched_at: float) -> None:
+        path = self._get_path(series_id)
+        if path.exists():
+            os.utime(path, (fetched_at, fetched_at))
+    
+    def expires_at(self, series_id: str) -> Optional[float]:
+        """Epoch time the cached series expires (next expected release, else TTL)."""
+        if settings.cache_disabled:
+            return None
+        fetched = self._fetched_at(series_id)
+        if fetched is None:
+            return None
+        return releases.expires_at(series_id, fetched, self._ttl)
+    
+    def is_valid(self, series_id: str) -> bool:
+        """Check if the cached series exists and is fresh."""
+        expires = self.expires_at(series_id)
+        return expires is not None and time.time() < expires
+    
+    def stale_seconds(self, series_id: str) -> Optional[float]:
+        """Seconds the cached series is past its expiry (negative while fresh)."""
+        expires = self.expires_at(series_id)
+        return None if expires is None else time.time() - expires
+    
+    def read_series(self, series_id: str, start: Optional[str] = None) -> Optional[TimeSeries]:
+        """Read the cached series, optionally only points dated `start` or later."""
+        raise NotImplementedError
+    
+    def read(self, series_id: str, start: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Read cached rows as `{"date", "value"}` dicts."""
+        ts = self.read_series(series_id, start)
+        return None if ts is None else ts.to_items()
+    
+    def first_date(self, series_id: str) -> Optional[str]:
+        """Earliest stored date (None when nothing is stored)."""
+        ts = self.read_series(series_id)
+        return ts.first_date if ts is not None else None
+    
+    def last_date(self, series_id: str) -> Optional[str]:
+        """Latest stored date (None when nothing is stored)."""
+        ts = self.read_series(series_id)
+        return ts.last_date if ts is not None else None
+    
+    @contextmanager
+    def _locked(self, series_id: str) -> Iterator[None]:
+        """Exclusive per-series lock, shared across worker processes (flock on SID.lock)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._cache_dir / f"{series_id.upper()}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def _write(self, series_id: str, ts: TimeSeries) -> None:
+        raise NotImplementedError
+    
+    def _append(self, series_id: str, ts: TimeSeries) -> None:
+        raise NotImplementedError
+    
+    def write(self, series_id: str, data: SeriesData) -> None:
+        """Replace the stored series atomically (temp file + rename)."""
+        if settings.cache_disabled:
+            return
+        with self._locked(series_id):
+            self._write(series_id, _as_series(data))
+    
+    def append(self, series_id: str, data: SeriesData) -> None:
+        """Append points newer than the stored tail (caller guarantees the order)."""
+        if settings.cache_disabled:
+            return
+        with self._locked(series_id):
+            self._append(series_id, _as_series(data))
+    
+    def merge(
+        self,
+        series_id: str,
+        data: SeriesData,
+        existing: Optional[TimeSeries] = None,
+    ) -> TimeSeries:
+        """Merge fetched points into the stored series and return the merged history.
+        
+        Points newer than the stored tail are appended; the file is only rewritten
+        when the fetch revises or back-fills older dates. `existing` (the caller's
+        earlier read, possibly only a recent window of the store) is re-read only
+        if another writer moved the tail since, and read in full before a rewrite.
+        The result starts where `existing` does, or at the first stored point
+        after a rewrite.
+        """
+        new = _as_series(data)
+        if settings.cache_disabled:
+            return new
+        with self._locked(series_id):
+            if existing is None or existing.last_date != self.last_date(series_id):
+                start = existing.first_date if existing is not None else None
+                existing = self.read_series(series_id, start) or TimeSeries.empty()
+            return self._merge_locked(series_id, new, existing)
+    
+    def _merge_locked(self, series_id: str, new: TimeSeries, existing: TimeSeries) -> TimeSeries:
+        if len(existing) and len(new):
+            tail = existing.dates[-1]
+            overlap = new.dates <= tail
+            if overlap.any():
+                pos = np.searchsorted(existing.dates, new.dates[overlap])
+                pos_clipped = np.minimum(pos, len(existing) - 1)
+                known = existing.dates[pos_clipped] == new.dates[overlap]
+                revised = not known.all() or not np.array_equal(existing.values[pos_clipped], new.values[overlap])
+            else:
+                revised = False
+            if not revised:
+                appended = new.after(int(tail))
+                if len(appended):
+                    self._append(series_id, appended)
+                else:
+                    # Nothing new; still mark the file as refreshed
+                    self.touch(series_id)
+                return existing.concat(appended)
+        elif len(existing):
+            self.touch(series_id)
+            return existing
+        if existing.first_date != self.first_date(series_id):
+            # A windowed read: the rewrite must keep the older points
+            existing = self.read_series(series_id) or TimeSeries.empty()
+        # Combine: existing + new (dedupe by date, prefer new)
+        merged = existing.upsert(new)
+        self._write(series_id, merged)
+        return merged
+    
+    def touch(self, series_id: str) -> None:
+        """Mark a cached series as freshly validated without rewriting it."""
+        if settings.cache_disabled:
+            return
+        self._set_fetched_at(series_id, time.time())
+    
+    def migrate_from(self, source: "SeriesCache") -> int:
+        """One-shot import of series from another store (e.g. the CSV files).
+        
+        Series already present here are skipped; the source fetch time is kept
+        so freshness carries over. Returns the number of series migrated.
+        """
+        present = set(self._series_ids())
+        count = 0
+        for sid in source._series_ids():
+            if sid in present:
+                continue
+            ts = source.read_series(sid)
+            fetched = source._fetched_at(sid)
+            if ts is None or fetched is None:
+                continue
+            self.write(sid, ts)
+            self._set_fetched_at(sid, fetched)
+            count += 1
+        return count
+    
+    def _series_ids(self) -> List[str]:
+        suffix = self.suffixes[0]
+        return sorted(p.name[: -len(suffix)] for p in self._cache_dir.glob(f"*{suffix}"))
+    
     def clear(self, series_id: Optional[str] = None) -> int:
         """Clear cache files. If series_id is None, clear all."""
+        series_ids = [series_id.upper()] if series_id else self._series_ids()
         count = 0
-        if series_id:
-            path = self._get_path(series_id)
-            if path.exists():
-                path.unlink()
-                count = 1
-        else:
-            for path in self._cache_dir.glob("*.csv"):
-                path.unlink()
+        for sid in series_ids:
+            if self._get_path(sid).exists():
                 count += 1
+            for suffix in self.suffixes:
+                (self._cache_dir / f"{sid}{suffix}").unlink(missing_ok=True)
+            self._get_meta_path(sid).unlink(missing_ok=True)
+            (self._cache_dir / f"{sid}.lock").unlink(missing_ok=True)
+        if not series_id:
+            for path in self._cache_dir.glob("*.meta.json"):
+                path.unlink()
         return count
     
+    def _size_bytes(self) -> int:
+        return sum(
+            path.stat().st_size
+            for suffix in self.suffixes
+            for path in self._cache_dir.glob(f"*{suffix}")
+        )
+    
     def stats(self) -> Dict[str, Any]:
         """Return cache statistics."""
-        files = list(self._cache_dir.glob("*.csv"))
         now = time.time()
-        valid = sum(1 for f in files if now - f.stat().st_mtime < self._ttl)
-        total_size = sum(f.stat().st_size for f in files)
+        series = {}
+        for sid in self._series_ids():
+            fetched = self._fetched_at(sid)
+            if fetched is None:
+                continue
+            expires = releases.expires_at(sid, fetched, self._ttl)
+            series[sid] = {
+                "fetched_at": datetime.fromtimestamp(fetched, timezone.utc).isoformat(),
+                "next_refresh": datetime.fromtimestamp(expires, timezone.utc).isoformat(),
+                "fresh": now < expires,
+            }
         return {
-            "total_files": len(files),
-            "valid_files": valid,
-            "total_size_bytes": total_size,
+            "backend": self.backend,
+            "total_files": len(series),
+            "valid_files": sum(1 for s in series.values() if s["fresh"]),
+            "total_size_bytes": self._size_bytes(),
             "ttl_seconds": self._ttl,
             "cache_dir": str(self._cache_dir),
-            "disabled": settings.cache_disabled
+            "disabled": settings.cache_disabled,
+            "series": series,
         }
 
 
+class CSVCache(SeriesCache):
+    """Series stored as `date,value` CSV text files."""
+    
+    backend = "csv"
+    suffixes = (".csv",)
+    
+    def read_series(self, series_id: str, start: Optional[str] = None) -> Optional[TimeSeries]:
+        """Read cached data from CSV file.
+        
+        Malformed rows (e.g. a torn last line after a crash mid-append) are
+        skipped and reported rather than discarding the whole file.
+        """
+        if settings.cache_disabled:
+            return None
+        path = self._get_path(series_id)
+        if not path.exists():
+            return None
+        
+        dates: List[int] = []
+        values: List[float] = []
+        skipped = 0
+        try:
+            with open(path, "r", newline="") as f:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                for row in reader:
+                    try:
+                        if start is not None and row[0] < start:
+                            continue
+                        ordinal = to_ordinal(row[0])
+                        value = float(row[1])
+                    except (IndexError, TypeError, ValueError):
+                        skipped += 1
+                        continue
+                    dates.append(ordinal)
+                    values.append(value)
+        except (OSError, csv.Error) as e:
+            print(f"[WARN] Failed to read cached {series_id}: {e}")
+            return None
+        if skipped:
+            print(f"[WARN] Skipped {skipped} malformed rows in cached {series_id}")
+        return TimeSeries(np.array(dates, DATE_DTYPE), np.array(values, VALUE_DTYPE))
+    
+    def first_date(self, series_id: str) -> Optional[str]:
+        """Date of the first complete row, read from the start of the file."""
+        path = self._get_path(series_id)
+        if settings.cache_disabled or not path.exists():
+            return None
+        with open(path, "r", newline="") as f:
+            next(f, None)  # header
+            for line in f:
+                head = line.split(",", 1)[0].strip()
+                if len(head) == 10 and head[4] == "-" and "," in line:
+                    return head
+        return None
+    
+    def last_date(self, series_id: str) -> Optional[str]:
+        """Date of the last complete row, read from the end of the file."""
+        path = self._get_path(series_id)
+        if settings.cache_disabled or not path.exists():
+            return None
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            lines = f.read().decode("utf-8", "replace").split("\n")
+        for line in reversed(lines[1:] if size > 4096 else lines):
+            head = line.split(",", 1)[0].strip()
+            if len(head) == 10 and head[4] == "-" and "," in line:
+                return head
+        return None
+    
+    @staticmethod
+    def _rows(ts: TimeSeries) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf).writerows(ts)
+        return buf.getvalue().encode()
+    
+    def _write(self, series_id: str, ts: TimeSeries) -> None:
+        """Write data to CSV file."""
+        body = b"date,value\r\n" + self._rows(ts)
+        try:
+            _replace_atomically(self._get_path(series_id), lambda f: f.write(body))
+        except OSError as e:
+            print(f"[WARN] Failed to write cached {series_id}: {e}")
+    
+    def _append(self, series_id: str, ts: TimeSeries) -> None:
+        """Append rows to an existing CSV file (caller guarantees they are newer)."""
+        path = self._get_path(series_id)
+        try:
+            with open(path, "r+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    # Drop a torn partial row left by an interrupted append
+                    f.seek(max(0, size - 4096))
+                    tail = f.read()
+                    if not tail.endswith(b"\n"):
+                        f.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+                        f.seek(0, os.SEEK_END)
+                f.write(self._rows(ts))
+        except OSError as e:
+            print(f"[WARN] Failed to append to cached {series_id}: {e}")
+
+
+class BinarySeriesCache(SeriesCache):
+    """Series stored as fixed-width records in `SID.bin`: an int32 day ordinal and a
+    float64 value per row (12 bytes, packed).
+    
+    Reads memory-map the file and binary-search its (strided) date column, so a
+    window read only touches the rows it returns. Keeping both columns in one
+    file means a rewrite is a single atomic rename and a torn append loses at
+    most a partial trailing record, so dates and values can never be paired
+    from different versions.
+    """
+    
+    backend = "binary"
+    suffixes = (".bin",)
+    
+    ROW_DTYPE = np.dtype([("date", DATE_DTYPE), ("value", VALUE_DTYPE)])
+    
+    def read_arrays(self, series_id: str, start: Optional[str] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Memory-mapped (dates, values) columns, sliced to `start` or later."""
+        if settings.cache_disabled:
+            return None
+        path = self._get_path(series_id)
+        if not path.exists():
+            return None
+        try:
+            # Whole records only: a trailing partial one is an interrupted append
+            n = path.stat().st_size // self.ROW_DTYPE.itemsize
+            if n == 0:
+                return np.empty(0, DATE_DTYPE), np.empty(0, VALUE_DTYPE)
+            rows = np.memmap(path, dtype=self.ROW_DTYPE, mode="r", shape=(n,))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Failed to map cached {series_id}: {e}")
+            return None
+        dates, values = rows["date"], rows["value"]
+        lo = 0
+        if start is not None:
+            lo = int(np.searchsorted(dates, to_ordinal(start), side="left"))
+        return dates[lo:], values[lo:]
+    
+    def read_series(self, series_id: str, start: Optional[str] = None) -> Optional[TimeSeries]:
+        """Copy of the mapped window (the mapping may be replaced by a later write)."""
+        arrays = self.read_arrays(series_id, start)
+        if arrays is None:
+            return None
+        dates, values = arrays
+        return TimeSeries(np.array(dates), np.array(values))
+    
+    def _rows(self, ts: TimeSeries) -> np.ndarray:
+        rows = np.empty(len(ts), self.ROW_DTYPE)
+        rows["date"], rows["value"] = ts.dates, ts.values
+        return rows
+    
+    def first_date(self, series_id: str) -> Optional[str]:
+        arrays = self.read_arrays(series_id)
+        if arrays is None or not len(arrays[0]):
+            return None
+        return iso(arrays[0][0])
+    
+    def last_date(self, series_id: str) -> Optional[str]:
+        arrays = self.read_arrays(series_id)
+        if arrays is None or not len(arrays[0]):
+            return None
+        return iso(arrays[0][-1])
+    
+    def _write(self, series_id: str, ts: TimeSeries) -> None:
+        body = self._rows(ts).tobytes()
+        try:
+            _replace_atomically(self._get_path(series_id), lambda f: f.write(body))
+        except OSError as e:
+            print(f"[WARN] Failed to write cached {series_id}: {e}")
+    
+    def _append(self, series_id: str, ts: TimeSeries) -> None:
+        """Append records (caller guarantees they are newer)."""
+        path = self._get_path(series_id)
+        try:
+            with open(path, "ab") as f:
+                # Drop a partial record left by an interrupted append
+                size = f.seek(0, os.SEEK_END)
+                f.truncate(size - size % self.ROW_DTYPE.itemsize)
+                f.write(self._rows(ts).tobytes())
+        except OSError as e:
+            print(f"[WARN] Failed to append to cached {series_id}: {e}")
+
+
+class SQLiteSeriesCache(SeriesCache):
+    """Series stored in one SQLite database (WAL mode) shared by all workers.
+    
+    Observations are keyed by (series_id, date); merges are upserts and window
+    reads are range SELECTs on that key. Fetch time, validators, source and
+    history coverage live in the `series_meta` table instead of file mtimes and
+    sidecar JSON.
+    """
+    
+    backend = "sqlite"
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS observations (
+            series_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (series_id, date)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS series_meta (
+            series_id TEXT PRIMARY KEY,
+            fetched_at REAL NOT NULL,
+            source TEXT,
+            validators TEXT,
+            covered_from TEXT
+        );
+    """
+    
+    def __init__(self, cache_dir: str, ttl_seconds: int = 3600):
+        super().__init__(cache_dir, ttl_seconds)
+        self._db_path = self._cache_dir / "series.sqlite3"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(series_meta)")}
+        if "covered_from" not in columns:
+            self._conn.execute("ALTER TABLE series_meta ADD COLUMN covered_from TEXT")
+    
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def _fetched_at(self, series_id: str) -> Optional[float]:
+        rows = self._query("SELECT fetched_at FROM series_meta WHERE series_id = ?", (series_id.upper(),))
+        return rows[0][0] if rows else None
+    
+    def _set_fetched_at(self, series_id: str, fetched_at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE series_meta SET fetched_at = ? WHERE series_id = ?",
+                (fetched_at, series_id.upper()),
+            )
+    
+    def _mark_fetched(self, series_id: str) -> None:
+        """Record a write (caller holds the lock inside a transaction)."""
+        sid = series_id.upper()
+        self._conn.execute(
+            "INSERT INTO series_meta (series_id, fetched_at, source) VALUES (?, ?, ?) "
+            "ON CONFLICT(series_id) DO UPDATE SET fetched_at = excluded.fetched_at, source = excluded.source",
+            (sid, time.time(), SERIES_REGISTRY.get(sid, {}).get("source")),
+        )
+    
+    def get_meta(self, series_id: str) -> Dict[str, Any]:
+        if settings.cache_disabled:
+            return {}
+        rows = self._query(
+            "SELECT source, validators, covered_from FROM series_meta WHERE series_id = ?",
+            (series_id.upper(),),
+        )
+        if not rows:
+            return {}
+        source, validators, covered_from = rows[0]
+        meta: Dict[str, Any] = {}
+        if source:
+            meta["source"] = source
+        if validators:
+            meta["validators"] = json.loads(validators)
+        if covered_from:
+            meta["covered_from"] = covered_from
+        return meta
+    
+    def set_meta(self, series_id: str, meta: Dict[str, Any]) -> None:
+        if settings.cache_disabled:
+            return
+        validators = meta.get("validators")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE series_meta SET validators = ?, source = COALESCE(?, source), covered_from = ? "
+                "WHERE series_id = ?",
+                (json.dumps(validators) if validators else None, meta.get("source"), meta.get("covered_from"), series_id.upper()),
+            )
+    
+    def read_series(self, series_id: str, start: Optional[str] = None) -> Optional[TimeSeries]:
+        if settings.cache_disabled:
+            return None
+        sid = series_id.upper()
+        rows = self._query(
+            "SELECT date, value FROM observations WHERE series_id = ? AND date >= ? ORDER BY date",
+            (sid, start or ""),
+        )
+        if not rows and self._fetched_at(sid) is None:
+            return None
+        return TimeSeries.from_pairs(rows, sort=False)
+    
+    def first_date(self, series_id: str) -> Optional[str]:
+        rows = self._query("SELECT MIN(date) FROM observations WHERE series_id = ?", (series_id.upper(),))
+        return rows[0][0] if rows else None
+    
+    def _upsert(self, series_id: str, ts: TimeSeries) -> None:
+        sid = series_id.upper()
+        self._conn.executemany(
+            "INSERT INTO observations (series_id, date, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(series_id, date) DO UPDATE SET value = excluded.value",
+            [(sid, d, v) for d, v in ts],
+        )
+        self._mark_fetched(sid)
+    
+    def write(self, series_id: str, data: SeriesData) -> None:
+        """Replace the stored series with `data`."""
+        if settings.cache_disabled:
+            return
+        ts = _as_series(data)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM observations WHERE series_id = ?", (series_id.upper(),))
+            self._upsert(series_id, ts)
+    
+    def append(self, series_id: str, data: SeriesData) -> None:
+        if settings.cache_disabled:
+            return
+        ts = _as_series(data)
+        with self._lock, self._conn:
+            self._upsert(series_id, ts)
+    
+    def merge(
+        self,
+        series_id: str,
+        data: SeriesData,
+        existing: Optional[TimeSeries] = None,
+    ) -> TimeSeries:
+        """Upsert fetched rows (revisions overwrite by date) and return the history from `existing` on."""
+        new = _as_series(data)
+        if settings.cache_disabled:
+            return new
+        with self._lock, self._conn:
+            self._upsert(series_id, new)
+        start = existing.first_date if existing is not None else None
+        return self.read_series(series_id, start) or TimeSeries.empty()
+    
+    def _series_ids(self) -> List[str]:
+        return [r[0] for r in self._query("SELECT series_id FROM series_meta ORDER BY series_id")]
+    
+    def _size_bytes(self) -> int:
+        return sum(
+            path.stat().st_size
+            for path in self._cache_dir.glob("series.sqlite3*")
+        )
+    
+    def clear(self, series_id: Optional[str] = None) -> int:
+        """Delete stored series. If series_id is None, clear all."""
+        with self._lock, self._conn:
+            if series_id:
+                params: Tuple = (series_id.upper(),)
+                where = " WHERE series_id = ?"
+            else:
+                params, where = (), ""
+            self._conn.execute(f"DELETE FROM observations{where}", params)
+            return self._conn.execute(f"DELETE FROM series_meta{where}", params).rowcount
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _make_series_cache() -> SeriesCache:
+    """Build the L2 store selected by `settings.cache_backend`."""
+    backends = {"binary": BinarySeriesCache, "sqlite": SQLiteSeriesCache}
+    csv_store = CSVCache(cache_dir=settings.cache_dir, ttl_seconds=settings.cache_ttl_seconds)
+    backend = backends.get(settings.cache_backend)
+    if backend is None:
+        return csv_store
+    store = backend(cache_dir=settings.cache_dir, ttl_seconds=settings.cache_ttl_seconds)
+    migrated = store.migrate_from(csv_store)
+    if migrated:
+        print(f"[DEBUG] Migrated {migrated} CSV series to the {store.backend} store")
+    return store
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of cached values (containers, strings, numbers, arrays)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value)
+    if isinstance(value, TimeSeries):
+        return value.nbytes + sys.getsizeof(value)
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        return size + sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return size + sum(approx_size(v, _depth + 1) for v in value)
+    return size
+
+
 class TTLCache:
-    """Simple in-memory cache with TTL expiration (L1 Cache)."""
+    """In-memory cache with TTL expiration (L1 Cache), bounded by entry count and bytes.
     
-    def __init__(self, ttl_seconds: int = 3600):
-        self._cache: Dict[str, Tuple[float, Any]] = {}
+    Entries expire after the TTL unless `set` is given an explicit expiry
+    (series use their next expected release, see `releases.expires_at`).
+    When either bound is exceeded the least recently used entries are evicted,
+    and entries past the max staleness are swept every `sweep_interval` seconds.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        max_entries: int = 256,
+        max_bytes: int = 256 * 1024 * 1024,
+        sweep_interval: float = 300.0,
+    ):
+        # key -> (stored_at, expires_at, value, approx_bytes); order = recency
+        self._cache: "OrderedDict[str, Tuple[float, float, Any, int]]" = OrderedDict()
         self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self._bytes = 0
+        # key -> [hits, misses], kept for recently seen keys only
+        self._counters: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.evictions = 0
+        self.swept = 0
+    
+    def _count(self, key: str, hit: bool) -> None:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [0, 0]
+            if len(self._counters) > 4 * self._max_entries:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+        counter[0 if hit else 1] += 1
+    
+    def _drop(self, key: str) -> None:
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+    
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        self._last_sweep = now
+        limit = settings.cache_max_staleness_seconds
+        for key in [k for k, e in self._cache.items() if now - e[1] > limit]:
+            self._drop(key)
+            self.swept += 1
     
     def get(self, key: str) -> Optional[Any]:
         if settings.cache_disabled:
             return None
+        now = time.time()
+        self._maybe_sweep(now)
         entry = self._cache.get(key)
         if entry is None:
+            self._count(key, hit=False)
             return None
-        timestamp, value = entry
-        if time.time() - timestamp > self._ttl:
-            del self._cache[key]
+        _, expires, value, _ = entry
+        overdue = now - expires
+        if overdue > 0:
+            # Expired entries are kept for stale-while-revalidate up to the max staleness
+            if overdue > settings.cache_max_staleness_seconds:
+                self._drop(key)
+            self._count(key, hit=False)
             return None
+        self._cache.move_to_end(key)
+        self._count(key, hit=True)
         return value
     
-    def set(self, key: str, value: Any) -> None:
+    def get_stale(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, seconds past expiry) for an entry regardless of expiry."""
+        if settings.cache_disabled:
+            return None
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        _, expires, value, _ = entry
+        return value, time.time() - expires
+    
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None) -> None:
         if settings.cache_disabled:
             return
-        self._cache[key] = (time.time(), value)
+        now = time.time()
+        size = approx_size(value)
+        self._drop(key)
+        if size > self._max_bytes:
+            return  # Larger than the whole cache: not worth evicting everything else
+        self._cache[key] = (now, expires_at if expires_at is not None else now + self._ttl, value, size)
+        self._bytes += size
+        while len(self._cache) > self._max_entries or self._bytes > self._max_bytes:
+            self._drop(next(iter(self._cache)))
+            self.evictions += 1
+        self._maybe_sweep(now)
     
     def clear(self) -> None:
         self._cache.clear()
+        self._counters.clear()
+        self._bytes = 0
     
     def stats(self) -> Dict[str, Any]:
         """Return cache statistics."""
         now = time.time()
-        valid = sum(1 for ts, _ in self._cache.values() if now - ts <= self._ttl)
+        valid = sum(1 for _, expires, _, _ in self._cache.values() if now <= expires)
+        sizes = {k: e[3] for k, e in self._cache.items()}
         return {
             "total_entries": len(self._cache),
             "valid_entries": valid,
+            "approx_bytes": self._bytes,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "evictions": self.evictions,
+            "expired_swept": self.swept,
+            "hits": sum(c[0] for c in self._counters.values()),
+            "misses": sum(c[1] for c in self._counters.values()),
+            "keys": {
+                k: {"hits": c[0], "misses": c[1], "bytes": sizes.get(k, 0)}
+                for k, c in sorted(self._counters.items())
+            },
+            "ttl_seconds": self._ttl,
+            "disabled": settings.cache_disabled
+        }
+
+class DatasetCache:
+    """In-memory cache of parsed upstream datasets shared by several series.
+    
+    Entries are keyed by endpoint plus filter and remember the earliest date they
+    cover, so a request for a later window is served from a wider entry. A
+    narrower download (e.g. an incremental refresh) is merged into a fresh wider
+    entry instead of replacing it.
+    """
+    
+    def __init__(self, ttl_seconds: int = 3600):
+        self._cache: Dict[Tuple[str, str], Tuple[float, str, List[Dict[str, Any]]]] = {}
+        self._ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, endpoint: str, start: str, filter: str = "") -> Optional[List[Dict[str, Any]]]:
+        if settings.cache_disabled:
+            return None
+        entry = self._cache.get((endpoint, filter))
+        if entry is not None:
+            timestamp, covered_from, rows = entry
+            if time.time() - timestamp <= self._ttl and covered_from <= start:
+                self.hits += 1
+                return rows
+        self.misses += 1
+        return None
+    
+    def set(self, endpoint: str, start: str, rows: List[Dict[str, Any]], date_key: str, filter: str = "") -> None:
+        """Store a parse of every row dated `start` or later (by `date_key`).
+        
+        The new rows supersede the cached ones from `start` on; older rows of a
+        fresh wider entry are kept, so the entry stays as wide as before.
+        """
+        if settings.cache_disabled:
+            return
+        key = (endpoint, filter)
+        entry = self._cache.get(key)
+        if entry is not None:
+            timestamp, covered_from, cached = entry
+            if time.time() - timestamp <= self._ttl and covered_from < start:
+                older = [r for r in cached if r.get(date_key) is not None and str(r[date_key]) < start]
+                rows, start = older + rows, covered_from
+        self._cache[key] = (time.time(), start, rows)
+    
+    def clear(self) -> None:
+        self._cache.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics."""
+        now = time.time()
+        return {
+            "datasets": [
+                {
+                    "endpoint": endpoint,
+                    "filter": flt,
+                    "covered_from": covered_from,
+                    "rows": len(rows),
+                    "age_seconds": int(now - ts),
+                }
+                for (endpoint, flt), (ts, covered_from, rows) in self._cache.items()
+            ],
+            "hits": self.hits,
+            "misses": self.misses,
             "ttl_seconds": self._ttl,
             "disabled": settings.cache_disabled
         }
 
 # Global cache instances
-memory_cache = TTLCache(ttl_seconds=settings.cache_ttl_seconds)
-csv_cache = CSVCache(cache_dir=settings.cache_dir, ttl_seconds=settings.cache_ttl_seconds)
+memory_cache = TTLCache(
+    ttl_seconds=settings.cache_ttl_seconds,
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    sweep_interval=settings.cache_sweep_interval_seconds,
+)
+dataset_cache = DatasetCache(ttl_seconds=settings.cache_ttl_seconds)
+series_cache = _make_series_cache()
 
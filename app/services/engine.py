@@ -0,0 +1,140 @@
+"""Vectorized primitives for computing indicators from `TimeSeries`.
+
+Every operation works on whole NumPy columns: series are aligned on a shared
+date index (missing points are NaN), forward-filled, differenced or bucketed
+into ISO weeks (`resample`) without per-point Python loops. Results match the earlier
+dict-based implementations point for point.
+"""
+from __future__ import annotations
+
+from functools import reduce
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services import resample
+from app.services.timeseries import DATE_DTYPE, VALUE_DTYPE, TimeSeries, week_ending_friday
+
+
+def take(keys: np.ndarray, values: np.ndarray, index: np.ndarray, fill: float = np.nan) -> np.ndarray:
+    """Values of sorted unique `keys` looked up at `index`, `fill` where absent."""
+    out = np.full(len(index), fill, dtype=np.result_type(values, fill))
+    if not len(keys) or not len(index):
+        return out
+    pos = np.searchsorted(keys, index)
+    found = pos < len(keys)
+    found[found] = keys[pos[found]] == index[found]
+    out[found] = values[pos[found]]
+    return out
+
+
+def reindex(series: TimeSeries, index: np.ndarray) -> np.ndarray:
+    """Values of `series` on the date `index`, NaN where it has no point."""
+    return take(series.dates, series.values, index)
+
+
+def union_keys(*keys: np.ndarray) -> np.ndarray:
+    """Sorted unique union of key arrays."""
+    merged = np.sort(np.concatenate([np.empty(0, DATE_DTYPE), *keys]).astype(DATE_DTYPE, copy=False))
+    if len(merged) < 2:
+        return merged
+    return merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+
+
+def _intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if not len(a) or not len(b):
+        return a[:0]
+    pos = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[pos] == a]
+
+
+def union_index(*series: TimeSeries) -> np.ndarray:
+    """Sorted union of the series' dates (outer join index)."""
+    return union_keys(*(s.dates for s in series))
+
+
+def intersect_index(*series: TimeSeries) -> np.ndarray:
+    """Sorted intersection of the series' dates (inner join index)."""
+    if not series:
+        return np.empty(0, DATE_DTYPE)
+    return reduce(_intersect_sorted, (s.dates for s in series))
+
+
+def outer_join(*series: TimeSeries) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Shared date index of all series and each series' values on it (NaN-padded)."""
+    index = union_index(*series)
+    return index, [reindex(s, index) for s in series]
+
+
+def inner_join(*series: TimeSeries) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Dates present in every series and each series' values on them."""
+    index = intersect_index(*series)
+    return index, [reindex(s, index) for s in series]
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value forward; leading NaNs stay NaN."""
+    if not len(values):
+        return values
+    valid = ~np.isnan(values)
+    last = np.maximum.accumulate(np.where(valid, np.arange(len(values)), 0))
+    return values[last]
+
+
+def dropna(dates: np.ndarray, values: np.ndarray) -> TimeSeries:
+    """Points with a finite value (NaN marks a missing operand, inf a zero division)."""
+    keep = np.isfinite(values)
+    return TimeSeries(dates[keep].astype(DATE_DTYPE), values[keep].astype(VALUE_DTYPE))
+
+
+def diff(series: TimeSeries, periods: int = 1) -> TimeSeries:
+    """Change over `periods` observations, labelled with the later date."""
+    if len(series) <= periods:
+        return TimeSeries.empty()
+    return TimeSeries(series.dates[periods:], series.values[periods:] - series.values[:-periods])
+
+
+def round_half_even(values: np.ndarray, decimals: int) -> np.ndarray:
+    """Round like Python's `round()`.
+
+    `np.round` scales by 10**decimals first, which can land on the other side of
+    a tie; the rare near-tie values are re-rounded with the builtin.
+    """
+    out = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        out[near_tie] = [round(v, decimals) for v in values[near_tie].tolist()]
+    return out
+
+
+def spread(a: TimeSeries, b: TimeSeries, decimals: int = 4) -> TimeSeries:
+    """`a - b` on common dates, rounded to `decimals` places."""
+    index, (va, vb) = inner_join(a, b)
+    return TimeSeries(index, round_half_even(va - vb, decimals))
+
+
+def weekly_sum(series: TimeSeries) -> TimeSeries:
+    """ISO-week sums labelled with the Friday of each week's last observation."""
+    return resample.weekly_sum(series)
+
+
+def weekly_net(first: TimeSeries, *rest: TimeSeries) -> TimeSeries:
+    """Weekly sum of `first` minus the weekly sums of `rest`, over every week any of them has.
+
+    Missing sums count as zero. A week is labelled by the Friday of the last
+    day of `first` in it, else of the first day of the earliest of `rest`
+    that has one.
+    """
+    buckets = [resample.weekly(s) for s in (first, *rest)]
+    weeks = union_keys(*(b.keys for b in buckets))
+    label = np.full(len(weeks), -1, DATE_DTYPE)
+    for b in reversed(buckets[1:]):
+        day = take(b.keys, b.first, weeks, -1)
+        label = np.where(day >= 0, day, label)
+    day = take(buckets[0].keys, buckets[0].last, weeks, -1)
+    label = np.where(day >= 0, day, label)
+    net = take(buckets[0].keys, buckets[0].sums, weeks, 0.0)
+    for b in buckets[1:]:
+        net = net - take(b.keys, b.sums, weeks, 0.0)
+    return TimeSeries(week_ending_friday(label).astype(DATE_DTYPE), net)
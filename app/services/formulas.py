@@ -0,0 +1,310 @@
+"""Indicator formulas from indicator_registry.yaml, compiled into evaluation plans.
+
+A formula is a small expression over series ids:
+
+    ffill(WALCL) - TGA - RRPONTSYD
+    delta(TGA, 5)
+    spread(first_nonempty(DTB4WK, DTB3), IORB)
+    weekly_sum(UST_REDEMPTIONS)
+
+Arithmetic (`+ - * /`, unary minus, numbers) aligns its operands on the union
+of their dates; a point where any operand is missing is dropped, so in effect
+series are inner-joined. `ffill(X)` has no dates of its own: it takes the dates
+of the expression around it and carries the last value of X forward over them.
+Functions (`FUNCTIONS`) evaluate their series arguments first and return a new
+series. Indicators without a `formula` fall back to the first of their
+`series` that has data.
+
+Formulas are parsed with Python's `ast` module but never executed; only the
+node types above are accepted.
+"""
+from __future__ import annotations
+
+import ast
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services import engine, resample
+from app.services.timeseries import TimeSeries
+
+
+SeriesData = Dict[str, TimeSeries]
+
+
+class _Env:
+    """Per-evaluation state: input series and results of function nodes."""
+
+    def __init__(self, data: SeriesData):
+        self.data = data
+        self.results: Dict[int, TimeSeries] = {}
+
+    def series(self, sid: str) -> TimeSeries:
+        return self.data.get(sid) or TimeSeries.empty()
+
+
+class Node:
+    """A compiled formula expression."""
+
+    # Whether the expression has dates of its own (see `index`)
+    anchored = True
+
+    def inputs(self) -> Tuple[str, ...]:
+        return ()
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        """Dates this expression is defined on (None: adopts the surrounding dates)."""
+        raise NotImplementedError
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        """Values on `index`, NaN where undefined."""
+        raise NotImplementedError
+
+    def lookback_days(self) -> int:
+        """Days of input history before a date that its output may depend on (conservative)."""
+        return 0
+
+    def evaluate(self, env: _Env) -> TimeSeries:
+        index = self.index(env)
+        if index is None:
+            raise ValueError("Formula has no series to take its dates from")
+        return engine.dropna(index, self.values_on(env, index))
+
+
+class _Series(Node):
+    def __init__(self, sid: str):
+        self.sid = sid
+
+    def inputs(self) -> Tuple[str, ...]:
+        return (self.sid,)
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        return env.series(self.sid).dates
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        return engine.reindex(env.series(self.sid), index)
+
+    def evaluate(self, env: _Env) -> TimeSeries:
+        return env.series(self.sid)
+
+
+class _Const(Node):
+    anchored = False
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        return None
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        return np.full(len(index), self.value, dtype=float)
+
+
+class _FFill(Node):
+    anchored = False
+
+    def __init__(self, arg: Node):
+        self.arg = arg
+
+    def inputs(self) -> Tuple[str, ...]:
+        return self.arg.inputs()
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        return None
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        return engine.ffill(self.arg.values_on(env, index))
+
+    def lookback_days(self) -> int:
+        # Long enough for a weekly series across a holiday
+        return self.arg.lookback_days() + 14
+
+
+_OPERATORS: Dict[type, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+}
+
+
+class _BinOp(Node):
+    def __init__(self, op: Callable[[np.ndarray, np.ndarray], np.ndarray], left: Node, right: Node):
+        self.op, self.left, self.right = op, left, right
+        self.anchored = left.anchored or right.anchored
+
+    def inputs(self) -> Tuple[str, ...]:
+        return self.left.inputs() + self.right.inputs()
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        indexes = [i for i in (self.left.index(env), self.right.index(env)) if i is not None]
+        return engine.union_keys(*indexes) if indexes else None
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.op(self.left.values_on(env, index), self.right.values_on(env, index))
+
+    def lookback_days(self) -> int:
+        return max(self.left.lookback_days(), self.right.lookback_days())
+
+
+class _Neg(Node):
+    def __init__(self, arg: Node):
+        self.arg = arg
+        self.anchored = arg.anchored
+
+    def inputs(self) -> Tuple[str, ...]:
+        return self.arg.inputs()
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        return self.arg.index(env)
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        return -self.arg.values_on(env, index)
+
+    def lookback_days(self) -> int:
+        return self.arg.lookback_days()
+
+
+class _Call(Node):
+    """A function producing a new series from evaluated series arguments."""
+
+    def __init__(self, name: str, fn: Callable[..., TimeSeries], args: List[Node], params: List[float], lookback: int):
+        self.name, self.fn, self.args, self.params = name, fn, args, params
+        self.lookback = lookback
+
+    def inputs(self) -> Tuple[str, ...]:
+        return tuple(sid for arg in self.args for sid in arg.inputs())
+
+    def evaluate(self, env: _Env) -> TimeSeries:
+        result = env.results.get(id(self))
+        if result is None:
+            result = env.results[id(self)] = self.fn(*(a.evaluate(env) for a in self.args), *self.params)
+        return result
+
+    def index(self, env: _Env) -> Optional[np.ndarray]:
+        return self.evaluate(env).dates
+
+    def values_on(self, env: _Env, index: np.ndarray) -> np.ndarray:
+        return engine.reindex(self.evaluate(env), index)
+
+    def lookback_days(self) -> int:
+        return max(a.lookback_days() for a in self.args) + self.lookback
+
+
+def _first_nonempty(*series: TimeSeries) -> TimeSeries:
+    return next((s for s in series if len(s)), TimeSeries.empty())
+
+
+def _round(series: TimeSeries, decimals: float) -> TimeSeries:
+    return TimeSeries(series.dates, engine.round_half_even(series.values, int(decimals)))
+
+
+class _Function(NamedTuple):
+    fn: Callable[..., TimeSeries]
+    arity: Optional[int]  # number of series arguments (None: one or more)
+    defaults: Tuple[float, ...]  # numeric parameters after the series
+    lookback: Callable[[List[float]], int]  # extra days of history needed, given the parameters
+
+
+FUNCTIONS: Dict[str, _Function] = {
+    # n observations back; assumes at most weekly data (denser is covered too)
+    "delta": _Function(lambda s, n: engine.diff(s, int(n)), 1, (1,), lambda p: 7 * int(p[0])),
+    "spread": _Function(lambda a, b, d: engine.spread(a, b, int(d)), 2, (4,), lambda p: 0),
+    "round": _Function(_round, 1, (4,), lambda p: 0),
+    # A partial first week can be labelled up to 11 days after its first point
+    "weekly_sum": _Function(engine.weekly_sum, 1, (), lambda p: 14),
+    "weekly_net": _Function(engine.weekly_net, None, (), lambda p: 14),
+    # A partial first month is labelled up to 30 days after its first point
+    "monthly_sum": _Function(resample.monthly_sum, 1, (), lambda p: 31),
+    # Gaps up to two weeks between observations, as for ffill()
+    "bday_ffill": _Function(resample.business_ffill, 1, (), lambda p: 14),
+    "first_nonempty": _Function(_first_nonempty, None, (), lambda p: 0),
+}
+
+
+def _compile(node: ast.AST, formula: str) -> Node:
+    if isinstance(node, ast.Name):
+        return _Series(node.id.upper())
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return _Const(float(node.value))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return _Neg(_compile(node.operand, formula))
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _BinOp(_OPERATORS[type(node.op)], _compile(node.left, formula), _compile(node.right, formula))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        args = [_compile(a, formula) for a in node.args]
+        if name == "ffill":
+            if len(args) != 1 or isinstance(args[0], _Const):
+                raise ValueError(f"ffill() takes one series in formula {formula!r}")
+            return _FFill(args[0])
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unknown function {name}() in formula {formula!r}")
+        fn, arity, defaults, lookback = FUNCTIONS[name]
+        series_args = [a for a in args if not isinstance(a, _Const)]
+        params = [a.value for a in args if isinstance(a, _Const)]
+        if args[:len(series_args)] != series_args or not series_args or (arity is not None and len(series_args) != arity):
+            raise ValueError(f"{name}() expects {arity or 'one or more'} series first in formula {formula!r}")
+        if len(params) > len(defaults):
+            raise ValueError(f"{name}() takes at most {len(defaults)} numeric arguments in formula {formula!r}")
+        params += defaults[len(params):]
+        return _Call(name, fn, series_args, params, lookback(params))
+    raise ValueError(f"Unsupported expression {ast.dump(node)} in formula {formula!r}")
+
+
+class IndicatorPlan(NamedTuple):
+    """A compiled formula and the exact series it reads."""
+    formula: str
+    inputs: Tuple[str, ...]
+    root: Node
+
+    def evaluate(self, data: SeriesData) -> TimeSeries:
+        return self.root.evaluate(_Env(data))
+
+
+@lru_cache(maxsize=None)
+def compile_formula(formula: str) -> IndicatorPlan:
+    """Parse and validate a formula (cached: each distinct formula compiles once)."""
+    try:
+        tree = ast.parse(formula.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid formula {formula!r}: {e.msg}") from None
+    root = _compile(tree.body, formula)
+    if not root.anchored:
+        raise ValueError(f"Formula {formula!r} has no series to take its dates from")
+    return IndicatorPlan(formula, tuple(dict.fromkeys(root.inputs())), root)
+
+
+def indicator_formula(indicator: Dict[str, Any]) -> str:
+    """The indicator's formula, defaulting to the first of its series with data."""
+    formula = indicator.get("formula")
+    if formula:
+        return str(formula)
+    series = indicator.get("series") or []
+    if not series:
+        raise ValueError(f"Indicator {indicator.get('id')} has neither formula nor series")
+    return series[0] if len(series) == 1 else f"first_nonempty({', '.join(series)})"
+
+
+def plan_for(indicator: Dict[str, Any]) -> IndicatorPlan:
+    return compile_formula(indicator_formula(indicator))
+
+
+def compile_registry(registry: List[Dict[str, Any]]) -> Dict[str, IndicatorPlan]:
+    """Compile every indicator up front so a bad formula fails at startup.
+    
+    An indicator's `series` list (shown to users and the LLM) must name exactly
+    the series its formula reads.
+    """
+    plans = {}
+    for indicator in registry:
+        plan = plans[indicator["id"]] = plan_for(indicator)
+        declared = indicator.get("series") or []
+        if set(declared) != set(plan.inputs):
+            raise ValueError(
+                f"Indicator {indicator['id']} lists series {declared} but its formula reads {list(plan.inputs)}"
+            )
+    return plans
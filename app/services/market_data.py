@@ -1,12 +1,19 @@
 import asyncio
+import math
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
 from collections import defaultdict
 
+import numpy as np
+
 from app.settings import settings
 from app.sources import fred, treasury, ofr
-from app.registry_loader import SERIES_REGISTRY, load_indicator_registry, load_series_registry
-from app.services.cache import memory_cache, csv_cache
+from app.sources.http import NotModified
+from app.registry_loader import INDICATOR_REGISTRY, SERIES_REGISTRY, load_indicator_registry, load_series_registry
+from app.services import engine, formulas, planner, releases, resample, rolling
+from app.services.cache import memory_cache, series_cache, dataset_cache
+from app.services.timeseries import DATE_DTYPE, TimeSeries, to_ordinal, week_ending_friday
 
 
 def list_indicators() -> List[Dict[str, Any]]:
@@ -37,71 +44,380 @@ def list_series() -> List[Dict[str, Any]]:
     return result
 
 
+# Sources whose adapters can fetch only the tail after the last stored observation
+DELTA_SOURCES = {"FRED", "TREASURY_TGA", "TREASURY_REDEMPTIONS", "TREASURY_INTEREST", "TREASURY_AUCTIONS"}
+# Sources revalidated with HTTP validators (full-file downloads)
+CONDITIONAL_SOURCES = {"OFR"}
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight task.
+    
+    The first caller starts the work; every caller arriving while it runs awaits
+    the same future and gets the same result (or exception).
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def do(self, key: Any, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is not None and not fut.done():
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+        self.calls += 1
+        fut = asyncio.ensure_future(fn())
+        self._inflight[key] = fut
+        fut.add_done_callback(lambda f, k=key: self._forget(k, f))
+        return await asyncio.shield(fut)
+    
+    def find(self, match: Callable[[Any], bool]) -> Optional[Any]:
+        """Key of an in-flight call that `match` accepts (None when there is none)."""
+        return next((key for key, fut in self._inflight.items() if not fut.done() and match(key)), None)
+    
+    def _forget(self, key: Any, fut: asyncio.Future) -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        # Avoid "exception never retrieved" when every waiter was cancelled
+        if not fut.cancelled():
+            fut.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.calls,
+            "coalesced_calls": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+# Upstream series fetches keyed by (series id, fetch start, refresh)
+series_flight = SingleFlight()
+# Upstream dataset downloads keyed by (endpoint, filter, start)
+dataset_flight = SingleFlight()
+
+
+class SeriesWindow(NamedTuple):
+    """One series clipped to a request window, as passed between the caches and indicators.
+    
+    Only converted to `{"date", "value"}` dicts at the API edge (`to_dict`).
+    `full` is the whole L1 history the window was sliced from, when there is
+    one, so materialized indicators can extend over it.
+    """
+    series_id: str
+    source: str
+    series: TimeSeries
+    stale_seconds: Optional[int] = None
+    full: Optional[TimeSeries] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"series_id": self.series_id, "source": self.source, "items": self.series.to_items()}
+        if self.stale_seconds is not None:
+            result.update(stale=True, stale_seconds=self.stale_seconds)
+        return result
+
+
+class SeriesHistory(NamedTuple):
+    """Full history of one series held in L1; request windows are sliced on read.
+    
+    `covered_from` is the earliest date the history is known to be complete
+    from. It can predate the first point when upstream has nothing older.
+    """
+    source: str
+    series: TimeSeries
+    covered_from: str
+    
+    @classmethod
+    def of(cls, source: str, series: TimeSeries, covered_from: Optional[str] = None) -> "SeriesHistory":
+        first = series.first_date or "9999-12-31"
+        return cls(source, series, min(first, covered_from or first))
+    
+    def covers(self, cutoff: str) -> bool:
+        return self.covered_from <= cutoff
+    
+    def window(self, sid: str, cutoff: str, stale_seconds: Optional[int] = None) -> SeriesWindow:
+        return SeriesWindow(sid, self.source, self.series.since(cutoff), stale_seconds, self.series)
+
+
 async def get_series(series_id: str, days: int = 180) -> Dict[str, Any]:
-    """Fetch a single series with two-tier caching (L1: memory, L2: CSV)."""
+    """Fetch a single series with two-tier caching (L1: memory, L2: series store).
+    
+    L1 holds one full-history entry per series; any `days` window is a slice of
+    it, and upstream is only asked when the stored history does not reach back
+    to the cutoff. Entries expire at the series' next expected release (see
+    `releases`). With stale-while-revalidate enabled, data at most
+    `cache_max_staleness_seconds` past expiry is returned immediately (marked
+    `"stale": True`) while one background task per series refreshes it.
+    """
+    return (await load_series(series_id, days)).to_dict()
+
+
+async def load_series(series_id: str, days: int = 180, lead_days: int = 0) -> SeriesWindow:
+    """`get_series` without the conversion to dicts (used by indicators and derived series).
+    
+    `lead_days` more history before the window is loaded with it and kept in
+    `full` (formula lookbacks and rolling windows, see `indicator_lead_days`).
+    """
+    window = await _load_span(series_id.upper(), days + lead_days)
+    if not lead_days:
+        return window
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    return window._replace(series=window.series.since(cutoff))
+
+
+async def _load_span(sid: str, days: int) -> SeriesWindow:
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    
+    # L1: Check memory cache (full history, sliced to the window)
+    history = memory_cache.get(sid)
+    if history is not None and history.covers(cutoff):
+        return history.window(sid, cutoff)
+    
+    # L2: Check series store (persistent, stores all data; only the window is read)
+    stored: Optional[SeriesHistory] = None
+    if series_cache.is_valid(sid):
+        stored = _read_stored(sid, cutoff)
+        if len(stored.series):
+            if stored.covers(cutoff):
+                memory_cache.set(sid, stored, expires_at=series_cache.expires_at(sid))
+                return stored.window(sid, cutoff)
+            # Cache doesn't have enough history - need to refetch
+            print(f"[DEBUG] Cache miss for {sid}: earliest cached {stored.series.first_date} > cutoff {cutoff}. Refetching.")
+    
+    if stored is None:
+        stored = _read_stored(sid, cutoff)
     
+    # Stale-while-revalidate: serve expired-but-present data and refresh in background
+    if settings.cache_swr_enabled:
+        stale = _get_stale(sid, cutoff, stored)
+        if stale is not None:
+            _schedule_refresh(sid, days)
+            return stale
+    
+    return await _load_series(sid, days, stored)
+
+
+async def refresh_series(series_id: str, days: int = 180) -> SeriesWindow:
+    """Fetch a series upstream regardless of cache freshness and re-store it."""
     sid = series_id.upper()
-    cache_key = f"{sid}:{days}"
     cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    return await _load_series(sid, days, _read_stored(sid, cutoff), refresh=True)
+
+
+def _read_stored(sid: str, cutoff: str) -> SeriesHistory:
+    """Stored points dated `cutoff` or later.
+    
+    Older points stay on disk (memory-mapped stores copy only the window), so
+    the history is marked complete from the cutoff, not from the store's first
+    point. Callers needing history before a window ask for it (`lead_days`).
+    """
+    source = SERIES_REGISTRY.get(sid, {}).get("source", "CSV_CACHE")
+    first = series_cache.first_date(sid)
+    if first is not None and first < cutoff:
+        return SeriesHistory.of(source, series_cache.read_series(sid, cutoff) or TimeSeries.empty(), cutoff)
+    stored = series_cache.read_series(sid) or TimeSeries.empty()
+    return SeriesHistory.of(source, stored, series_cache.get_meta(sid).get("covered_from"))
+
+
+def _get_stale(sid: str, cutoff: str, stored: SeriesHistory) -> Optional[SeriesWindow]:
+    """Return expired cached data at most `cache_max_staleness_seconds` past expiry, marked as stale."""
+    max_stale = settings.cache_max_staleness_seconds
+    entry = memory_cache.get_stale(sid)
+    if entry is not None:
+        history, overdue = entry
+        if overdue <= max_stale and history.covers(cutoff):
+            return history.window(sid, cutoff, stale_seconds=max(0, int(overdue)))
+    overdue = series_cache.stale_seconds(sid)
+    if len(stored.series) and overdue is not None and overdue <= max_stale and stored.covers(cutoff):
+        return stored.window(sid, cutoff, stale_seconds=max(0, int(overdue)))
+    return None
+
+
+# Background revalidation tasks, at most one per series
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _schedule_refresh(sid: str, days: int) -> None:
+    task = _refresh_tasks.get(sid)
+    if task is not None and not task.done():
+        return
     
-    # L1: Check memory cache (fast, includes days filter)
-    cached = memory_cache.get(cache_key)
-    if cached is not None:
-        return cached
-    
-    # L2: Check CSV cache (persistent, stores all data)
-    if csv_cache.is_valid(sid):
-        all_items = csv_cache.read(sid)
-        if all_items:
-            # Check if cache has data old enough for the request
-            earliest_cached = min(i["date"] for i in all_items) if all_items else None
-            
-            if earliest_cached and earliest_cached <= cutoff:
-                # Cache covers the requested range
-                filtered = [i for i in all_items if i["date"] >= cutoff]
-                meta = SERIES_REGISTRY.get(sid, {})
-                result = {"series_id": sid, "source": meta.get("source", "CSV_CACHE"), "items": filtered}
-                memory_cache.set(cache_key, result)
-                return result
-            # Cache doesn't have enough history - need to refetch
-            print(f"[DEBUG] Cache miss for {sid}: earliest cached {earliest_cached} > cutoff {cutoff}. Refetching.")
+    async def refresh() -> None:
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+            await _load_series(sid, days, _read_stored(sid, cutoff))
+        except Exception as e:
+            print(f"[DEBUG] Background refresh failed for {sid}: {e}")
+        finally:
+            _refresh_tasks.pop(sid, None)
+    
+    _refresh_tasks[sid] = asyncio.create_task(refresh())
+
+
+async def _load_series(sid: str, days: int, stored: SeriesHistory, refresh: bool = False) -> SeriesWindow:
+    """Fetch a series upstream (incrementally when possible) and store it.
+    
+    With `refresh`, derived series are rebuilt from freshly fetched inputs too.
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    meta = SERIES_REGISTRY.get(sid, {})
     
-    # Miss: Fetch from API
+    # Incremental refresh: when the stored history already reaches back to the
+    # cutoff, only the tail after its last observation is fetched upstream.
+    since = None
+    if meta.get("source") in DELTA_SOURCES and len(stored.series) and stored.covers(cutoff):
+        since = stored.series.last_date
+    
+    # Miss: Fetch from API. Concurrent misses share one fetch: any in-flight
+    # fetch starting at or before the cutoff yields a history covering this window.
+    key = (sid, since or cutoff, refresh)
+    if since is None:
+        key = series_flight.find(lambda k: k[0] == sid and k[2] == refresh and k[1] <= cutoff) or key
     try:
-        result = await fetch_series_uncached(series_id, days)
+        history = await series_flight.do(key, lambda: _fetch_and_store(sid, days, since, stored, refresh))
     except ValueError as e:
         # Re-raise as is (caller handles mapping to HTTP errors)
         raise e
+    return history.window(sid, cutoff)
+
+
+async def _fetch_and_store(
+    sid: str, days: int, since: Optional[str], stored: SeriesHistory, refresh: bool = False
+) -> SeriesHistory:
+    """Fetch a series upstream, save it to both cache tiers and return the new L1 history."""
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    meta = SERIES_REGISTRY.get(sid, {})
+    stored_meta = series_cache.get_meta(sid)
     
-    # Save to L1 memory cache
-    memory_cache.set(cache_key, result)
+    # Revalidate instead of re-downloading when the stored file covers the window
+    validators = None
+    if meta.get("source") in CONDITIONAL_SOURCES and len(stored.series) and stored.covers(cutoff):
+        validators = stored_meta.get("validators")
     
-    # Save to L2 CSV cache (full data, not filtered)
+    try:
+        result = await fetch_series_uncached(sid, days, since=since, validators=validators, refresh=refresh)
+    except NotModified:
+        # Upstream unchanged: extend freshness without re-parsing or rewriting
+        series_cache.touch(sid)
+        memory_cache.set(sid, stored, expires_at=series_cache.expires_at(sid))
+        return stored
+    new_validators = result.pop("validators", None)
+    series = result["series"]
+    # A full-window fetch proves there is nothing older than its first row back to the cutoff
+    covered_from = stored.covered_from if since else cutoff
+    
+    # Save to L2 store (full data, not filtered)
     # Only cache raw series, not derived ones (which depend on other series)
-    meta = SERIES_REGISTRY.get(sid, {})
     if meta.get("source") != "DERIVED":
-        # Merge with existing cache if it has newer data we're missing
-        existing = csv_cache.read(sid) or []
-        # Combine: existing + new (dedupe by date, prefer new)
-        combined = {i["date"]: i for i in existing}
-        for item in result.get("items", []):
-            combined[item["date"]] = item
+        series = series_cache.merge(sid, series, existing=stored.series)
+        updates = {}
+        if new_validators:
+            updates["validators"] = new_validators
+        if not since and len(series) and series.first_date > cutoff and cutoff != stored_meta.get("covered_from"):
+            updates["covered_from"] = cutoff
+        if updates:
+            series_cache.set_meta(sid, {**stored_meta, **updates})
+    
+    # Save to L1 memory cache, fresh until the next expected release
+    history = SeriesHistory.of(result.get("source", meta.get("source", "")), series, covered_from)
+    memory_cache.set(sid, history, expires_at=releases.expires_at(sid, time.time(), settings.cache_ttl_seconds))
+    
+    return history
+
+
+async def _load_dataset(
+    endpoint: str,
+    start: str,
+    fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    date_key: str,
+    filter: str = "",
+    fresh: bool = False,
+) -> List[Dict[str, Any]]:
+    """Return parsed rows of an upstream dataset dated `start` or later.
+    
+    Rows are parsed once per download and shared through `dataset_cache` by every
+    series built from the same endpoint (auction issues and bill share; other
+    datasets feed a single raw series and are fetched directly). With `fresh`
+    the cached parse is skipped (concurrent fetches still share one download):
+    raw series stored in L2 must come from upstream, or a refresh after a
+    release would re-store, and re-validate, the old parse. The download is
+    merged into the cached parse, so a narrow refresh keeps it wide.
+    """
+    rows = None if fresh else dataset_cache.get(endpoint, start, filter)
+    if rows is None:
+        async def fetch_and_cache() -> List[Dict[str, Any]]:
+            fetched = await fetch()
+            dataset_cache.set(endpoint, start, fetched, date_key, filter)
+            return fetched
         
-        merged = sorted(combined.values(), key=lambda x: x["date"])
-        csv_cache.write(sid, merged)
+        # Any in-flight download is as fresh as a new one, so fresh callers join it too
+        rows = await dataset_flight.do((endpoint, filter, start), fetch_and_cache)
+    return [r for r in rows if r.get(date_key) is not None and str(r[date_key]) >= start]
+
+
+def _window_start(days: int, since: Optional[str]) -> str:
+    """First date to load: the day after `since` on refresh, else the `days` cutoff."""
+    if since:
+        return (datetime.strptime(since, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+async def get_auction_rows(start_date: str, fresh: bool = False) -> List[Dict[str, Any]]:
+    """Parsed Treasury auctions with auction_date >= start_date (shared dataset; `fresh` skips the cached parse)."""
+    async def fetch() -> List[Dict[str, Any]]:
+        data = await treasury.fetch_auction_schedules(limit=500, pages=3, start_date=start_date)
+        return treasury.parse_auction_rows(iter(data["data"]))
     
-    return result
+    return await _load_dataset(treasury.TREASURY_AUCTIONS_URL, start_date, fetch, "auction_date", fresh=fresh)
+
+
+async def get_redemption_rows(days: int, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Daily redemption totals for the window, from upstream (only UST_REDEMPTIONS reads them)."""
+    start = _window_start(days, since)
+    data = await treasury.fetch_redemptions(limit=1000, start_date=None if since else start, after_date=since)
+    return [r for r in treasury.parse_redemptions_rows(iter(data["data"])) if str(r["observation_date"]) >= start]
+
+
+async def get_interest_rows(days: int, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Daily interest outlays for the window, from upstream (only UST_INTEREST reads them)."""
+    start = _window_start(days, since)
+    data = await treasury.fetch_interest_outlays(limit=1000, start_date=None if since else start, after_date=since)
+    return [r for r in treasury.parse_interest_rows(iter(data["data"])) if str(r["observation_date"]) >= start]
+
+
+# DERIVED aggregations that sum the base series per calendar bucket
+_CALENDAR_AGGREGATIONS = {
+    "weekly_sum": resample.weekly_sum,
+    "monthly_sum": resample.monthly_sum,
+}
+
 
+async def fetch_series_uncached(
+    series_id: str,
+    days: int,
+    since: Optional[str] = None,
+    validators: Optional[Dict[str, str]] = None,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Fetch series data from source API (no cache). Uses series_registry.yaml for routing.
 
-async def fetch_series_uncached(series_id: str, days: int) -> Dict[str, Any]:
-    """Fetch series data from source API (no cache). Uses series_registry.yaml for routing."""
+    Returns `{"series_id", "source", "series": TimeSeries}`.
+
+    With `since` (last stored observation date) sources in DELTA_SOURCES return only
+    the tail after it, plus a short revision overlap where the source revises history.
+    With `validators`, sources in CONDITIONAL_SOURCES raise NotModified when upstream
+    is unchanged and otherwise return fresh validators under the "validators" key.
+    Raw series always read shared datasets from upstream (they are stored in
+    L2); derived series reuse the cached parse unless `refresh` is set.
+    """
     
     sid = series_id.upper()
     meta = SERIES_REGISTRY.get(sid, {})
     source = meta.get("source", "")
     raw_scale = float(meta.get("raw_scale", 1))
     
-    print(f"[DEBUG] fetch_series_uncached: {sid}, days={days}, source={source}")
+    print(f"[DEBUG] fetch_series_uncached: {sid}, days={days}, since={since}, source={source}")
 
     # ─────────────────────────────────────────────────────────────────────────
     # FRED Series
@@ -110,51 +426,39 @@ async def fetch_series_uncached(series_id: str, days: int) -> Dict[str, Any]:
         if not settings.fred_api_key:
             raise ValueError("FRED_API_KEY not configured")
         
-        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        data = await fred.fetch_series(sid, observation_start=start_date, last_n=days + 50)
+        if since:
+            # FRED revises recent observations; re-request a short overlap
+            start = datetime.strptime(since, "%Y-%m-%d") - timedelta(days=settings.refresh_overlap_days)
+            last_n = (datetime.now() - start).days + 50
+        else:
+            start = datetime.now() - timedelta(days=days)
+            last_n = days + 50
+        data = await fred.fetch_series(sid, observation_start=start.strftime("%Y-%m-%d"), last_n=last_n)
         
         observations = data.get("observations", [])
-        items = []
+        pairs = []
         for obs in reversed(observations):  # FRED returns desc order
             if obs.get("value") in (None, "", "."):
                 continue
             try:
-                items.append({
-                    "date": obs["date"],
-                    "value": float(obs["value"]) * raw_scale
-                })
+                pairs.append((to_ordinal(obs["date"]), float(obs["value"])))
             except (ValueError, KeyError):
                 continue
         
-        return {"series_id": sid, "source": "FRED", "items": items}
+        return {"series_id": sid, "source": "FRED", "series": TimeSeries.from_pairs(pairs).scaled(raw_scale)}
     
     # ─────────────────────────────────────────────────────────────────────────
     # Treasury TGA
     # ─────────────────────────────────────────────────────────────────────────
     if source == "TREASURY_TGA":
-        # Each page has multiple account types per date.
-        # Density is ~4-5 rows/day. Using divisor 100 implies 10 rows/day safety buffer.
-        pages_needed = max(3, (days // 100) + 1)
-        data = await treasury.fetch_tga_latest(limit=1000, pages=pages_needed)
-        items = []
+        # The date window is filtered server-side and TGA balance rows while
+        # decoding; the pagination engine stops at the API's total-pages.
+        start_date = None if since else (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        data = await treasury.fetch_tga_latest(limit=1000, start_date=start_date, after_date=since, tga_only=True)
+        pairs = []
         seen_dates = set()
         for row in data.get("data", []):
-            account_type = (row.get("account_type") or "").lower()
-            # Skip explicit Opening Balance rows (present in recent data)
-            if "opening balance" in account_type:
-                continue
-            
-            # Match:
-            # 1. "Treasury General Account (TGA) Closing Balance" (Newer)
-            # 2. "Federal Reserve Account" (Older)
-            # 3. "Treasury General Account" (Generic)
-            is_match = (
-                "closing balance" in account_type or 
-                "federal reserve account" in account_type or
-                account_type == "treasury general account"
-            )
-            
-            if not is_match:
+            if not treasury.is_tga_balance_row(row):
                 continue
 
             date_str = row.get("record_date")
@@ -165,59 +469,58 @@ async def fetch_series_uncached(series_id: str, days: int) -> Dict[str, Any]:
                 val_str = row.get("open_today_bal") or row.get("close_today_bal")
                 if val_str in (None, "", "null"):
                     continue
-                val = float(str(val_str).replace(",", "")) * raw_scale
-                items.append({"date": date_str, "value": val})
+                pairs.append((to_ordinal(date_str), float(str(val_str).replace(",", ""))))
             except (ValueError, TypeError):
                 continue
         
-        items.sort(key=lambda x: x["date"])
-        print(f"[DEBUG] TGA fetched {len(items)} daily items. First: {items[0]['date'] if items else 'None'}, Last: {items[-1]['date'] if items else 'None'}")
+        series = TimeSeries.from_pairs(pairs).scaled(raw_scale)
+        print(f"[DEBUG] TGA fetched {len(series)} daily items. First: {series.first_date}, Last: {series.last_date}")
         cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        items = [i for i in items if i["date"] >= cutoff]
         
-        return {"series_id": sid, "source": "Treasury", "items": items}
+        return {"series_id": sid, "source": "Treasury", "series": series.since(cutoff)}
     
     # ─────────────────────────────────────────────────────────────────────────
     # Treasury Redemptions
     # ─────────────────────────────────────────────────────────────────────────
     if source == "TREASURY_REDEMPTIONS":
-        data = await treasury.fetch_redemptions(limit=1000, pages=5)
-        rows = treasury.parse_redemptions_rows(data)
-        
         cutoff = datetime.now().date() - timedelta(days=days)
-        items = [
-            {"date": str(r["observation_date"]), "value": r["value_numeric"] * raw_scale}
+        rows = await get_redemption_rows(days, since=since)
+
+        series = TimeSeries.from_pairs(
+            (r["observation_date"], r["value_numeric"])
             for r in rows
             if r["observation_date"] >= cutoff
-        ]
-        items.sort(key=lambda x: x["date"])
+        )
         
-        return {"series_id": sid, "source": "Treasury", "items": items}
+        return {"series_id": sid, "source": "Treasury", "series": series.scaled(raw_scale)}
     
     # ─────────────────────────────────────────────────────────────────────────
     # Treasury Interest
     # ─────────────────────────────────────────────────────────────────────────
     if source == "TREASURY_INTEREST":
-        data = await treasury.fetch_interest_outlays(limit=1000, pages=5)
-        rows = treasury.parse_interest_rows(data)
-        
         cutoff = datetime.now().date() - timedelta(days=days)
-        items = [
-            {"date": str(r["observation_date"]), "value": r["value_numeric"] * raw_scale}
+        rows = await get_interest_rows(days, since=since)
+
+        series = TimeSeries.from_pairs(
+            (r["observation_date"], r["value_numeric"])
             for r in rows
             if r["observation_date"] >= cutoff
-        ]
-        items.sort(key=lambda x: x["date"])
+        )
         
-        return {"series_id": sid, "source": "Treasury", "items": items}
+        return {"series_id": sid, "source": "Treasury", "series": series.scaled(raw_scale)}
     
     # ─────────────────────────────────────────────────────────────────────────
     # Treasury Auctions
     # ─────────────────────────────────────────────────────────────────────────
     if source == "TREASURY_AUCTIONS":
-        start_date = (datetime.now() - timedelta(days=days + 30)).strftime("%Y-%m-%d")
-        data = await treasury.fetch_auction_schedules(limit=500, pages=3, start_date=start_date)
-        rows = treasury.parse_auction_rows(data)
+        # Series is keyed by issue date; auctions settle up to ~30 days after the
+        # auction. The stored tail is often the future issue date of an announced
+        # auction, and auctions announced later can settle before it, so a refresh
+        # re-aggregates every issue date from 30 days before the tail (merge
+        # upserts the revised totals). Those need auctions from 30 days earlier.
+        window_start = datetime.strptime(since, "%Y-%m-%d") - timedelta(days=30) if since else datetime.now() - timedelta(days=days)
+        start_date = (window_start - timedelta(days=30)).strftime("%Y-%m-%d")
+        rows = await get_auction_rows(start_date, fresh=True)
         
         totals_by_date: Dict[str, float] = defaultdict(float)
         for r in rows:
@@ -228,32 +531,23 @@ async def fetch_series_uncached(series_id: str, days: int) -> Dict[str, Any]:
             if amt > 0:
                 totals_by_date[str(issue_date)] += amt * raw_scale
         
-        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        items = [
-            {"date": d, "value": v}
-            for d, v in sorted(totals_by_date.items())
-            if d >= cutoff
-        ]
+        cutoff = window_start.strftime("%Y-%m-%d")
+        series = TimeSeries.from_pairs(
+            (d, v) for d, v in sorted(totals_by_date.items()) if d >= cutoff
+        )
         
-        return {"series_id": sid, "source": "Treasury", "items": items}
+        return {"series_id": sid, "source": "Treasury", "series": series}
     
     # ─────────────────────────────────────────────────────────────────────────
     # OFR Series
     # ─────────────────────────────────────────────────────────────────────────
     if source == "OFR":
         OFR_URL = "https://www.financialresearch.gov/financial-stress-index/data/fsi.csv"
-        csv_text = await ofr.fetch_liquidity_stress_csv(OFR_URL)
-        rows = ofr.parse_liquidity_stress_csv(csv_text)
-        
         cutoff = datetime.now().date() - timedelta(days=days)
-        items = [
-            {"date": str(r["observation_date"]), "value": r["value_numeric"] * raw_scale}
-            for r in rows
-            if r["observation_date"] >= cutoff
-        ]
-        items.sort(key=lambda x: x["date"])
+        points, new_validators = await ofr.stream_liquidity_stress_points(OFR_URL, validators, start=cutoff)
+        series = TimeSeries.from_pairs(points)
         
-        return {"series_id": sid, "source": "OFR", "items": items}
+        return {"series_id": sid, "source": "OFR", "series": series.scaled(raw_scale), "validators": new_validators}
     
     # ─────────────────────────────────────────────────────────────────────────
     # Derived Series (weekly aggregates)
@@ -265,276 +559,118 @@ async def fetch_series_uncached(series_id: str, days: int) -> Dict[str, Any]:
         if not base_series:
             raise ValueError(f"Derived series {sid} missing base_series")
         
-        # Weekly sum aggregation
-        if aggregation == "weekly_sum":
-            base_data = await get_series(base_series, days=days)
-            base_items = base_data.get("items", [])
-            
-            weekly_totals: Dict[str, float] = defaultdict(float)
-            week_dates: Dict[str, str] = {}
-            
-            for item in base_items:
-                d = datetime.strptime(item["date"], "%Y-%m-%d")
-                week = f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}"
-                weekly_totals[week] += item["value"]
-                # Friday of that week
-                days_ahead = 4 - d.weekday()
-                if days_ahead < 0:
-                    days_ahead += 7
-                friday = d + timedelta(days=days_ahead)
-                week_dates[week] = friday.strftime("%Y-%m-%d")
-            
-            cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-            items = [
-                {"date": week_dates[w], "value": v}
-                for w, v in sorted(weekly_totals.items())
-                if week_dates.get(w, "") >= cutoff
-            ]
-            
-            return {"series_id": sid, "source": "DERIVED", "items": items}
+        cutoff = to_ordinal((datetime.now() - timedelta(days=days)).date())
+        
+        # Calendar sums of the base series (see `resample`)
+        if aggregation in _CALENDAR_AGGREGATIONS:
+            base = (await (refresh_series if refresh else load_series)(base_series, days=days)).series
+            series = _CALENDAR_AGGREGATIONS[aggregation](base)
+            return {"series_id": sid, "source": "DERIVED", "series": series.since(cutoff)}
         
         # Weekly bill percentage
         if aggregation == "weekly_bill_pct":
+            # Same auctions dataset as the base series (UST_AUCTION_ISSUES), parsed once
             start_date = (datetime.now() - timedelta(days=days + 30)).strftime("%Y-%m-%d")
-            data = await treasury.fetch_auction_schedules(limit=500, pages=3, start_date=start_date)
-            rows = treasury.parse_auction_rows(data)
-            
-            bills_by_week: Dict[str, float] = defaultdict(float)
-            total_by_week: Dict[str, float] = defaultdict(float)
-            week_dates: Dict[str, str] = {}
-            
-            for r in rows:
-                issue_date = r.get("issue_date")
-                if not issue_date:
-                    continue
-                amt = r.get("offering_amount") or r.get("accepted_amount") or 0
-                if amt > 0:
-                    d = datetime.strptime(str(issue_date), "%Y-%m-%d")
-                    week = f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}"
-                    total_by_week[week] += amt
-                    if r.get("is_bill"):
-                        bills_by_week[week] += amt
-                    days_ahead = 4 - d.weekday()
-                    if days_ahead < 0:
-                        days_ahead += 7
-                    friday = d + timedelta(days=days_ahead)
-                    week_dates[week] = friday.strftime("%Y-%m-%d")
-            
-            cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-            items = []
-            for week in sorted(total_by_week.keys()):
-                week_date = week_dates.get(week, "")
-                if week_date < cutoff:
-                    continue
-                total = total_by_week[week]
-                if total > 0:
-                    bill_pct = (bills_by_week.get(week, 0) / total) * 100
-                    items.append({"date": week_date, "value": round(bill_pct, 2)})
+            rows = [
+                r for r in await get_auction_rows(start_date, fresh=refresh)
+                if r.get("issue_date") and (r.get("offering_amount") or r.get("accepted_amount") or 0) > 0
+            ]
+            amounts = np.array([r.get("offering_amount") or r.get("accepted_amount") for r in rows], dtype=float)
+            bills = np.array([bool(r.get("is_bill")) for r in rows], dtype=bool)
+            days_issued = np.array([to_ordinal(r["issue_date"]) for r in rows], dtype=int)
             
-            return {"series_id": sid, "source": "DERIVED", "items": items}
+            weeks = resample.bucket(days_issued, np.stack([amounts, np.where(bills, amounts, 0.0)]), "W")
+            total, billed = weeks.sums
+            series = TimeSeries(
+                week_ending_friday(weeks.last).astype(DATE_DTYPE),
+                engine.round_half_even(billed / total * 100, 2),
+            )
+            return {"series_id": sid, "source": "DERIVED", "series": series.since(cutoff)}
         
         raise ValueError(f"Unknown aggregation type: {aggregation}")
     
     raise ValueError(f"Unknown series: {series_id}. Add it to series_registry.yaml")
 
 
-async def get_indicator_live(indicator_id: str, days: int = 180) -> Dict[str, Any]:
+# Indicator formulas compiled once at startup (a bad formula fails the import);
+# live requests are planned from these, not from a fresh read of the registry file
+INDICATOR_PLANS = formulas.compile_registry(INDICATOR_REGISTRY)
+INDICATORS_BY_ID = {indicator["id"]: indicator for indicator in INDICATOR_REGISTRY}
+
+# Calendar days per observation (upper bound, with holidays), to size rolling windows
+_DAYS_PER_POINT = {"daily": 1.5, "weekly": 7, "monthly": 31}
+
+
+def indicator_lead_days(plans: Dict[str, formulas.IndicatorPlan], windows: Iterable[int] = ()) -> int:
+    """Days of input history before a window that the indicators' values in it depend on.
+    
+    The largest formula lookback (see `formulas`) plus, for rolling statistics,
+    the `window - 1` earlier points at the slowest of the indicators' cadences.
+    """
+    lookback = max((plan.root.lookback_days() for plan in plans.values()), default=0)
+    per_point = max(
+        (_DAYS_PER_POINT.get(INDICATORS_BY_ID.get(iid, {}).get("cadence"), 1.5) for iid in plans), default=1.5
+    )
+    return lookback + math.ceil((max(windows, default=1) - 1) * per_point)
+
+
+def indicator_series(indicator: Dict[str, Any]) -> List[str]:
+    """Exact series an indicator's formula reads."""
+    plan = INDICATOR_PLANS.get(indicator["id"]) or formulas.plan_for(indicator)
+    return list(plan.inputs)
+
+
+async def get_indicator_live(indicator_id: str, days: int = 180, extras: Sequence[str] = ()) -> Dict[str, Any]:
     """Fetch live data for an indicator and compute its value."""
-    registry = load_indicator_registry()
-    indicator = next((i for i in registry if i["id"] == indicator_id), None)
-    
-    if not indicator:
-        raise ValueError(f"Unknown indicator: {indicator_id}")
-    
-    # Override series for indicators with derived/computed series
-    SERIES_OVERRIDES = {
-        "ust_net_w": ["UST_AUCTION_ISSUES", "UST_REDEMPTIONS", "UST_INTEREST"],
-        "bill_share_w": ["UST_BILL_SHARE"],
-        "ust_redemptions_w": ["UST_REDEMPTIONS_W"],
-        "ust_interest_w": ["UST_INTEREST_W"],
-    }
-    
-    series_ids = SERIES_OVERRIDES.get(indicator_id, indicator.get("series", []))
-    series_data = {}
-    
-    for sid in series_ids:
-        try:
-            data = await get_series(sid, days=days)
-            series_data[sid] = data["items"]
-        except ValueError:
-            series_data[sid] = []
-    
-    # Compute indicator values based on type
-    items = compute_indicator(indicator_id, indicator, series_data)
-    
-    return {
-        "indicator_id": indicator_id,
-        "name": indicator.get("name"),
-        "category": indicator.get("category"),
-        "directionality": indicator.get("directionality"),
-        "items": items
-    }
-
-
-def compute_indicator(indicator_id: str, indicator: Dict, series_data: Dict) -> List[Dict]:
-    """Compute indicator values from raw series data."""
-    
-    # Net Liquidity = WALCL - TGA - RRP
-    if indicator_id == "net_liq":
-        walcl = {i["date"]: i["value"] for i in series_data.get("WALCL", [])}
-        tga = {i["date"]: i["value"] for i in series_data.get("TGA", [])}
-        rrp = {i["date"]: i["value"] for i in series_data.get("RRPONTSYD", [])}
-        
-        # WALCL is weekly, TGA/RRP are daily - forward fill WALCL
-        all_dates = sorted(set(tga.keys()) | set(rrp.keys()))
-        last_walcl = None
-        items = []
-        for d in all_dates:
-            if d in walcl:
-                last_walcl = walcl[d]
-            if last_walcl is None:
-                continue
-            t = tga.get(d)
-            r = rrp.get(d)
-            if t is not None and r is not None:
-                # All values already in actual USD
-                net = last_walcl - t - r
-                items.append({"date": d, "value": net})
-        return items
-    
-    # Simple delta indicators (5d change)
-    if indicator_id in ("rrp_delta", "tga_delta"):
-        sid = indicator["series"][0]
-        data = series_data.get(sid, [])
-        if len(data) < 6:
-            return []
-        # Data is already in actual USD
-        items = []
-        for i in range(5, len(data)):
-            delta = data[i]["value"] - data[i-5]["value"]
-            items.append({"date": data[i]["date"], "value": delta})
-        return items
-    
-    # Weekly delta (reserves)
-    if indicator_id == "reserves_w":
-        sid = indicator["series"][0]
-        data = series_data.get(sid, [])
-        if len(data) < 2:
-            return []
-        items = []
-        for i in range(1, len(data)):
-            delta = data[i]["value"] - data[i-1]["value"]
-            items.append({"date": data[i]["date"], "value": delta})
-        return items
-    
-    # Spread: SOFR - IORB (return raw spread in percentage points)
-    if indicator_id == "sofr_iorb":
-        sofr = {i["date"]: i["value"] for i in series_data.get("SOFR", [])}
-        iorb = {i["date"]: i["value"] for i in series_data.get("IORB", [])}
-        
-        common = sorted(set(sofr.keys()) & set(iorb.keys()))
-        items = []
-        for d in common:
-            spread = round(sofr[d] - iorb[d], 4)  # Raw spread in percentage points
-            items.append({"date": d, "value": spread})
-        return items
-    
-    # Bill - IORB spread (raw spread in percentage points)
-    if indicator_id == "bill_iorb":
-        # For bill_rrp we'd need RRP_RATE which may not be in FRED
-        # Simplified: use DTB4WK - IORB as proxy
-        bill = {i["date"]: i["value"] for i in series_data.get("DTB4WK", [])}
-        if not bill:
-            bill = {i["date"]: i["value"] for i in series_data.get("DTB3", [])}
-        iorb = {i["date"]: i["value"] for i in series_data.get("IORB", [])}
-        
-        common = sorted(set(bill.keys()) & set(iorb.keys()))
-        items = []
-        for d in common:
-            spread = round(bill[d] - iorb[d], 4)  # Raw spread in percentage points
-            items.append({"date": d, "value": spread})
-        return items
-    
-    # OFR index - just pass through
-    if indicator_id == "ofr_liq_idx":
-        return series_data.get("OFR_LIQ_IDX", [])
-    
-    # Bill share - just pass through
-    if indicator_id == "bill_share_w":
-        return series_data.get("UST_BILL_SHARE", [])
-    
-    # Weekly redemptions - just pass through
-    if indicator_id == "ust_redemptions_w":
-        return series_data.get("UST_REDEMPTIONS_W", [])
-    
-    # Weekly interest - just pass through
-    if indicator_id == "ust_interest_w":
-        return series_data.get("UST_INTEREST_W", [])
-    
-    # Net UST settlements (weekly): Issues - Redemptions - Interest
-    if indicator_id == "ust_net_w":
-        from collections import defaultdict
-        
-        issues = {i["date"]: i["value"] for i in series_data.get("UST_AUCTION_ISSUES", [])}
-        redemptions = {i["date"]: i["value"] for i in series_data.get("UST_REDEMPTIONS", [])}
-        interest = {i["date"]: i["value"] for i in series_data.get("UST_INTEREST", [])}
-        
-        # Aggregate by ISO week (year-week)
-        def get_week(date_str: str) -> str:
-            from datetime import datetime
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-            return f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}"
-        
-        def get_week_end(date_str: str) -> str:
-            """Get the Friday of the week for display."""
-            from datetime import datetime, timedelta
-            d = datetime.strptime(date_str, "%Y-%m-%d")
-            # Days until Friday (weekday 4)
-            days_ahead = 4 - d.weekday()
-            if days_ahead < 0:
-                days_ahead += 7
-            friday = d + timedelta(days=days_ahead)
-            return friday.strftime("%Y-%m-%d")
-        
-        weekly_issues: Dict[str, float] = defaultdict(float)
-        weekly_redemptions: Dict[str, float] = defaultdict(float)
-        weekly_interest: Dict[str, float] = defaultdict(float)
-        week_dates: Dict[str, str] = {}  # week -> representative Friday date
-        
-        for d, v in issues.items():
-            w = get_week(d)
-            weekly_issues[w] += v
-            week_dates[w] = get_week_end(d)
-        
-        for d, v in redemptions.items():
-            w = get_week(d)
-            weekly_redemptions[w] += v
-            if w not in week_dates:
-                week_dates[w] = get_week_end(d)
-        
-        for d, v in interest.items():
-            w = get_week(d)
-            weekly_interest[w] += v
-            if w not in week_dates:
-                week_dates[w] = get_week_end(d)
-        
-        # Compute net for each week
-        all_weeks = sorted(set(weekly_issues.keys()) | set(weekly_redemptions.keys()) | set(weekly_interest.keys()))
-        items = []
-        for w in all_weeks:
-            iss = weekly_issues.get(w, 0)
-            red = weekly_redemptions.get(w, 0)
-            intr = weekly_interest.get(w, 0)
-            # Net = Issues - Redemptions - Interest (positive = drain)
-            net = iss - red - intr
-            if w in week_dates:
-                items.append({"date": week_dates[w], "value": net})
-        
-        return items
-    
-    # Default: return first series raw
-    for sid in indicator.get("series", []):
-        if sid in series_data and series_data[sid]:
-            return series_data[sid]
+    result = (await get_indicators_live([indicator_id], days=days, extras=extras))[indicator_id]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+async def get_indicators_live(
+    indicator_ids: List[str], days: int = 180, extras: Sequence[str] = ()
+) -> Dict[str, Union[Dict[str, Any], Exception]]:
+    """Compute several indicators from one dependency plan.
+    
+    Every series any of them needs is loaded once, all raw series concurrently
+    (see `planner`). Indicators that failed map to their exception.
+    
+    `extras` adds rolling statistics of each indicator (`["z20"]` adds a
+    `"z20"` list of `{"date", "value"}` items, see `rolling`), computed over
+    the history behind the window so the first points have full windows too.
+    """
+    unknown = [iid for iid in indicator_ids if iid not in INDICATORS_BY_ID]
+    if unknown:
+        raise ValueError(f"Unknown indicator: {unknown[0]}")
+    specs = rolling.parse_specs(extras)
+    
+    plan = planner.build_plan((INDICATORS_BY_ID[iid] for iid in dict.fromkeys(indicator_ids)), INDICATOR_PLANS)
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+    lead_days = indicator_lead_days(plan.indicators, (window for _, _, window in specs))
+    results = await planner.run(plan, lambda sid: load_series(sid, days=days, lead_days=lead_days), start=cutoff)
     
-    return []
+    output: Dict[str, Union[Dict[str, Any], Exception]] = {}
+    for iid, result in results.items():
+        if isinstance(result, Exception):
+            output[iid] = result
+            continue
+        indicator = INDICATORS_BY_ID[iid]
+        output[iid] = {
+            "indicator_id": iid,
+            "name": indicator.get("name"),
+            "category": indicator.get("category"),
+            "directionality": indicator.get("directionality"),
+            "items": result.series.to_items(),
+            **({"stale": True} if result.stale else {}),
+        }
+        for token, stat, window in specs:
+            # Only the `window - 1` points before the cutoff are read
+            context = result.history.since(cutoff, lead=window - 1)
+            output[iid][token] = rolling.rolling_series(context, stat, window).since(cutoff).to_items()
+    return output
+
+
+def compute_indicator(indicator_id: str, indicator: Dict, series_data: Dict[str, TimeSeries]) -> TimeSeries:
+    """Compute indicator values from raw series data by evaluating its registry formula."""
+    return formulas.plan_for(indicator).evaluate(series_data)
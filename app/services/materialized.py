@@ -0,0 +1,120 @@
+"""Materialized indicator outputs, extended incrementally as observations arrive.
+
+Each indicator keeps its output over the full input histories plus the inputs
+it was computed from. When the inputs come back as the old ones with points
+appended (the usual case after a release), only a short suffix is recomputed.
+With L the formula's lookback and F the first new point, the inputs are
+sliced from F - 3L and the plan is evaluated on that slice; its output from
+F - L on replaces the old tail (points up to a lookback before F can move,
+as when a weekend settlement relabels its week). The recomputed points in
+[F - 2L, F - L) must equal the stored ones, which catches a lookback that was
+too short for the data (a sparse series). A mismatch, or any input whose
+history changed (a revision), rebuilds the whole output instead.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.services.formulas import IndicatorPlan
+from app.services.timeseries import TimeSeries
+
+
+# Smallest lookback used for verification, so the check never covers an empty span
+MIN_LOOKBACK_DAYS = 7
+
+
+def _is_prefix(old: TimeSeries, new: TimeSeries) -> bool:
+    n = len(old)
+    return (
+        len(new) >= n
+        and np.array_equal(new.dates[:n], old.dates)
+        and np.array_equal(new.values[:n], old.values)
+    )
+
+
+class MaterializedIndicator:
+    """Output of one indicator plan over the inputs it last saw."""
+
+    def __init__(self, plan: IndicatorPlan):
+        self.plan = plan
+        self.inputs: Optional[Dict[str, TimeSeries]] = None
+        self.output = TimeSeries.empty()
+        self.lookback = max(plan.root.lookback_days(), MIN_LOOKBACK_DAYS)
+
+    def _first_new(self, data: Dict[str, TimeSeries]) -> Optional[int]:
+        """Ordinal of the earliest appended point; None when nothing changed.
+
+        Raises LookupError when an input changed other than by appending.
+        """
+        if self.inputs is None:
+            raise LookupError("not built")
+        first: Optional[int] = None
+        for sid in self.plan.inputs:
+            old, new = self.inputs[sid], data[sid]
+            if new is old or (len(new) == len(old) and _is_prefix(old, new)):
+                continue
+            if not _is_prefix(old, new):
+                raise LookupError(f"{sid} revised")
+            day = int(new.dates[len(old)])
+            first = day if first is None else min(first, day)
+        return first
+
+    def update(self, data: Dict[str, TimeSeries]) -> str:
+        """Bring the output up to date with `data`; returns how ("reused", "extended", "rebuilt")."""
+        data = {sid: data.get(sid) or TimeSeries.empty() for sid in self.plan.inputs}
+        try:
+            first = self._first_new(data)
+        except LookupError:
+            return self._rebuild(data)
+        if first is None:
+            self.inputs = data
+            return "reused"
+
+        # [start, check): tail warm-up, [check, splice): must match, [splice, ...): replaced
+        splice = first - self.lookback
+        check = splice - self.lookback
+        start = check - self.lookback
+        tail = self.plan.evaluate({sid: s.since(start) for sid, s in data.items()})
+        if tail.since(check).before(splice) != self.output.since(check).before(splice):
+            return self._rebuild(data)
+        self.output = self.output.before(splice).concat(tail.since(splice))
+        self.inputs = data
+        return "extended"
+
+    def _rebuild(self, data: Dict[str, TimeSeries]) -> str:
+        self.output = self.plan.evaluate(data)
+        self.inputs = data
+        return "rebuilt"
+
+
+class IndicatorStore:
+    """Materialized outputs by indicator id."""
+
+    def __init__(self) -> None:
+        self._indicators: Dict[str, MaterializedIndicator] = {}
+        self.counts = {"reused": 0, "extended": 0, "rebuilt": 0}
+
+    def evaluate(self, indicator_id: str, plan: IndicatorPlan, data: Dict[str, TimeSeries]) -> TimeSeries:
+        """Full-history output of the indicator for `data` (computed incrementally when possible)."""
+        entry = self._indicators.get(indicator_id)
+        if entry is None or entry.plan is not plan:
+            entry = self._indicators[indicator_id] = MaterializedIndicator(plan)
+        self.counts[entry.update(data)] += 1
+        return entry.output
+
+    def clear(self) -> None:
+        self._indicators.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "indicators": {
+                iid: {"points": len(e.output), "last_date": e.output.last_date}
+                for iid, e in sorted(self._indicators.items())
+            },
+        }
+
+
+indicator_store = IndicatorStore()
@@ -0,0 +1,171 @@
+"""Dependency planning for indicator requests.
+
+A set of indicators is expanded into a DAG:
+
+    indicator -> series its formula reads -> base series of DERIVED ones
+
+with the upstream dataset of every raw series recorded alongside (series
+sharing a dataset, like auction issues and bill share, share one download
+through `market_data`'s dataset cache). `run` then loads every series node
+exactly once, starting each as soon as its dependencies are done, so all raw
+series are fetched concurrently and derived series and indicators are
+evaluated in topological order.
+"""
+from __future__ import annotations
+
+import asyncio
+from graphlib import TopologicalSorter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from app.registry_loader import SERIES_REGISTRY
+from app.services import formulas
+from app.services.materialized import indicator_store
+from app.services.timeseries import TimeSeries
+
+
+# ("series", "TGA") or ("indicator", "tga_delta")
+Node = Tuple[str, str]
+# Loads one series window (`market_data.SeriesWindow`: `.series`, `.stale_seconds`, `.full`)
+Loader = Callable[[str], Awaitable[Any]]
+
+# Upstream dataset each source reads; FRED and unknown sources are one request per series
+_SOURCE_DATASETS = {
+    "TREASURY_TGA": "treasury:tga",
+    "TREASURY_REDEMPTIONS": "treasury:redemptions",
+    "TREASURY_INTEREST": "treasury:interest",
+    "TREASURY_AUCTIONS": "treasury:auctions",
+    "OFR": "ofr:fsi",
+}
+
+
+def dataset_of(series_id: str) -> str:
+    """Upstream dataset a raw series is parsed from."""
+    source = SERIES_REGISTRY.get(series_id, {}).get("source", "")
+    return _SOURCE_DATASETS.get(source, f"{source.lower() or 'unknown'}:{series_id}")
+
+
+def series_dependencies(series_id: str) -> List[str]:
+    """Series a DERIVED series is computed from (none for raw series)."""
+    meta = SERIES_REGISTRY.get(series_id, {})
+    if meta.get("source") == "DERIVED" and meta.get("base_series"):
+        return [meta["base_series"].upper()]
+    return []
+
+
+class IndicatorResult(NamedTuple):
+    series: TimeSeries
+    stale: bool
+    # Materialized output before slicing to `start`
+    history: Optional[TimeSeries] = None
+
+
+class Plan(NamedTuple):
+    """Indicators to compute and the dependency graph behind them."""
+    indicators: Dict[str, formulas.IndicatorPlan]
+    graph: Dict[Node, Set[Node]]
+
+    @property
+    def raw_series(self) -> List[str]:
+        return sorted(sid for kind, sid in self.graph if kind == "series" and not series_dependencies(sid))
+
+    @property
+    def derived_series(self) -> List[str]:
+        return sorted(sid for kind, sid in self.graph if kind == "series" and series_dependencies(sid))
+
+    @property
+    def datasets(self) -> Dict[str, List[str]]:
+        """Upstream dataset -> raw series read from it."""
+        datasets: Dict[str, List[str]] = {}
+        for sid in self.raw_series:
+            datasets.setdefault(dataset_of(sid), []).append(sid)
+        return datasets
+
+    def order(self) -> List[Node]:
+        """One valid evaluation order (dependencies first)."""
+        return list(TopologicalSorter(self.graph).static_order())
+
+
+def build_plan(
+    indicators: Iterable[Dict[str, Any]], compiled: Optional[Dict[str, formulas.IndicatorPlan]] = None
+) -> Plan:
+    """Expand registry indicators into their series dependency graph.
+    
+    `compiled` maps indicator ids to plans compiled up front (see
+    `formulas.compile_registry`); other indicators are compiled here.
+    """
+    compiled = compiled or {}
+    plans: Dict[str, formulas.IndicatorPlan] = {}
+    graph: Dict[Node, Set[Node]] = {}
+    pending: List[str] = []
+    for indicator in indicators:
+        plan = compiled.get(indicator["id"]) or formulas.plan_for(indicator)
+        plans[indicator["id"]] = plan
+        graph[("indicator", indicator["id"])] = {("series", sid) for sid in plan.inputs}
+        pending.extend(plan.inputs)
+    while pending:
+        sid = pending.pop()
+        if ("series", sid) in graph:
+            continue
+        deps = series_dependencies(sid)
+        graph[("series", sid)] = {("series", d) for d in deps}
+        pending.extend(deps)
+    return Plan(plans, graph)
+
+
+async def run(plan: Plan, load: Loader, start: Optional[str] = None) -> Dict[str, Union[IndicatorResult, Exception]]:
+    """Load each series once and evaluate every indicator of `plan`.
+    
+    Indicators are materialized over the full histories behind the windows
+    (see `materialized`) and returned from `start` on.
+
+    A series the registry does not know (ValueError) counts as empty, as in
+    single-indicator requests; any other failure is returned in place of the
+    indicators that depend on it.
+    """
+    windows: Dict[str, Any] = {}
+    failures: Dict[Node, Exception] = {}
+    results: Dict[str, Union[IndicatorResult, Exception]] = {}
+
+    async def load_series(sid: str) -> None:
+        try:
+            windows[sid] = await load(sid)
+        except ValueError:
+            windows[sid] = None
+
+    def evaluate(indicator_id: str) -> None:
+        indicator_plan = plan.indicators[indicator_id]
+        loaded = {sid: windows[sid] for sid in indicator_plan.inputs if windows.get(sid) is not None}
+        data = {sid: w.series if w.full is None else w.full for sid, w in loaded.items()}
+        stale = any(w.stale_seconds is not None for w in loaded.values())
+        try:
+            output = indicator_store.evaluate(indicator_id, indicator_plan, data)
+            results[indicator_id] = IndicatorResult(output if start is None else output.since(start), stale, output)
+        except Exception as e:
+            results[indicator_id] = e
+
+    sorter = TopologicalSorter(plan.graph)
+    sorter.prepare()
+    running: Dict[asyncio.Task, Node] = {}
+    while sorter.is_active():
+        for node in sorter.get_ready():
+            kind, name = node
+            failed = next((failures[d] for d in plan.graph[node] if d in failures), None)
+            if failed is not None:
+                failures[node] = failed
+                if kind == "indicator":
+                    results[name] = failed
+                sorter.done(node)
+            elif kind == "indicator":
+                evaluate(name)
+                sorter.done(node)
+            else:
+                running[asyncio.ensure_future(load_series(name))] = node
+        if not running:
+            continue
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            node = running.pop(task)
+            if task.exception() is not None:
+                failures[node] = task.exception()
+            sorter.done(node)
+    return results
@@ -0,0 +1,146 @@
+"""Background prefetch of series right after their expected upstream release.
+
+Started from the API lifespan. One task per raw series with a `release` block
+sleeps until the next release (plus a small delay), then refetches the series
+until new observations show up or the retry window closes. After new data
+lands, derived series built on it and the indicators reading either are
+recomputed for the configured windows, so user requests hit warm caches.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.registry_loader import INDICATOR_REGISTRY, SERIES_REGISTRY
+from app.services import market_data
+from app.services.releases import ReleaseSchedule, schedule_for
+from app.settings import settings
+
+
+def _windows() -> List[int]:
+    """Lookback windows (days) kept warm, largest first."""
+    days = {int(d) for d in settings.prefetch_windows.split(",") if d.strip().isdigit()}
+    return sorted(days or {180}, reverse=True)
+
+
+def _now() -> datetime:
+    return datetime.now().astimezone()
+
+
+def derived_series(series_id: str) -> List[str]:
+    """Derived series computed from `series_id`."""
+    return [
+        sid for sid, meta in SERIES_REGISTRY.items()
+        if meta.get("source") == "DERIVED" and meta.get("base_series") == series_id
+    ]
+
+
+class Prefetcher:
+    """Per-series release-driven refresh loops."""
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.next_run: Dict[str, datetime] = {}
+        self.last_new_data: Dict[str, str] = {}
+        self.attempts = 0
+        self.new_data = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._tasks.values())
+
+    def start(self) -> None:
+        if self.running:
+            return
+        for sid in SERIES_REGISTRY:
+            schedule = schedule_for(sid)
+            if schedule is None or SERIES_REGISTRY[sid].get("source") == "DERIVED":
+                continue
+            self._tasks[sid] = asyncio.create_task(self._series_loop(sid, schedule))
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _series_loop(self, sid: str, schedule: ReleaseSchedule) -> None:
+        # Each worker (and every reload) starts here; only series whose store has expired are fetched
+        if settings.prefetch_on_startup and not market_data.series_cache.is_valid(sid):
+            await self.refresh(sid)
+        delay = timedelta(minutes=settings.release_delay_minutes)
+        while True:
+            due = schedule.next_after(_now() - delay) + delay
+            self.next_run[sid] = due
+            await asyncio.sleep(max(0.0, (due - _now()).total_seconds()))
+            await self.refresh_until_new(sid, deadline=due + timedelta(minutes=settings.release_window_minutes))
+
+    async def refresh_until_new(self, sid: str, deadline: datetime) -> bool:
+        """Refetch `sid` until its last observation advances or `deadline` passes."""
+        before = market_data.series_cache.last_date(sid)
+        while True:
+            after = await self.refresh(sid)
+            if after is not None and (before is None or after > before):
+                self.new_data += 1
+                self.last_new_data[sid] = after
+                return True
+            retry_at = _now() + timedelta(seconds=settings.prefetch_retry_seconds)
+            if retry_at > deadline:
+                return False
+            self.next_run[sid] = retry_at
+            await asyncio.sleep(settings.prefetch_retry_seconds)
+
+    async def refresh(self, sid: str) -> Optional[str]:
+        """Refetch one series, then warm its derived series and indicators.
+
+        Returns the date of the latest stored observation (None on failure).
+        """
+        windows = _windows()
+        self.attempts += 1
+        try:
+            result = await market_data.refresh_series(sid, days=windows[0])
+        except Exception as e:
+            self.errors += 1
+            print(f"[DEBUG] Prefetch failed for {sid}: {e}")
+            return None
+        await self._warm(sid, windows)
+        return result.series.last_date
+
+    async def _warm(self, sid: str, windows: List[int]) -> None:
+        touched = {sid}
+        for dsid in derived_series(sid):
+            try:
+                await market_data.refresh_series(dsid, days=windows[0])
+                touched.add(dsid)
+            except Exception as e:
+                print(f"[DEBUG] Prefetch failed for derived {dsid}: {e}")
+        for days in windows:
+            for series_id in touched:
+                try:
+                    await market_data.get_series(series_id, days=days)
+                except Exception:
+                    pass
+            for indicator in INDICATOR_REGISTRY:
+                if touched.isdisjoint(market_data.indicator_series(indicator)):
+                    continue
+                try:
+                    await market_data.get_indicator_live(indicator["id"], days=days)
+                except Exception as e:
+                    print(f"[DEBUG] Prefetch failed for indicator {indicator['id']}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "series": len(self._tasks),
+            "attempts": self.attempts,
+            "new_data": self.new_data,
+            "errors": self.errors,
+            "next_run": {sid: due.isoformat() for sid, due in sorted(self.next_run.items())},
+            "last_new_data": dict(sorted(self.last_new_data.items())),
+        }
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,100 @@
+"""Expected publication times of upstream series.
+
+Each raw series in series_registry.yaml may declare a `release` block:
+
+    release:
+      days: [thu]      # weekday names, or "business" for Mon-Fri
+      time: "16:30"    # local time in `settings.timezone` (US Eastern)
+
+Derived series inherit the schedule of their `base_series`. Market holidays are
+not modelled; a release that does not happen simply yields no new data.
+"""
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from app.registry_loader import SERIES_REGISTRY
+from app.settings import settings
+
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+BUSINESS_DAYS = frozenset(range(5))
+
+
+class ReleaseSchedule(NamedTuple):
+    weekdays: FrozenSet[int]
+    at: time
+
+    def next_after(self, when: datetime) -> datetime:
+        """First release strictly after `when` (timezone-aware)."""
+        local = when.astimezone(_tz())
+        for offset in range(8):
+            day = local.date() + timedelta(days=offset)
+            if day.weekday() not in self.weekdays:
+                continue
+            candidate = datetime.combine(day, self.at, tzinfo=local.tzinfo)
+            if candidate > local:
+                return candidate
+        raise AssertionError("release schedule without weekdays")
+
+    def last_before(self, when: datetime) -> datetime:
+        """Most recent release at or before `when` (timezone-aware)."""
+        local = when.astimezone(_tz())
+        for offset in range(8):
+            day = local.date() - timedelta(days=offset)
+            if day.weekday() not in self.weekdays:
+                continue
+            candidate = datetime.combine(day, self.at, tzinfo=local.tzinfo)
+            if candidate <= local:
+                return candidate
+        raise AssertionError("release schedule without weekdays")
+
+
+def _tz() -> ZoneInfo:
+    return ZoneInfo(settings.timezone)
+
+
+def parse_schedule(spec: Optional[Dict[str, Any]]) -> Optional[ReleaseSchedule]:
+    """Parse a registry `release` block; None when absent or malformed."""
+    if not spec:
+        return None
+    days = spec.get("days", "business")
+    if days == "business":
+        weekdays = BUSINESS_DAYS
+    else:
+        weekdays = frozenset(WEEKDAYS[d.strip().lower()[:3]] for d in days if d.strip().lower()[:3] in WEEKDAYS)
+    if not weekdays:
+        return None
+    try:
+        hour, minute = (int(p) for p in str(spec.get("time", "00:00")).split(":", 1))
+    except ValueError:
+        return None
+    return ReleaseSchedule(weekdays, time(hour, minute))
+
+
+def schedule_for(series_id: str) -> Optional[ReleaseSchedule]:
+    """Release schedule of a series, following `base_series` for derived ones."""
+    meta = SERIES_REGISTRY.get(series_id.upper(), {})
+    if meta.get("source") == "DERIVED" and meta.get("base_series"):
+        return schedule_for(meta["base_series"])
+    return parse_schedule(meta.get("release"))
+
+
+def expires_at(series_id: str, fetched_at: float, ttl_seconds: int) -> float:
+    """Epoch time until which data of `series_id` fetched at `fetched_at` stays fresh.
+
+    Data is valid until the next expected publication (plus the usual upstream
+    delay). Within the release window upstream may not have caught up yet, so
+    the plain TTL applies there; unscheduled series always use the TTL.
+    """
+    fallback = fetched_at + ttl_seconds
+    schedule = schedule_for(series_id) if settings.cache_cadence_aware else None
+    if schedule is None:
+        return fallback
+    fetched = datetime.fromtimestamp(fetched_at, _tz())
+    delay = timedelta(minutes=settings.release_delay_minutes)
+    if fetched - schedule.last_before(fetched) < timedelta(minutes=settings.release_window_minutes):
+        return fallback
+    return (schedule.next_after(fetched) + delay).timestamp()
@@ -0,0 +1,118 @@
+"""Calendar resampling of day-ordinal series as vectorized group-bys.
+
+Days are int day ordinals (`date.toordinal()`, ordinal 1 is a Monday) or
+NumPy `datetime64` values, which are converted on the way in. Each day maps to
+a bucket key (the Monday of its ISO week, or the first day of its month) with
+integer arithmetic over the whole column. A sorted column is then cut where the
+key changes and reduced with `np.add.reduceat`, so no step loops over points in
+Python.
+
+Conventions shared by every weekly series:
+- a week is labelled with the Friday on or after its last observed day, so a
+  weekend observation rolls the label to the next Friday (`week_ending_friday`);
+- a month is labelled with its last calendar day.
+"""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+from app.services.timeseries import DATE_DTYPE, VALUE_DTYPE, TimeSeries, week_ending_friday, week_start
+
+
+# Ordinal of the datetime64 epoch (1970-01-01)
+EPOCH_ORDINAL = 719163
+
+
+def as_ordinals(days: np.ndarray) -> np.ndarray:
+    """Day ordinals of an int ordinal or `datetime64` column."""
+    days = np.asarray(days)
+    if np.issubdtype(days.dtype, np.datetime64):
+        return (days.astype("datetime64[D]").astype(np.int64) + EPOCH_ORDINAL).astype(DATE_DTYPE)
+    return days.astype(DATE_DTYPE, copy=False)
+
+
+def as_datetime64(ordinals: np.ndarray) -> np.ndarray:
+    """`datetime64[D]` column of day ordinals."""
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def month_start(ordinals: np.ndarray) -> np.ndarray:
+    """First day of each day's month, as ordinals."""
+    months = as_datetime64(ordinals).astype("datetime64[M]")
+    return as_ordinals(months.astype("datetime64[D]"))
+
+
+def month_end(ordinals: np.ndarray) -> np.ndarray:
+    """Last day of each day's month, as ordinals."""
+    months = as_datetime64(ordinals).astype("datetime64[M]") + 1
+    return as_ordinals(months.astype("datetime64[D]")) - 1
+
+
+PERIODS = {"W": week_start, "M": month_start}
+
+
+class Buckets(NamedTuple):
+    """Per calendar bucket (keyed by its first day): sums and first/last observed day.
+
+    `sums` has one row per value column when several are bucketed together.
+    """
+    keys: np.ndarray
+    sums: np.ndarray
+    first: np.ndarray
+    last: np.ndarray
+
+
+def bucket(days: np.ndarray, values: np.ndarray, period: str = "W") -> Buckets:
+    """Group-sum `values` (shape `(n,)` or `(k, n)`) by the week ("W") or month ("M") of `days`.
+
+    Days need not be sorted or unique; several values on one day add up.
+    """
+    days = as_ordinals(days)
+    values = np.asarray(values, dtype=VALUE_DTYPE)
+    if not len(days):
+        empty = np.empty(0, DATE_DTYPE)
+        return Buckets(empty, np.empty(values.shape[:-1] + (0,), VALUE_DTYPE), empty, empty)
+    if np.any(days[1:] < days[:-1]):
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[..., order]
+    keys = PERIODS[period](days)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(keys)) - 1
+    return Buckets(keys[starts], np.add.reduceat(values, starts, axis=-1), days[starts], days[ends])
+
+
+def weekly(series: TimeSeries) -> Buckets:
+    """ISO-week buckets of a series."""
+    return bucket(series.dates, series.values, "W")
+
+
+def weekly_sum(series: TimeSeries) -> TimeSeries:
+    """ISO-week sums labelled with the Friday of each week's last observation."""
+    buckets = weekly(series)
+    return TimeSeries(week_ending_friday(buckets.last).astype(DATE_DTYPE), buckets.sums)
+
+
+def monthly_sum(series: TimeSeries) -> TimeSeries:
+    """Calendar-month sums labelled with the last day of each month."""
+    buckets = bucket(series.dates, series.values, "M")
+    return TimeSeries(month_end(buckets.keys), buckets.sums)
+
+
+def business_days(start: int, end: int) -> np.ndarray:
+    """Monday-Friday ordinals from `start` to `end` inclusive."""
+    days = np.arange(start, end + 1, dtype=DATE_DTYPE)
+    return days[(days - 1) % 7 < 5]
+
+
+def business_ffill(series: TimeSeries) -> TimeSeries:
+    """The series on every business day from its first to its last point, carrying values forward.
+
+    Weekend observations stay where they are.
+    """
+    if not len(series):
+        return series
+    days = np.union1d(business_days(int(series.dates[0]), int(series.dates[-1])), series.dates).astype(DATE_DTYPE)
+    latest = np.searchsorted(series.dates, days, side="right") - 1
+    return TimeSeries(days, series.values[latest])
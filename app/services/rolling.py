@@ -0,0 +1,156 @@
+"""Rolling window statistics over a series, computed in one pass.
+
+Each point's window is the last `window` observations up to and including it.
+The mean and sample standard deviation are kept with Welford's update (adding
+the new observation and removing the one leaving the window in a single step),
+which stays accurate where running sums of squares cancel catastrophically;
+both are recomputed exactly once per window so drift cannot accumulate.
+Min and max come from monotonic deques and the percentile rank from a sorted
+copy of the window, so a full series costs O(n) (O(n log window) comparisons
+for the rank) instead of re-reading every window.
+
+Requests name a statistic and window as one token, e.g. `z20` or `pctrank60`.
+"""
+from __future__ import annotations
+
+import math
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.timeseries import TimeSeries, VALUE_DTYPE
+
+
+STATS = ("mean", "std", "z", "min", "max", "pctrank")
+
+# Longest window a request may ask for
+MAX_WINDOW = 1000
+
+_SPEC = re.compile(r"^(mean|std|z|min|max|pctrank)(\d+)$")
+
+
+class RollingPoint(NamedTuple):
+    """Statistics of one window; `std` is the sample standard deviation."""
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    z: float
+    pctrank: float
+
+
+class RollingStats(NamedTuple):
+    """Per-point statistics, aligned with the input; NaN where the window has too few points."""
+    count: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    z: np.ndarray
+    pctrank: np.ndarray
+
+    def at(self, i: int) -> RollingPoint:
+        return RollingPoint(int(self.count[i]), *(float(column[i]) for column in self[1:]))
+
+
+def rolling_stats(values: Iterable[float], window: int, min_periods: int = 2) -> RollingStats:
+    """Rolling mean, std, z-score, min, max and percentile rank of `values`.
+
+    The z-score is `(value - mean) / std` and is NaN for a flat window (all
+    values equal, std exactly 0). The percentile rank is the share of the
+    window at or below the current value, in percent.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    xs: List[float] = [float(v) for v in values]
+    n = len(xs)
+    out = np.full((6, n), np.nan, dtype=VALUE_DTYPE)
+    counts = np.zeros(n, dtype=np.int64)
+
+    mean = m2 = 0.0
+    count = 0
+    lows: deque = deque()  # indexes with increasing values
+    highs: deque = deque()  # indexes with decreasing values
+    ordered: List[float] = []
+    for i, x in enumerate(xs):
+        if count < window:
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        else:
+            old = xs[i - window]
+            delta = x - old
+            new_mean = mean + delta / count
+            m2 += delta * (x - new_mean + old - mean)
+            mean = new_mean
+            del ordered[bisect_left(ordered, old)]
+            if i % window == 0:
+                # Re-anchor once per window so rounding from large values that left cannot build up
+                mean = math.fsum(xs[i - window + 1:i + 1]) / count
+                m2 = math.fsum((v - mean) ** 2 for v in xs[i - window + 1:i + 1])
+        insort(ordered, x)
+        while lows and xs[lows[-1]] >= x:
+            lows.pop()
+        lows.append(i)
+        while highs and xs[highs[-1]] <= x:
+            highs.pop()
+        highs.append(i)
+        if lows[0] <= i - window:
+            lows.popleft()
+        if highs[0] <= i - window:
+            highs.popleft()
+
+        counts[i] = count
+        if count < min_periods:
+            continue
+        low, high = xs[lows[0]], xs[highs[0]]
+        if low == high:
+            # Rounding can leave a residue once the window is flat; min == max is exact
+            mean, m2 = low, 0.0
+        std = 0.0 if count < 2 else math.sqrt(max(m2, 0.0) / (count - 1))
+        out[:, i] = (
+            mean,
+            std,
+            low,
+            high,
+            (x - mean) / std if std > 0 else math.nan,
+            100.0 * bisect_right(ordered, x) / count,
+        )
+    return RollingStats(counts, *out)
+
+
+def latest(values: Sequence[float], window: int) -> Optional[RollingPoint]:
+    """Statistics of the last `window` values only (None when there are none)."""
+    if not len(values):
+        return None
+    recent = values[-window:]
+    return rolling_stats(recent, window, min_periods=1).at(len(recent) - 1)
+
+
+def parse_specs(specs: Iterable[str]) -> List[Tuple[str, str, int]]:
+    """Parse tokens like `z20` into `(token, stat, window)`; raises ValueError on bad input."""
+    parsed = []
+    for token in specs:
+        token = token.strip().lower()
+        if not token:
+            continue
+        match = _SPEC.match(token)
+        if not match:
+            raise ValueError(f"Unknown statistic: {token} (expected one of {', '.join(STATS)} followed by a window, e.g. z20)")
+        window = int(match.group(2))
+        if not 2 <= window <= MAX_WINDOW:
+            raise ValueError(f"Window out of range in {token}: must be between 2 and {MAX_WINDOW}")
+        parsed.append((token, match.group(1), window))
+    return parsed
+
+
+def rolling_series(series: TimeSeries, stat: str, window: int) -> TimeSeries:
+    """One statistic as a series, from the first point with a full window on."""
+    values = getattr(rolling_stats(series.values, window, min_periods=window), stat)
+    keep = ~np.isnan(values)
+    return TimeSeries.from_arrays(series.dates[keep], values[keep])
@@ -0,0 +1,165 @@
+"""Compact array-backed time series used on the service hot path.
+
+A `TimeSeries` holds two parallel NumPy arrays: dates as int32 day ordinals
+(`date.toordinal()`) and values as float64, sorted by date. Series move between
+the source adapters, the caches and the indicator engine in this form and only
+become `{"date": "YYYY-MM-DD", "value": float}` dicts at the API edge.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+DATE_DTYPE = np.dtype("<i4")
+VALUE_DTYPE = np.dtype("<f8")
+
+DateLike = Union[str, date, int]
+
+
+def to_ordinal(d: DateLike) -> int:
+    """Day ordinal of an ISO date string, a date, or an ordinal."""
+    if isinstance(d, str):
+        return date.fromisoformat(d).toordinal()
+    if isinstance(d, date):
+        return d.toordinal()
+    return int(d)
+
+
+def iso(ordinal: int) -> str:
+    return date.fromordinal(int(ordinal)).isoformat()
+
+
+def week_start(ordinal: int) -> int:
+    """Monday of the ISO week containing the day (ordinal 1 is a Monday); also element-wise on arrays."""
+    return ordinal - (ordinal - 1) % 7
+
+
+def week_ending_friday(ordinal: int) -> int:
+    """Friday on or after the day, weekends rolling to the next one; also element-wise on arrays."""
+    return ordinal + (4 - (ordinal - 1) % 7) % 7
+
+
+class TimeSeries:
+    """Sorted (date ordinal, value) pairs stored as two NumPy arrays."""
+
+    __slots__ = ("dates", "values")
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray):
+        self.dates = dates
+        self.values = values
+
+    @classmethod
+    def empty(cls) -> "TimeSeries":
+        return cls(np.empty(0, DATE_DTYPE), np.empty(0, VALUE_DTYPE))
+
+    @classmethod
+    def from_arrays(cls, dates: Iterable[int], values: Iterable[float]) -> "TimeSeries":
+        """Wrap already sorted ordinals and values, coercing to the column dtypes."""
+        return cls(np.asarray(dates, DATE_DTYPE), np.asarray(values, VALUE_DTYPE))
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[DateLike, float]], sort: bool = True) -> "TimeSeries":
+        """Build from (date, value) pairs; later duplicates of a date win."""
+        ordinals: List[int] = []
+        values: List[float] = []
+        for d, v in pairs:
+            ordinals.append(to_ordinal(d))
+            values.append(float(v))
+        ts = cls(np.array(ordinals, DATE_DTYPE), np.array(values, VALUE_DTYPE))
+        return ts.sorted() if sort else ts
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]], sort: bool = True) -> "TimeSeries":
+        return cls.from_pairs(((i["date"], i["value"]) for i in items), sort=sort)
+
+    def sorted(self) -> "TimeSeries":
+        """Sort by date, keeping the last value for duplicate dates."""
+        if len(self.dates) < 2 or (np.all(np.diff(self.dates) > 0)):
+            return self
+        # Stable sort, then keep the last occurrence of each date
+        order = np.argsort(self.dates, kind="stable")
+        dates, values = self.dates[order], self.values[order]
+        last = np.append(dates[1:] != dates[:-1], True)
+        return TimeSeries(dates[last], values[last])
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __iter__(self) -> Iterator[Tuple[str, float]]:
+        for d, v in zip(self.dates.tolist(), self.values.tolist()):
+            yield iso(d), v
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TimeSeries):
+            return NotImplemented
+        return np.array_equal(self.dates, other.dates) and np.array_equal(self.values, other.values)
+
+    def __repr__(self) -> str:
+        span = f"{self.first_date}..{self.last_date}" if len(self) else "empty"
+        return f"TimeSeries({len(self)} points, {span})"
+
+    @property
+    def first_date(self) -> Optional[str]:
+        return iso(self.dates[0]) if len(self.dates) else None
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return iso(self.dates[-1]) if len(self.dates) else None
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.values.nbytes
+
+    def since(self, start: Optional[DateLike], lead: int = 0) -> "TimeSeries":
+        """Points dated `start` or later, plus the `lead` points before it (array views, no copy)."""
+        if start is None:
+            return self
+        lo = max(0, int(np.searchsorted(self.dates, to_ordinal(start), side="left")) - lead)
+        return TimeSeries(self.dates[lo:], self.values[lo:])
+
+    def after(self, last: Optional[DateLike]) -> "TimeSeries":
+        """Points dated strictly after `last` (array views, no copy)."""
+        if last is None:
+            return self
+        lo = int(np.searchsorted(self.dates, to_ordinal(last), side="right"))
+        return TimeSeries(self.dates[lo:], self.values[lo:])
+
+    def before(self, end: Optional[DateLike]) -> "TimeSeries":
+        """Points dated strictly before `end` (array views, no copy)."""
+        if end is None:
+            return self
+        hi = int(np.searchsorted(self.dates, to_ordinal(end), side="left"))
+        return TimeSeries(self.dates[:hi], self.values[:hi])
+
+    def scaled(self, factor: float) -> "TimeSeries":
+        return self if factor == 1 else TimeSeries(self.dates, self.values * factor)
+
+    def concat(self, tail: "TimeSeries") -> "TimeSeries":
+        """Append `tail` (caller guarantees it starts after this series ends)."""
+        if not len(tail):
+            return self
+        if not len(self):
+            return tail
+        return TimeSeries(np.concatenate([self.dates, tail.dates]), np.concatenate([self.values, tail.values]))
+
+    def upsert(self, other: "TimeSeries") -> "TimeSeries":
+        """Union by date, preferring `other` where both have a value."""
+        if not len(self):
+            return other
+        if not len(other):
+            return self
+        return TimeSeries(
+            np.concatenate([self.dates, other.dates]),
+            np.concatenate([self.values, other.values]),
+        ).sorted()
+
+    def to_items(self) -> List[Dict[str, Any]]:
+        """`[{"date": "YYYY-MM-DD", "value": float}, ...]` for the API edge."""
+        fromordinal = date.fromordinal
+        return [
+            {"date": fromordinal(d).isoformat(), "value": v}
+            for d, v in zip(self.dates.tolist(), self.values.tolist())
+        ]
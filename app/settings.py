@@ -15,7 +15,41 @@ class Settings(BaseSettings):
     # Cache config
     cache_disabled: bool = False  # set CACHE_DISABLED=true to disable
     cache_ttl_seconds: int = 3600  # 1 hour default
-    cache_dir: str = "./cache"  # directory for CSV cache files
+    cache_dir: str = "./cache"  # directory for L2 series files
+    cache_backend: str = "csv"  # L2 series store: "csv", "binary" (memory-mapped fixed-width records) or "sqlite" (WAL, multi-worker safe)
+    cache_swr_enabled: bool = True  # serve expired data while refreshing in background
+    cache_max_staleness_seconds: int = 86400  # seconds past expiry after which data forces a sync fetch
+    cache_max_entries: int = 256  # L1 entry limit (LRU eviction)
+    cache_max_bytes: int = 256 * 1024 * 1024  # L1 approximate size limit
+    cache_sweep_interval_seconds: int = 300  # how often L1 drops entries past the max staleness
+    cache_cadence_aware: bool = True  # expire series at their next expected release instead of the TTL
+    refresh_overlap_days: int = 7  # revision overlap re-requested on incremental refresh
+    
+    # Upstream HTTP pool config (one keep-alive pool per upstream host)
+    http_max_connections: int = 10
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = True  # used only when the `h2` package is installed
+    fiscaldata_page_concurrency: int = 8  # max FiscalData pages in flight per request
+    
+    # Upstream scheduler (per-host caps, rate budgets, retries, circuit breaker)
+    upstream_max_concurrency: int = 4  # requests in flight per host
+    upstream_rate_limits: str = "api.stlouisfed.org=2,api.fiscaldata.treasury.gov=10,www.financialresearch.gov=2"  # host=requests/sec
+    upstream_max_retries: int = 3  # retries on 429/5xx/timeouts
+    upstream_backoff_base_seconds: float = 0.5
+    upstream_backoff_max_seconds: float = 10.0
+    upstream_breaker_threshold: int = 5  # consecutive failed requests before failing fast
+    upstream_breaker_cooldown_seconds: float = 30.0
+    
+    # Release schedules (series_registry.yaml `release` blocks)
+    release_delay_minutes: int = 5  # expected lag between nominal release time and upstream update
+    release_window_minutes: int = 360  # after a release, upstream may still lag for this long
+    
+    # Release-driven background prefetch
+    prefetch_enabled: bool = True
+    prefetch_on_startup: bool = True  # on API start, fetch scheduled series whose stored copy has expired
+    prefetch_windows: str = "60,180"  # lookback days kept warm in L1 (briefs use 60, UI 180)
+    prefetch_retry_seconds: int = 600  # poll interval until new data appears (within release window)
     
     # CORS (comma-separated list of allowed origins)
     cors_origins: str = "http://localhost:3000,http://127.0.0.1:3000"
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from datetime import datetime
 from typing import Iterable, Dict, Any, Optional
-import httpx
 
 from app.settings import settings
+from app.sources import upstream
+from app.sources.http import get_client
 
 
 FRED_BASE = "https://api.stlouisfed.org/fred/series/observations"
@@ -35,7 +36,10 @@ async def fetch_series(
     if observation_end:
         params["observation_end"] = observation_end
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        r = await client.get(FRED_BASE, params=params)
+    async def request() -> Dict[str, Any]:
+        client = get_client(FRED_BASE)
+        r = await client.get(FRED_BASE, params=params, timeout=60.0)
         r.raise_for_status()
         return r.json()
+
+    return await upstream.call(FRED_BASE, request)
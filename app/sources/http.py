@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.settings import settings
+
+
+# Upstream hosts warmed up by the API lifespan hook
+UPSTREAM_HOSTS = (
+    "https://api.stlouisfed.org",
+    "https://api.fiscaldata.treasury.gov",
+    "https://www.financialresearch.gov",
+)
+
+
+class NotModified(Exception):
+    """Upstream content is unchanged since the stored validators."""
+
+
+# host -> (client, event loop the client was created on)
+_clients: Dict[str, Tuple[httpx.AsyncClient, Optional[asyncio.AbstractEventLoop]]] = {}
+
+
+def _http2_supported() -> bool:
+    """HTTP/2 needs the optional `h2` package (installed via httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _new_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    return httpx.AsyncClient(
+        http2=settings.http2_enabled and _http2_supported(),
+        limits=limits,
+        timeout=60.0,
+    )
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the shared keep-alive client for the host of `url`.
+
+    Clients are normally created by `open_clients()` at startup. Outside the API
+    (scripts, tests) they are created lazily; a client bound to another event
+    loop is replaced since its pooled connections cannot be reused.
+    """
+    key = _host_key(url)
+    loop = _running_loop()
+    entry = _clients.get(key)
+    if entry is not None:
+        client, client_loop = entry
+        if not client.is_closed and (client_loop is None or client_loop is loop):
+            return client
+    client = _new_client()
+    _clients[key] = (client, loop)
+    return client
+
+
+async def open_clients() -> None:
+    """Create one pooled client per known upstream host."""
+    for host in UPSTREAM_HOSTS:
+        get_client(host)
+
+
+async def close_clients() -> None:
+    """Close all pooled clients (called on API shutdown)."""
+    entries = list(_clients.values())
+    _clients.clear()
+    loop = _running_loop()
+    for client, client_loop in entries:
+        if client.is_closed or (client_loop is not None and client_loop is not loop):
+            continue
+        await client.aclose()
+
+
+def stats() -> Dict[str, Any]:
+    """Return pool configuration and open clients per host."""
+    return {
+        "hosts": sorted(_clients.keys()),
+        "http2": settings.http2_enabled and _http2_supported(),
+        "max_connections": settings.http_max_connections,
+        "max_keepalive_connections": settings.http_max_keepalive_connections,
+        "keepalive_expiry_seconds": settings.http_keepalive_expiry_seconds,
+    }
+
+
+def content_hash(body: bytes) -> str:
+    return content_hasher(body).hexdigest()
+
+
+def content_hasher(body: bytes = b"") -> "hashlib._Hash":
+    """Incremental form of `content_hash` for bodies read in chunks (`update` each, then `hexdigest`)."""
+    return hashlib.sha256(body)
+
+
+def conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from stored validators."""
+    headers: Dict[str, str] = {}
+    if not validators:
+        return headers
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(response: httpx.Response, body_hash: Optional[str] = None) -> Dict[str, str]:
+    """Extract validators to store next to a cached dataset."""
+    validators: Dict[str, str] = {}
+    if response.headers.get("etag"):
+        validators["etag"] = response.headers["etag"]
+    if response.headers.get("last-modified"):
+        validators["last_modified"] = response.headers["last-modified"]
+    if body_hash:
+        validators["content_hash"] = body_hash
+    return validators
+
@@ -1,72 +1,185 @@
 from __future__ import annotations
 
-from datetime import datetime, UTC
-from typing import Dict, Any, List, Optional
+from datetime import date, datetime, UTC
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import codecs
 import csv
 import io
+import tempfile
 
-import httpx
+from app.sources import upstream
+from app.sources.http import NotModified, conditional_headers, content_hasher, get_client, response_validators
+
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d")
+
+# Downloads larger than this are spooled to disk while they are hashed
+SPOOL_MAX_BYTES = 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
 
 
 async def fetch_liquidity_stress_csv(url: str, *, timeout_seconds: int = 30) -> str:
-	async with httpx.AsyncClient(timeout=timeout_seconds) as client:
-		r = await client.get(url)
+	async def request() -> str:
+		client = get_client(url)
+		r = await client.get(url, timeout=timeout_seconds)
 		r.raise_for_status()
 		return r.text
 
+	return await upstream.call(url, request)
 
-def parse_liquidity_stress_csv(csv_text: str) -> List[Dict[str, Any]]:
-	rows: List[Dict[str, Any]] = []
-	reader = csv.DictReader(io.StringIO(csv_text))
-
-	def norm(s: str) -> str:
-		return " ".join(s.strip().lower().replace("_", " ").split())
-
-	for raw in reader:
-		if not raw:
-			continue
-		# Date
-		date_key: Optional[str] = None
-		for k in raw.keys():
-			if norm(k) == "date" or norm(k) == "observation date":
-				date_key = k
-				break
-		if not date_key or not raw.get(date_key):
-			continue
-		obs_date = None
-		for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d"):
+
+def _norm(s: str) -> str:
+	return " ".join(s.strip().lower().replace("_", " ").split())
+
+
+def _date_parser(fmt: str) -> Callable[[str], date]:
+	if fmt == "%Y-%m-%d":
+		return date.fromisoformat
+	return lambda s: datetime.strptime(s, fmt).date()
+
+
+class FsiCsvParser:
+	"""Incremental parser for the OFR FSI CSV emitting (date, "OFR FSI") pairs.
+
+	The date/value column positions are resolved once from the header and the
+	date format once from the first dated row, so each later row costs one split,
+	one date parse and one float conversion.
+	"""
+
+	def __init__(self) -> None:
+		self._date_idx: Optional[int] = None
+		self._value_idx: Optional[int] = None
+		self._width = 0
+		self._header_seen = False
+		self._parse_date: Optional[Callable[[str], date]] = None
+
+	def _resolve_header(self, header: List[str]) -> None:
+		self._header_seen = True
+		for i, name in enumerate(header):
+			key = _norm(name)
+			if self._date_idx is None and key in ("date", "observation date"):
+				self._date_idx = i
+			# Value: strictly use the composite column "OFR FSI"
+			elif self._value_idx is None and key == "ofr fsi":
+				self._value_idx = i
+		if self._date_idx is not None and self._value_idx is not None:
+			self._width = max(self._date_idx, self._value_idx) + 1
+
+	def _resolve_date(self, raw: str) -> Optional[date]:
+		for fmt in DATE_FORMATS:
+			parse = _date_parser(fmt)
 			try:
-				obs_date = datetime.strptime(raw[date_key].strip(), fmt).date()
-				break
-			except Exception:
-				pass
-		if obs_date is None:
-			continue
-		# Value: strictly use the composite column "OFR FSI"
-		value_key: Optional[str] = None
-		for k in raw.keys():
-			if norm(k) == "ofr fsi":
-				value_key = k
-				break
-		if value_key is None:
-			continue
-		val_str = raw.get(value_key)
-		if val_str in (None, "", "."):
-			continue
-		try:
-			val_num = float(str(val_str).replace(",", ""))
-		except Exception:
-			continue
-		rows.append(
-			{
-				"observation_date": obs_date,
-				"vintage_date": None,
-				"publication_date": None,
-				"fetched_at": datetime.now(UTC),
-				"value_numeric": val_num,
-			}
-		)
-	return rows
+				obs_date = parse(raw)
+			except ValueError:
+				continue
+			self._parse_date = parse
+			return obs_date
+		return None
+
+	def feed(self, lines: Iterable[str]) -> Iterator[Tuple[date, float]]:
+		"""Parse complete CSV lines, yielding (observation_date, value) pairs."""
+		for row in csv.reader(lines):
+			if not row:
+				continue
+			if not self._header_seen:
+				self._resolve_header(row)
+				continue
+			if not self._width or len(row) < self._width:
+				continue
+			raw_date = row[self._date_idx].strip()
+			if not raw_date:
+				continue
+			obs_date: Optional[date] = None
+			if self._parse_date is not None:
+				try:
+					obs_date = self._parse_date(raw_date)
+				except ValueError:
+					obs_date = None
+			if obs_date is None:
+				obs_date = self._resolve_date(raw_date)
+				if obs_date is None:
+					continue
+			val_str = row[self._value_idx]
+			if val_str in ("", "."):
+				continue
+			try:
+				val_num = float(val_str.replace(",", ""))
+			except ValueError:
+				continue
+			yield obs_date, val_num
+
+
+def iter_liquidity_stress_points(lines: Iterable[str]) -> Iterator[Tuple[date, float]]:
+	"""Yield (observation_date, OFR FSI) pairs from an iterable of CSV lines."""
+	return FsiCsvParser().feed(lines)
+
+
+def parse_liquidity_stress_csv(csv_text: str) -> List[Dict[str, Any]]:
+	fetched_at = datetime.now(UTC)
+	return [
+		{
+			"observation_date": obs_date,
+			"vintage_date": None,
+			"publication_date": None,
+			"fetched_at": fetched_at,
+			"value_numeric": val_num,
+		}
+		for obs_date, val_num in iter_liquidity_stress_points(io.StringIO(csv_text))
+	]
+
+
+async def stream_liquidity_stress_points(
+	url: str,
+	validators: Optional[Dict[str, str]] = None,
+	*,
+	start: Optional[date] = None,
+	timeout_seconds: int = 30,
+) -> Tuple[List[Tuple[date, float]], Dict[str, str]]:
+	"""Download the FSI CSV and return its (date, value) pairs plus fresh validators.
+
+	Only points dated `start` or later are kept. Raises NotModified on a 304, or
+	when the body hash matches the stored `content_hash`. The body is hashed
+	chunk by chunk while it is spooled to a temporary file (in memory up to
+	SPOOL_MAX_BYTES), so an unchanged file is never parsed and peak memory does
+	not grow with the file; a changed one is parsed back from the spool.
+	"""
+	async def request() -> Tuple[List[Tuple[date, float]], Dict[str, str]]:
+		client = get_client(url)
+		async with client.stream("GET", url, headers=conditional_headers(validators), timeout=timeout_seconds) as r:
+			if r.status_code == 304:
+				raise NotModified(url)
+			r.raise_for_status()
+			with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+				hasher = content_hasher()
+				async for chunk in r.aiter_bytes():
+					hasher.update(chunk)
+					spool.write(chunk)
+				body_hash = hasher.hexdigest()
+				if validators and validators.get("content_hash") == body_hash:
+					raise NotModified(url)
+				spool.seek(0)
+				points = _parse_chunks(iter(lambda: spool.read(READ_CHUNK_BYTES), b""), start)
+			return points, response_validators(r, body_hash)
+
+	return await upstream.call(url, request)
+
 
+def _parse_chunks(chunks: Iterable[bytes], start: Optional[date] = None) -> List[Tuple[date, float]]:
+	"""Parse UTF-8 CSV bytes split at arbitrary points (lines may span chunks), keeping points from `start` on."""
+	parser = FsiCsvParser()
+	points: List[Tuple[date, float]] = []
+	decoder = codecs.getincrementaldecoder("utf-8-sig")()
+	pending = ""
 
+	def keep(lines: Iterable[str]) -> None:
+		points.extend(p for p in parser.feed(lines) if start is None or p[0] >= start)
 
+	for chunk in chunks:
+		pending += decoder.decode(chunk)
+		lines = pending.split("\n")
+		pending = lines.pop()
+		keep(lines)
+	pending += decoder.decode(b"", final=True)
+	if pending:
+		keep([pending])
+	return points
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional
+import asyncio
+import json
+import re
+from typing import Callable, Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Union
 import httpx
 
+from app.settings import settings
+from app.sources import upstream
+from app.sources.http import get_client
+
 
 DTS_TGA_URL = "https://api.fiscaldata.treasury.gov/services/api/fiscal_service/v1/accounting/dts/operating_cash_balance"
 TREASURY_AUCTIONS_URL = "https://api.fiscaldata.treasury.gov/services/api/fiscal_service/v1/accounting/od/auctions_query"
@@ -10,82 +17,264 @@ DTS_REDEMPTIONS_URL = "https://api.fiscaldata.treasury.gov/services/api/fiscal_s
 DTS_INTEREST_URL = "https://api.fiscaldata.treasury.gov/services/api/fiscal_service/v1/accounting/dts/deposits_withdrawals_operating_cash"
 
 
-async def fetch_tga_latest(limit: int = 1000, pages: int = 50) -> Dict[str, Any]:
-    combined: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for page in range(1, pages + 1):
-            params = {
-                "sort": "-record_date",
-                "page[number]": page,
-                "page[size]": limit,
-                "format": "json",
-                # Request documented fields; we'll filter in code to capture naming variants
-                "fields": "record_date,account_type,close_today_bal,open_today_bal",
-            }
+def is_tga_balance_row(row: Dict[str, Any]) -> bool:
+    """Operating cash balance row carrying the TGA level (naming changed over time).
+
+    Matches "Treasury General Account (TGA) Closing Balance" (newer), "Federal
+    Reserve Account" (older) and plain "Treasury General Account", by substring so
+    naming variants are kept; explicit Opening Balance rows are skipped.
+    """
+    account_type = (row.get("account_type") or "").lower()
+    if "opening balance" in account_type:
+        return False
+    return (
+        "closing balance" in account_type
+        or "federal reserve account" in account_type
+        or account_type == "treasury general account"
+    )
+
+
+_DATA_KEY = re.compile(r'"data"\s*:\s*\[')
+RowFilter = Callable[[Dict[str, Any]], bool]
+
+
+class FiscalDataDecoder:
+    """Incremental decoder for FiscalData pages shaped `{"data": [...], "meta": {...}}`.
+
+    Rows of the `data` array are decoded one object at a time as text arrives, so a
+    page never exists in memory as a full parsed document; the rest of the envelope
+    (meta, links) is parsed once the stream ends.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._head = ""
+        self._state = "head"  # head -> rows -> tail
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Consume a text chunk and yield every row object completed by it."""
+        self._buf += text
+        if self._state == "head":
+            m = _DATA_KEY.search(self._buf)
+            if m is None:
+                return
+            self._head = self._buf[:m.start()]
+            self._buf = self._buf[m.end():]
+            self._state = "rows"
+        if self._state != "rows":
+            return
+        buf = self._buf
+        pos = 0
+        n = len(buf)
+        while True:
+            while pos < n and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= n:
+                break
+            if buf[pos] == "]":
+                self._state = "tail"
+                pos += 1
+                break
             try:
-                r = await client.get(DTS_TGA_URL, params=params)
-                r.raise_for_status()
-                js = r.json()
-                data = js.get("data", [])
-                if not data:
-                    break
-                combined.extend(data)
-                if len(data) < limit:
-                    break
-            except httpx.HTTPStatusError as e:
-                # 400/404 often indicates end of pagination for Treasury API
-                if e.response.status_code in (400, 404):
-                    break
-                raise e
-    return {"data": combined}
-
-
-async def fetch_dts_cash_timeseries(url: str, limit: int = 1000, pages: int = 50, fields: Optional[str] = None, extra_params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+                row, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # object split across chunks; wait for more text
+            pos = end
+            yield row
+        self._buf = buf[pos:]
+
+    def envelope(self) -> Dict[str, Any]:
+        """Return the document without `data` (call after the last chunk)."""
+        if self._state == "head":
+            # No data array at all (e.g. an error document)
+            return json.loads(self._buf) if self._buf.strip() else {}
+        if self._state != "tail":
+            raise ValueError("Truncated FiscalData response")
+        head = self._head.strip()[1:].strip().rstrip(",").strip()
+        tail = self._buf.strip()
+        if tail.endswith("}"):
+            tail = tail[:-1]
+        tail = tail.strip().lstrip(",").strip()
+        return json.loads("{" + ",".join(p for p in (head, tail) if p) + "}")
+
+
+class _Page(NamedTuple):
+    rows: List[Dict[str, Any]]  # kept (filtered, projected) rows
+    count: int  # rows returned by the API before filtering
+    meta: Dict[str, Any]
+
+
+async def _fetch_pages(
+    url: str,
+    params: Dict[str, Any],
+    limit: int,
+    pages: int,
+    keep: Optional[RowFilter] = None,
+) -> List[Dict[str, Any]]:
+    """Fetch up to `pages` FiscalData pages and return their rows in page order.
+
+    Page 1 is fetched alone; its `meta.total-pages` (or `total-count`) tells how many
+    pages remain, and those are fetched concurrently with at most
+    `settings.fiscaldata_page_concurrency` requests in flight. Responses without
+    pagination meta fall back to sequential paging.
+
+    Each page is stream-decoded: rows failing `keep` are dropped as they are read and
+    kept rows are trimmed to the requested `fields`.
+    """
+    client = get_client(url)
+    fields = tuple(f for f in (params.get("fields") or "").split(",") if f)
+
+    async def read_page(page: int) -> _Page:
+        page_params = {**params, "page[number]": page, "page[size]": limit}
+        async with client.stream("GET", url, params=page_params, timeout=60.0) as r:
+            r.raise_for_status()
+            decoder = FiscalDataDecoder()
+            rows: List[Dict[str, Any]] = []
+            count = 0
+            async for text in r.aiter_text():
+                for row in decoder.feed(text):
+                    count += 1
+                    if keep is not None and not keep(row):
+                        continue
+                    if fields:
+                        row = {f: row.get(f) for f in fields}
+                    rows.append(row)
+            return _Page(rows, count, decoder.envelope().get("meta") or {})
+
+    async def get_page(page: int) -> Optional[_Page]:
+        try:
+            return await upstream.call(url, lambda: read_page(page))
+        except httpx.HTTPStatusError as e:
+            # 400/404 past page 1 often indicates end of pagination for Treasury API;
+            # on page 1 it is a rejected request and must surface
+            if page > 1 and e.response.status_code in (400, 404):
+                return None
+            raise e
+
+    first = await get_page(1)
+    if first is None:
+        return []
+    combined: List[Dict[str, Any]] = list(first.rows)
+    if pages <= 1 or first.count < limit:
+        return combined
+
+    total_pages = _total_pages(first.meta, limit)
+    if total_pages is None:
+        for page in range(2, pages + 1):
+            result = await get_page(page)
+            if result is None or not result.count:
+                break
+            combined.extend(result.rows)
+            if result.count < limit:
+                break
+        return combined
+
+    semaphore = asyncio.Semaphore(max(1, settings.fiscaldata_page_concurrency))
+
+    async def get_page_bounded(page: int) -> Optional[_Page]:
+        async with semaphore:
+            return await get_page(page)
+
+    last_page = min(pages, total_pages)
+    results = await asyncio.gather(*(get_page_bounded(p) for p in range(2, last_page + 1)))
+    for result in results:
+        if result is None or not result.count:
+            break
+        combined.extend(result.rows)
+    return combined
+
+
+def _total_pages(meta: Optional[Dict[str, Any]], limit: int) -> Optional[int]:
+    """Read the page count from FiscalData `meta` (None when absent)."""
+    if not meta:
+        return None
+    try:
+        if meta.get("total-pages") is not None:
+            return int(meta["total-pages"])
+        if meta.get("total-count") is not None:
+            return -(-int(meta["total-count"]) // limit)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def build_filter(*clauses: Optional[str]) -> Optional[str]:
+    """Join FiscalData filter clauses (e.g. `record_date:gte:2025-01-01`), skipping empty ones."""
+    parts = [c for c in clauses if c]
+    return ",".join(parts) if parts else None
+
+
+def _since_clause(field: str, start_date: Optional[str]) -> Optional[str]:
+    return f"{field}:gte:{start_date}" if start_date else None
+
+
+def _after_clause(field: str, after_date: Optional[str]) -> Optional[str]:
+    return f"{field}:gt:{after_date}" if after_date else None
+
+
+async def fetch_tga_latest(limit: int = 1000, pages: int = 50, start_date: Optional[str] = None, tga_only: bool = False, after_date: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch DTS operating cash balance rows, newest first.
+
+    `start_date` and `after_date` (incremental refresh) are pushed to the API as
+    `filter=` clauses so the payload scales with the requested window instead of
+    the page count. With `tga_only`, rows other than TGA balances
+    (`is_tga_balance_row`) are dropped while the pages are decoded; the account
+    name is matched in code because it varies over time.
+    """
+    params: Dict[str, Any] = {
+        "sort": "-record_date",
+        "format": "json",
+        # Request documented fields; we'll filter in code to capture naming variants
+        "fields": "record_date,account_type,close_today_bal,open_today_bal",
+    }
+    flt = build_filter(
+        _since_clause("record_date", start_date),
+        _after_clause("record_date", after_date),
+    )
+    if flt:
+        params["filter"] = flt
+    keep = is_tga_balance_row if tga_only else None
+    return {"data": await _fetch_pages(DTS_TGA_URL, params, limit, pages, keep=keep)}
+
+
+async def fetch_dts_cash_timeseries(url: str, limit: int = 1000, pages: int = 50, fields: Optional[str] = None, extra_params: Optional[Dict[str, str]] = None, filter: Optional[str] = None, keep: Optional[RowFilter] = None) -> Dict[str, Any]:
     """Generic DTS fetcher for cash line items (e.g., redemptions, interest outlays).
 
-    Keeps params minimal for compatibility across DTS endpoints.
+    Keeps params minimal for compatibility across DTS endpoints; `filter` is passed
+    through as the FiscalData `filter=` expression and `keep` drops rows while the
+    pages are decoded.
     """
-    combined: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for page in range(1, pages + 1):
-            params: Dict[str, Any] = {
-                "sort": "-record_date",
-                "page[number]": page,
-                "page[size]": limit,
-                "format": "json",
-            }
-            if fields:
-                params["fields"] = fields
-            if extra_params:
-                params.update(extra_params)
-            try:
-                r = await client.get(url, params=params)
-                r.raise_for_status()
-                js = r.json()
-                data = js.get("data", [])
-                if not data:
-                    break
-                combined.extend(data)
-                if len(data) < limit:
-                    break
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code in (400, 404):
-                    break
-                raise e
-    return {"data": combined}
-
-
-async def fetch_redemptions(limit: int = 1000, pages: int = 50) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "sort": "-record_date",
+        "format": "json",
+    }
+    if fields:
+        params["fields"] = fields
+    if filter:
+        params["filter"] = filter
+    if extra_params:
+        params.update(extra_params)
+    return {"data": await _fetch_pages(url, params, limit, pages, keep=keep)}
+
+
+async def fetch_redemptions(limit: int = 1000, pages: int = 50, start_date: Optional[str] = None, after_date: Optional[str] = None) -> Dict[str, Any]:
     # Public Debt Transactions (DTS): daily issues/redemptions by type; sum all redemptions per day
     return await fetch_dts_cash_timeseries(
         DTS_REDEMPTIONS_URL,
         limit=limit,
         pages=pages,
         fields="record_date,transaction_type,transaction_today_amt,security_market,security_type,security_type_desc",
+        filter=build_filter(
+            _since_clause("record_date", start_date),
+            _after_clause("record_date", after_date),
+            "transaction_type:eq:Redemptions",
+        ),
+        keep=is_redemption_row,
     )
 
 
-async def fetch_interest_outlays(limit: int = 1000, pages: int = 50) -> Dict[str, Any]:
+async def fetch_interest_outlays(limit: int = 1000, pages: int = 50, start_date: Optional[str] = None, after_date: Optional[str] = None) -> Dict[str, Any]:
     # Deposits and Withdrawals of Operating Cash (Table II): daily cash flows
     # We'll request minimal fields and filter in code for the Interest withdrawals line
     return await fetch_dts_cash_timeseries(
@@ -93,6 +282,12 @@ async def fetch_interest_outlays(limit: int = 1000, pages: int = 50) -> Dict[str
         limit=limit,
         pages=pages,
         fields="record_date,transaction_type,transaction_catg,transaction_catg_desc,transaction_today_amt",
+        filter=build_filter(
+            _since_clause("record_date", start_date),
+            _after_clause("record_date", after_date),
+            "transaction_type:eq:Withdrawals",
+        ),
+        keep=is_interest_row,
     )
 
 
@@ -105,25 +300,53 @@ def _parse_dts_numeric(val: Any) -> Optional[float]:
         return None
 
 
-def parse_redemptions_rows(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-    from datetime import datetime, UTC
+def _iter_rows(payload: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> Iterable[Dict[str, Any]]:
+    """Accept either a `{"data": [...]}` payload or an iterator of rows."""
+    if isinstance(payload, dict):
+        return payload.get("data", [])
+    return payload
+
+
+def is_redemption_row(r: Dict[str, Any]) -> bool:
+    """Public-facing redemption line (marketable, or nonmarketable savings)."""
+    if (r.get("transaction_type") or "").lower() != "redemptions":
+        return False
+    # Include rows even if security metadata fields are missing; tests expect simple summation by date.
+    market = (r.get("security_market") or "").strip().lower()
+    stype = (r.get("security_type") or "").strip().lower()
+    # If metadata present, apply public-facing filter; otherwise include.
+    if market or stype:
+        return (market == "marketable") or (market == "nonmarketable" and "savings" in stype)
+    return True
+
+
+def _interest_category(r: Dict[str, Any]) -> str:
+    # Prefer description; fallback to category text
+    cat_desc = (r.get("transaction_catg_desc") or "").strip()
+    # Some DTS APIs return the literal string "null" instead of JSON null
+    if cat_desc.lower() == "null":
+        cat_desc = ""
+    return cat_desc or (r.get("transaction_catg") or "").strip()
+
+
+def is_interest_row(r: Dict[str, Any]) -> bool:
+    """Withdrawals line for interest on Treasury securities."""
+    if (r.get("transaction_type") or "").lower() != "withdrawals":
+        return False
+    # Broad match: handle "Interest on Treasury Securities"/"Interest on Treasury Debt Securities"
+    return _interest_category(r).lower().startswith("interest on treasury")
+
+
+def parse_redemptions_rows(payload: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    from datetime import date, datetime, UTC
     totals_by_date: Dict[Any, float] = {}
-    for r in payload.get("data", []):
-        if (r.get("transaction_type") or "").lower() != "redemptions":
-            continue
-        # Include rows even if security metadata fields are missing; tests expect simple summation by date.
-        market = (r.get("security_market") or "").strip().lower()
-        stype = (r.get("security_type") or "").strip().lower()
-        # If metadata present, apply public-facing filter; otherwise include.
-        include = True
-        if market or stype:
-            include = (market == "marketable") or (market == "nonmarketable" and "savings" in stype)
-        if not include:
+    for r in _iter_rows(payload):
+        if not is_redemption_row(r):
             continue
         num = _parse_dts_numeric(r.get("transaction_today_amt"))
         if num is None:
             continue
-        odate = datetime.strptime(r["record_date"], "%Y-%m-%d").date()
+        odate = date.fromisoformat(r["record_date"])
         totals_by_date[odate] = totals_by_date.get(odate, 0.0) + num
     rows: List[Dict[str, Any]] = []
     now = datetime.now(UTC)
@@ -140,30 +363,17 @@ def parse_redemptions_rows(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
     return rows
 
 
-def parse_interest_rows(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
-    from datetime import datetime, UTC
+def parse_interest_rows(payload: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    from datetime import date, datetime, UTC
     out_by_date: Dict[Any, float] = {}
-    for r in payload.get("data", []):
-        if (r.get("transaction_type") or "").lower() != "withdrawals":
-            continue
-        # Prefer description; fallback to category text
-        cat_desc_raw = r.get("transaction_catg_desc")
-        cat_desc = (cat_desc_raw or "").strip()
-        # Some DTS APIs return the literal string "null" instead of JSON null
-        if cat_desc.lower() == "null":
-            cat_desc = ""
-        cat_raw = (r.get("transaction_catg") or "").strip()
-        text = cat_desc or cat_raw
-        lower_text = text.lower()
-        # Broad match: handle "Interest on Treasury Securities"/"Interest on Treasury Debt Securities"
-        is_interest = lower_text.startswith("interest on treasury")
-        is_gross = "(Gross)" in cat_desc
-        if not is_interest:
+    for r in _iter_rows(payload):
+        if not is_interest_row(r):
             continue
+        is_gross = "(Gross)" in (r.get("transaction_catg_desc") or "")
         num = _parse_dts_numeric(r.get("transaction_today_amt"))
         if num is None:
             continue
-        odate = datetime.strptime(r["record_date"], "%Y-%m-%d").date()
+        odate = date.fromisoformat(r["record_date"])
         # If multiple lines present (e.g., gross and net), keep gross; else keep first seen
         if odate not in out_by_date or is_gross:
             out_by_date[odate] = num
@@ -187,41 +397,23 @@ async def fetch_auction_schedules(limit: int = 1000, pages: int = 50, start_date
 
     Dataset fields vary; we request a broad set and filter in code later.
     """
-    combined: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for page in range(1, pages + 1):
-            params = {
-                "sort": "-auction_date",
-                "page[number]": page,
-                "page[size]": limit,
-                "format": "json",
-                # Fields available in auctions_query (no settlement_date/awarded_amount in this dataset)
-                # We'll use issue_date as settlement proxy and offering_amt as size.
-                "fields": "security_type,security_term,auction_date,issue_date,offering_amt,total_accepted,maturity_date",
-            }
-            if start_date:
-                params["filter"] = f"auction_date:gte:{start_date}"
-            if end_date:
-                # FiscalData supports multiple filters with commas; keep simple for MVP
-                params["filter"] = (params.get("filter", "") + ("," if params.get("filter") else "")) + f"auction_date:lte:{end_date}"
-            try:
-                r = await client.get(TREASURY_AUCTIONS_URL, params=params)
-                r.raise_for_status()
-                js = r.json()
-                data = js.get("data", [])
-                if not data:
-                    break
-                combined.extend(data)
-                if len(data) < limit:
-                    break
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code in (400, 404):
-                    break
-                raise e
-    return {"data": combined}
-
-
-def parse_auction_rows(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {
+        "sort": "-auction_date",
+        "format": "json",
+        # Fields available in auctions_query (no settlement_date/awarded_amount in this dataset)
+        # We'll use issue_date as settlement proxy and offering_amt as size.
+        "fields": "security_type,security_term,auction_date,issue_date,offering_amt,total_accepted,maturity_date",
+    }
+    flt = build_filter(
+        _since_clause("auction_date", start_date),
+        f"auction_date:lte:{end_date}" if end_date else None,
+    )
+    if flt:
+        params["filter"] = flt
+    return {"data": await _fetch_pages(TREASURY_AUCTIONS_URL, params, limit, pages)}
+
+
+def parse_auction_rows(payload: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
     """Normalize Treasury auctions rows for downstream supply calculators.
 
     Output fields (per row):
@@ -234,7 +426,7 @@ def parse_auction_rows(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
     - is_bill (bool)
     - is_coupon (bool)
     """
-    data = payload.get("data", [])
+    data = _iter_rows(payload)
     out: List[Dict[str, Any]] = []
     from datetime import datetime
 
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.settings import settings
+
+
+T = TypeVar("T")
+
+# Status codes worth retrying: throttling and server-side failures
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling upstream while a host's circuit breaker is open."""
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse "host=rate,host=rate" (requests per second) from settings."""
+    limits: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        host, rate = part.split("=", 1)
+        try:
+            limits[host.strip()] = float(rate)
+        except ValueError:
+            continue
+    return limits
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS
+    return isinstance(exc, (httpx.TimeoutException, httpx.TransportError))
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens/sec up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostScheduler:
+    """Concurrency cap, rate budget, retries and circuit breaker for one upstream host."""
+
+    def __init__(self, host: str, max_concurrency: int, rate: Optional[float]):
+        self.host = host
+        self.max_concurrency = max(1, max_concurrency)
+        self.bucket = TokenBucket(rate, rate) if rate else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Breaker state
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        # Metrics
+        self.queued = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores bind to an event loop; recreate when called from a new one
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= settings.upstream_breaker_cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        if isinstance(exc, httpx.HTTPStatusError):
+            retry_after = exc.response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), settings.upstream_backoff_max_seconds)
+        base = settings.upstream_backoff_base_seconds * (2 ** attempt)
+        # Full jitter
+        return random.uniform(0, min(base, settings.upstream_backoff_max_seconds))
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        semaphore = self._get_semaphore()
+        t0 = time.monotonic()
+        self.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            waited = time.monotonic() - t0
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                return await fn()
+            finally:
+                self.in_flight -= 1
+        finally:
+            semaphore.release()
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run an upstream call under this host's budget, retrying transient errors."""
+        state = self.state
+        if state == "open":
+            self.rejected += 1
+            raise UpstreamUnavailable(f"Circuit open for {self.host}")
+        attempts = 1 if state == "half_open" else settings.upstream_max_retries + 1
+        for attempt in range(attempts):
+            try:
+                result = await self._attempt(fn)
+            except Exception as exc:
+                if not _is_retryable(exc):
+                    # Host answered (4xx, not modified, parse error): breaker unaffected
+                    self._record_success()
+                    raise
+                if attempt + 1 >= attempts:
+                    self._record_failure()
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, exc))
+            else:
+                self._record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    def _record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def _record_failure(self) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= settings.upstream_breaker_threshold:
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "max_concurrency": self.max_concurrency,
+            "rate_per_second": self.bucket.rate if self.bucket else None,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "consecutive_failures": self.consecutive_failures,
+            "avg_wait_ms": round(1000 * self.wait_total / self.requests, 1) if self.requests else 0.0,
+            "max_wait_ms": round(1000 * self.wait_max, 1),
+        }
+
+
+_schedulers: Dict[str, HostScheduler] = {}
+
+
+def scheduler_for(url: str) -> HostScheduler:
+    host = urlsplit(url).netloc
+    scheduler = _schedulers.get(host)
+    if scheduler is None:
+        rate = _parse_rate_limits(settings.upstream_rate_limits).get(host)
+        scheduler = HostScheduler(host, settings.upstream_max_concurrency, rate)
+        _schedulers[host] = scheduler
+    return scheduler
+
+
+async def call(url: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """Run `fn` (one upstream request to the host of `url`) through its scheduler."""
+    return await scheduler_for(url).run(fn)
+
+
+def reset() -> None:
+    """Drop all per-host state (tests, settings reload)."""
+    _schedulers.clear()
+
+
+def stats() -> Dict[str, Any]:
+    return {host: s.stats() for host, s in sorted(_schedulers.items())}
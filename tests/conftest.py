@@ -8,3 +8,21 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 
+
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _fast_upstream(monkeypatch):
+    """Isolate upstream scheduler state per test and skip real backoff/rate waits."""
+    from app.settings import settings
+    from app.sources import upstream
+
+    monkeypatch.setattr(settings, "upstream_rate_limits", "")
+    monkeypatch.setattr(settings, "upstream_backoff_base_seconds", 0.0)
+    # No release-driven prefetch from the API lifespan during tests
+    monkeypatch.setattr(settings, "prefetch_enabled", False)
+    upstream.reset()
+    yield
+    upstream.reset()
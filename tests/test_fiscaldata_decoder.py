@@ -0,0 +1,62 @@
+import json
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+from app.sources.treasury import DTS_REDEMPTIONS_URL, FiscalDataDecoder, fetch_redemptions, parse_redemptions_rows
+
+
+def _decode(body: str, chunk: int):
+    decoder = FiscalDataDecoder()
+    rows = []
+    for i in range(0, len(body), chunk):
+        rows.extend(decoder.feed(body[i:i + chunk]))
+    return rows, decoder.envelope()
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 64, 10_000])
+def test_decoder_yields_rows_across_chunk_boundaries(chunk):
+    doc = {
+        "data": [{"record_date": f"2025-08-{d:02d}", "note": "a, ] { tricky"} for d in range(1, 6)],
+        "meta": {"total-pages": 3, "labels": {"data": "x"}},
+        "links": {"next": "&page%5Bnumber%5D=2"},
+    }
+    rows, envelope = _decode(json.dumps(doc, indent=1), chunk)
+    assert rows == doc["data"]
+    assert envelope == {"meta": doc["meta"], "links": doc["links"]}
+
+
+def test_decoder_handles_meta_before_data_and_empty_data():
+    rows, envelope = _decode('{"meta": {"total-count": 0}, "data": []}', 3)
+    assert rows == []
+    assert envelope == {"meta": {"total-count": 0}}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_redemptions_drops_rows_while_decoding():
+    payload = {
+        "data": [
+            {"record_date": "2025-08-13", "transaction_type": "Issues", "transaction_today_amt": "100", "extra": "x"},
+            {"record_date": "2025-08-13", "transaction_type": "Redemptions", "transaction_today_amt": "30", "extra": "x"},
+            {"record_date": "2025-08-14", "transaction_type": "Redemptions", "security_market": "Nonmarketable",
+             "security_type": "Government Account Series", "transaction_today_amt": "999"},
+        ],
+        "meta": {"total-pages": 1},
+    }
+    body = json.dumps(payload).encode()
+
+    class Chunked(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(0, len(body), 11):
+                yield body[i:i + 11]
+
+    respx.get(DTS_REDEMPTIONS_URL).mock(return_value=Response(200, stream=Chunked()))
+
+    data = await fetch_redemptions(limit=10)
+    assert len(data["data"]) == 1
+    assert "extra" not in data["data"][0]
+    rows = parse_redemptions_rows(iter(data["data"]))
+    assert [(str(r["observation_date"]), r["value_numeric"]) for r in rows] == [("2025-08-13", 30.0)]
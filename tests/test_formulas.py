@@ -0,0 +1,58 @@
+import pytest
+
+from app.registry_loader import INDICATOR_REGISTRY
+from app.services.formulas import compile_formula, compile_registry, plan_for
+from app.services.timeseries import TimeSeries
+
+
+A = TimeSeries.from_pairs([("2025-01-01", 10.0), ("2025-01-02", 20.0), ("2025-01-03", 30.0)])
+B = TimeSeries.from_pairs([("2025-01-02", 2.0), ("2025-01-03", 0.0), ("2025-01-04", 4.0)])
+
+
+def test_registry_formulas_compile_with_exact_inputs():
+    plans = compile_registry(INDICATOR_REGISTRY)
+    assert plans["net_liq"].inputs == ("WALCL", "TGA", "RRPONTSYD")
+    assert plans["bill_share_w"].inputs == ("UST_BILL_SHARE",)
+    assert plans["ust_redemptions_w"].inputs == ("UST_REDEMPTIONS",)
+    assert plans["bill_iorb"].inputs == ("DTB4WK", "DTB3", "IORB")
+
+
+def test_registry_series_lists_must_match_formula_inputs():
+    with pytest.raises(ValueError, match="UST_AUCTION_ISSUES"):
+        compile_registry([{"id": "x", "series": ["UST_AUCTION_ISSUES"], "formula": "UST_BILL_SHARE"}])
+
+
+def test_arithmetic_inner_joins_and_drops_invalid_points():
+    assert list(compile_formula("A - B").evaluate({"A": A, "B": B})) == [("2025-01-02", 18.0), ("2025-01-03", 30.0)]
+    # Division by zero drops the point instead of emitting inf
+    assert list(compile_formula("(A / B) * 100").evaluate({"A": A, "B": B})) == [("2025-01-02", 1000.0)]
+    assert list(compile_formula("-A + 1").evaluate({"A": A}))[0] == ("2025-01-01", -9.0)
+
+
+def test_ffill_takes_dates_of_the_other_operands():
+    weekly = TimeSeries.from_pairs([("2025-01-02", 100.0)])
+    result = compile_formula("ffill(W) - B").evaluate({"W": weekly, "B": B})
+    assert list(result) == [("2025-01-02", 98.0), ("2025-01-03", 100.0), ("2025-01-04", 96.0)]
+
+
+def test_functions_and_defaults():
+    assert list(compile_formula("delta(A, 2)").evaluate({"A": A})) == [("2025-01-03", 20.0)]
+    assert list(compile_formula("delta(A)").evaluate({"A": A}))[0] == ("2025-01-02", 10.0)
+    assert compile_formula("first_nonempty(X, A)").evaluate({"A": A}) == A
+    assert len(compile_formula("weekly_sum(A)").evaluate({})) == 0
+    assert plan_for({"id": "x", "series": ["X", "A"]}).formula == "first_nonempty(X, A)"
+
+
+@pytest.mark.parametrize("formula", [
+    "A +",
+    "A ** 2",
+    "unknown(A)",
+    "delta(5, A)",
+    "spread(A)",
+    "ffill(A) + 1",
+    "__import__('os')",
+    "A.values",
+])
+def test_invalid_formulas_are_rejected(formula):
+    with pytest.raises(ValueError):
+        compile_formula(formula)
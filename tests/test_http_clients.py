@@ -0,0 +1,30 @@
+import pytest
+import respx
+from httpx import Response
+
+from app.sources import http
+from app.sources.fred import FRED_BASE, fetch_series
+
+
+@pytest.mark.asyncio
+async def test_get_client_reuses_one_pool_per_host():
+    a = http.get_client("https://api.fiscaldata.treasury.gov/services/api/x")
+    b = http.get_client("https://api.fiscaldata.treasury.gov/services/api/y")
+    c = http.get_client(FRED_BASE)
+    assert a is b
+    assert a is not c
+    await http.close_clients()
+    assert a.is_closed and c.is_closed
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_adapter_calls_share_client():
+    respx.get(FRED_BASE).mock(return_value=Response(200, json={"observations": []}))
+    await http.open_clients()
+    client = http.get_client(FRED_BASE)
+    await fetch_series("WALCL")
+    await fetch_series("TGA")
+    assert http.get_client(FRED_BASE) is client
+    assert not client.is_closed
+    await http.close_clients()
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from app.registry_loader import INDICATOR_REGISTRY
+from app.services.formulas import compile_formula, plan_for
+from app.services.materialized import IndicatorStore, MaterializedIndicator
+from app.services.timeseries import TimeSeries
+
+
+START = 738000  # a Monday
+
+
+def _history(seed):
+    """Two years of synthetic inputs for every registry series, as (ordinal, value) pairs."""
+    rng = random.Random(seed)
+    days = range(START, START + 730)
+    business = [d for d in days if (d - START) % 7 < 5]
+    weekly = [d for d in days if (d - START) % 7 == 2]
+    sparse = lambda ds, p: [d for d in ds if rng.random() < p]
+    series = {
+        "WALCL": weekly, "RESPPLLOPNWW": weekly, "WSHOMCB": weekly, "UST_BILL_SHARE": weekly,
+        "TGA": sparse(business, 0.95), "RRPONTSYD": sparse(business, 0.9),
+        "SOFR": sparse(business, 0.97), "IORB": sparse(business, 0.97), "DTB3": sparse(business, 0.9),
+        "OFR_LIQ_IDX": business,
+        "UST_AUCTION_ISSUES": sparse(days, 0.3), "UST_REDEMPTIONS": sparse(days, 0.5), "UST_INTEREST": sparse(days, 0.4),
+    }
+    return {sid: [(d, round(rng.uniform(0, 100), 2)) for d in ds] for sid, ds in series.items()}
+
+
+def _upto(history, day):
+    return {
+        sid: TimeSeries.from_arrays([d for d, _ in pairs if d <= day], [v for d, v in pairs if d <= day])
+        for sid, pairs in history.items()
+    }
+
+
+@pytest.mark.parametrize("indicator", INDICATOR_REGISTRY, ids=lambda i: i["id"])
+def test_appends_match_full_recompute(indicator):
+    plan = plan_for(indicator)
+    history = _history(len(indicator["id"]))
+    materialized = MaterializedIndicator(plan)
+    modes = []
+    day = START + 600
+    while day < START + 730:
+        data = _upto(history, day)
+        modes.append(materialized.update(data))
+        assert materialized.output == plan.evaluate(data)
+        day += random.Random(day).choice([1, 1, 2, 3, 7])
+    assert modes[0] == "rebuilt"
+    assert modes.count("rebuilt") == 1 and "extended" in modes
+
+
+def test_unchanged_inputs_are_reused_and_revisions_rebuild():
+    plan = compile_formula("delta(A, 1)")
+    a = TimeSeries.from_pairs([("2025-01-0%d" % d, float(d * d)) for d in range(1, 8)])
+    store = IndicatorStore()
+
+    store.evaluate("x", plan, {"A": a})
+    store.evaluate("x", plan, {"A": TimeSeries.from_arrays(a.dates.copy(), a.values.copy())})
+    extended = a.concat(TimeSeries.from_pairs([("2025-01-08", 64.0)]))
+    assert store.evaluate("x", plan, {"A": extended}).last_date == "2025-01-08"
+
+    revised = extended.upsert(TimeSeries.from_pairs([("2025-01-02", 0.0)]))
+    output = store.evaluate("x", plan, {"A": revised})
+    assert output == plan.evaluate({"A": revised})
+    assert {k: store.counts[k] for k in ("reused", "extended", "rebuilt")} == {"reused": 1, "extended": 1, "rebuilt": 2}
@@ -0,0 +1,48 @@
+import time
+
+from app.services.cache import TTLCache
+
+
+def test_lru_eviction_by_entry_count():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_approximate_bytes():
+    cache = TTLCache(max_bytes=40_000)
+    cache.set("small", [1.0] * 10)
+    cache.set("big", [float(i) for i in range(1000)])
+    cache.set("big2", [float(i) for i in range(1000)])
+
+    stats = cache.stats()
+    assert stats["approx_bytes"] <= 40_000
+    assert cache.get("small") is None and cache.get("big") is None
+    assert cache.get("big2") is not None
+
+    cache.set("huge", [float(i) for i in range(10_000)])
+    assert cache.get("huge") is None
+    assert cache.get("big2") is not None
+
+
+def test_periodic_sweep_and_per_key_counters(monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "cache_max_staleness_seconds", 0)
+    cache = TTLCache(sweep_interval=0)
+    cache.set("old", 1, expires_at=time.time() - 10)
+    cache.set("fresh", 2)
+    assert cache.get("fresh") == 2
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert stats["total_entries"] == 1
+    assert stats["expired_swept"] == 1
+    assert stats["keys"]["fresh"]["hits"] == 1
+    assert stats["keys"]["missing"] == {"hits": 0, "misses": 1, "bytes": 0}
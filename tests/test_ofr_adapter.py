@@ -1,8 +1,13 @@
+from datetime import date
+
+import httpx
 import pytest
 import respx
 from httpx import Response
 
-from app.sources.ofr import fetch_liquidity_stress_csv, parse_liquidity_stress_csv
+from app.sources import ofr
+from app.sources.http import NotModified, content_hash
+from app.sources.ofr import fetch_liquidity_stress_csv, parse_liquidity_stress_csv, stream_liquidity_stress_points
 
 
 @pytest.mark.asyncio
@@ -41,3 +46,73 @@ def test_parse_liquidity_stress_csv_skips_missing_values():
     assert rows[0]["value_numeric"] == pytest.approx(1.00)
 
 
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_ofr_points_revalidates(monkeypatch):
+    url = "https://www.financialresearch.gov/financial-stress-index/data/fsi.csv"
+    csv_body = "Date,OFR FSI\n2025-08-10,1.23\n"
+    route = respx.get(url).mock(return_value=Response(200, text=csv_body, headers={"ETag": '"v1"'}))
+
+    points, validators = await stream_liquidity_stress_points(url)
+    assert [(d.isoformat(), v) for d, v in points] == [("2025-08-10", 1.23)]
+    assert validators["etag"] == '"v1"' and validators["content_hash"]
+
+    route.mock(return_value=Response(304))
+    with pytest.raises(NotModified):
+        await stream_liquidity_stress_points(url, validators)
+    assert route.calls.last.request.headers["If-None-Match"] == '"v1"'
+
+    # Server ignoring validators: identical body is detected by content hash, before any parsing
+    route.mock(return_value=Response(200, text=csv_body))
+    monkeypatch.setattr(ofr, "_parse_chunks", lambda *args: pytest.fail("parsed an unchanged body"))
+    with pytest.raises(NotModified):
+        await stream_liquidity_stress_points(url, {"content_hash": validators["content_hash"]})
+
+
+def test_chunks_split_mid_line_parse_like_the_whole_body():
+    chunks = [b"\xef\xbb\xbfDate,OFR FSI\n2025-08", b"-10,1.23\n2025-08-11,", b"2.5"]
+    assert [(d.isoformat(), v) for d, v in ofr._parse_chunks(chunks)] == [("2025-08-10", 1.23), ("2025-08-11", 2.5)]
+
+
+def test_parse_liquidity_stress_csv_resolves_layout_once_for_other_date_formats():
+    csv_body = (
+        "Observation_Date,Credit,OFR FSI\r\n"
+        "01/03/2000,0.54,2.14\r\n"
+        "01/04/2000,0.60,\"1,002.5\"\r\n"
+    )
+    rows = parse_liquidity_stress_csv(csv_body)
+    assert [r["observation_date"].isoformat() for r in rows] == ["2000-01-03", "2000-01-04"]
+    assert rows[1]["value_numeric"] == pytest.approx(1002.5)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_ofr_points_handles_chunk_boundaries():
+    url = "https://www.financialresearch.gov/financial-stress-index/data/fsi.csv"
+    body = b"Date,OFR FSI\n" + b"".join(f"2025-01-{d:02d},{d}.5\n".encode() for d in range(1, 29))
+
+    class Chunked(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(0, len(body), 7):
+                yield body[i:i + 7]
+
+    respx.get(url).mock(return_value=Response(200, stream=Chunked()))
+    points, _ = await stream_liquidity_stress_points(url)
+    assert len(points) == 28
+    assert points[-1][0].isoformat() == "2025-01-28" and points[-1][1] == 28.5
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_ofr_points_keeps_only_the_window_and_never_joins_the_body(monkeypatch):
+    url = "https://www.financialresearch.gov/financial-stress-index/data/fsi.csv"
+    body = b"Date,OFR FSI\n" + b"".join(f"2025-01-{d:02d},{d}.5\n".encode() for d in range(1, 29))
+    monkeypatch.setattr(ofr, "SPOOL_MAX_BYTES", 16)  # force the spool to disk
+    monkeypatch.setattr(ofr, "READ_CHUNK_BYTES", 5)
+
+    respx.get(url).mock(return_value=Response(200, content=body))
+    points, validators = await stream_liquidity_stress_points(url, start=date(2025, 1, 26))
+    assert [(d.isoformat(), v) for d, v in points] == [("2025-01-26", 26.5), ("2025-01-27", 27.5), ("2025-01-28", 28.5)]
+    assert validators["content_hash"] == content_hash(body)
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.registry_loader import INDICATOR_REGISTRY
+from app.services import market_data, planner
+from app.services.market_data import SeriesWindow
+from app.services.timeseries import TimeSeries
+
+
+def _window(sid, stale=False):
+    series = TimeSeries.from_pairs([("2025-01-0%d" % d, float(d)) for d in range(1, 9)])
+    return SeriesWindow(sid, "test", series, 60 if stale else None)
+
+
+def test_plan_expands_indicators_to_series_and_datasets():
+    plan = planner.build_plan(INDICATOR_REGISTRY)
+    assert "UST_BILL_SHARE" in plan.derived_series
+    assert {"WALCL", "TGA", "UST_AUCTION_ISSUES", "OFR_LIQ_IDX"} <= set(plan.raw_series)
+    assert plan.graph[("series", "UST_BILL_SHARE")] == {("series", "UST_AUCTION_ISSUES")}
+    assert plan.datasets["treasury:auctions"] == ["UST_AUCTION_ISSUES"]
+
+    order = plan.order()
+    assert order.index(("series", "UST_AUCTION_ISSUES")) < order.index(("series", "UST_BILL_SHARE"))
+    assert order.index(("series", "UST_BILL_SHARE")) < order.index(("indicator", "bill_share_w"))
+
+
+@pytest.mark.asyncio
+async def test_run_loads_each_series_once_and_raw_series_concurrently():
+    plan = planner.build_plan(INDICATOR_REGISTRY)
+    calls, in_flight, peak, loaded = [], [0], [0], set()
+
+    async def load(sid):
+        calls.append(sid)
+        for dep in planner.series_dependencies(sid):
+            assert dep in loaded
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        loaded.add(sid)
+        return _window(sid, stale=sid == "TGA")
+
+    results = await planner.run(plan, load)
+
+    assert sorted(calls) == sorted(sid for _, sid in plan.graph if _ == "series")
+    assert peak[0] == len(plan.raw_series)
+    assert set(results) == {i["id"] for i in INDICATOR_REGISTRY}
+    assert results["tga_delta"].stale and not results["sofr_iorb"].stale
+    assert len(results["tga_delta"].series) == 3
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_failures_to_dependents_only():
+    plan = planner.build_plan(INDICATOR_REGISTRY)
+    calls = []
+
+    async def load(sid):
+        calls.append(sid)
+        if sid == "UST_AUCTION_ISSUES":
+            raise RuntimeError("upstream down")
+        if sid == "SOFR":
+            raise ValueError("not configured")
+        return _window(sid)
+
+    results = await planner.run(plan, load)
+
+    assert "UST_BILL_SHARE" not in calls
+    assert isinstance(results["bill_share_w"], RuntimeError)
+    assert isinstance(results["ust_net_w"], RuntimeError)
+    assert len(results["sofr_iorb"].series) == 0
+    assert len(results["net_liq"].series) == 8
+
+
+@pytest.mark.asyncio
+async def test_get_indicators_live_shares_series_between_indicators(monkeypatch):
+    calls = []
+
+    async def fake_load(sid, days=180, lead_days=0):
+        calls.append(sid)
+        return _window(sid)
+
+    monkeypatch.setattr(market_data, "load_series", fake_load)
+
+    results = await market_data.get_indicators_live(["net_liq", "tga_delta", "rrp_delta"], days=3650)
+
+    assert sorted(calls) == ["RRPONTSYD", "TGA", "WALCL"]
+    assert results["tga_delta"]["items"][0] == {"date": "2025-01-06", "value": 5.0}
+    with pytest.raises(ValueError):
+        await market_data.get_indicator_live("nope")
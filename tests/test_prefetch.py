@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import pytest
+
+from app.services import market_data, prefetch
+from app.services.market_data import SeriesWindow
+from app.services.prefetch import Prefetcher
+from app.services.timeseries import TimeSeries
+
+
+def _window(series_id, date):
+    return SeriesWindow(series_id, "test", TimeSeries.from_pairs([(date, 1.0)]))
+
+
+@pytest.mark.asyncio
+async def test_refresh_until_new_retries_then_warms_dependents(monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "prefetch_retry_seconds", 0)
+    monkeypatch.setattr(settings, "prefetch_windows", "30")
+    monkeypatch.setattr(market_data.series_cache, "last_date", lambda sid: "2025-03-05")
+
+    tails = iter(["2025-03-05", "2025-03-05", "2025-03-12"])
+    refreshed, indicators = [], []
+
+    async def fake_refresh(series_id, days=180):
+        refreshed.append(series_id)
+        date = next(tails) if series_id == "UST_REDEMPTIONS" else "2025-03-12"
+        return _window(series_id, date)
+
+    async def fake_get_series(series_id, days=180):
+        return {"items": []}
+
+    async def fake_indicator(indicator_id, days=180):
+        indicators.append(indicator_id)
+        return {"items": []}
+
+    monkeypatch.setattr(market_data, "refresh_series", fake_refresh)
+    monkeypatch.setattr(market_data, "get_series", fake_get_series)
+    monkeypatch.setattr(market_data, "get_indicator_live", fake_indicator)
+
+    p = Prefetcher()
+    deadline = prefetch._now() + timedelta(minutes=5)
+    assert await p.refresh_until_new("UST_REDEMPTIONS", deadline) is True
+    assert refreshed.count("UST_REDEMPTIONS") == 3
+    assert "UST_REDEMPTIONS_W" in refreshed
+    assert {"ust_net_w", "ust_redemptions_w"} <= set(indicators)
+    assert p.stats()["last_new_data"] == {"UST_REDEMPTIONS": "2025-03-12"}
+
+
+@pytest.mark.asyncio
+async def test_refresh_until_new_gives_up_after_deadline(monkeypatch):
+    monkeypatch.setattr(market_data.series_cache, "last_date", lambda sid: "2025-03-05")
+
+    async def fake_refresh(series_id, days=180):
+        return _window(series_id, "2025-03-05")
+
+    monkeypatch.setattr(market_data, "refresh_series", fake_refresh)
+    monkeypatch.setattr(Prefetcher, "_warm", lambda self, sid, windows: _noop())
+
+    p = Prefetcher()
+    assert await p.refresh_until_new("TGA", deadline=prefetch._now()) is False
+    assert p.attempts == 1
+
+
+async def _noop():
+    return None
+
+
+class _Stop(Exception):
+    pass
+
+
+class _StopSchedule:
+    def next_after(self, when):
+        raise _Stop
+
+
+@pytest.mark.asyncio
+async def test_startup_pass_skips_series_with_fresh_store(monkeypatch):
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "prefetch_on_startup", True)
+    monkeypatch.setattr(market_data.series_cache, "is_valid", lambda sid: sid == "TGA")
+    refreshed = []
+
+    async def fake_refresh(self, sid):
+        refreshed.append(sid)
+
+    monkeypatch.setattr(Prefetcher, "refresh", fake_refresh)
+
+    p = Prefetcher()
+    for sid in ("TGA", "WALCL"):
+        with pytest.raises(_Stop):
+            await p._series_loop(sid, _StopSchedule())
+    assert refreshed == ["WALCL"]
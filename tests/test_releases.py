@@ -0,0 +1,59 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.services.cache import CSVCache
+from app.services.releases import expires_at, parse_schedule, schedule_for
+from app.settings import settings
+
+
+ET = ZoneInfo("America/New_York")
+
+
+def test_weekly_schedule_next_and_last_release():
+    h41 = schedule_for("WALCL")
+    wed = datetime(2025, 3, 5, 12, 0, tzinfo=ET)
+    assert h41.next_after(wed) == datetime(2025, 3, 6, 16, 30, tzinfo=ET)
+    assert h41.last_before(wed) == datetime(2025, 2, 27, 16, 30, tzinfo=ET)
+    # Exactly at release time: it is the last release, the next is a week later
+    at = datetime(2025, 3, 6, 16, 30, tzinfo=ET)
+    assert h41.last_before(at) == at
+    assert h41.next_after(at) == datetime(2025, 3, 13, 16, 30, tzinfo=ET)
+
+
+def test_business_day_schedule_skips_weekend_and_derived_inherit():
+    dts = parse_schedule({"days": "business", "time": "16:00"})
+    fri_evening = datetime(2025, 3, 7, 18, 0, tzinfo=ET)
+    assert dts.next_after(fri_evening) == datetime(2025, 3, 10, 16, 0, tzinfo=ET)
+    assert schedule_for("UST_REDEMPTIONS_W") == schedule_for("UST_REDEMPTIONS")
+    assert parse_schedule(None) is None
+
+
+def test_weekly_series_valid_until_next_release():
+    fri = datetime(2025, 3, 7, 10, 0, tzinfo=ET).timestamp()
+    assert expires_at("WALCL", fri, 3600) == datetime(2025, 3, 13, 16, 35, tzinfo=ET).timestamp()
+
+
+def test_daily_series_fetched_before_release_expires_at_release():
+    morning = datetime(2025, 3, 5, 10, 0, tzinfo=ET).timestamp()
+    assert expires_at("TGA", morning, 3600) == datetime(2025, 3, 5, 16, 5, tzinfo=ET).timestamp()
+
+
+def test_release_window_and_unscheduled_series_use_ttl(monkeypatch):
+    # Right after a release upstream may lag, so keep polling at the plain TTL
+    just_after = datetime(2025, 3, 6, 16, 40, tzinfo=ET).timestamp()
+    assert expires_at("WALCL", just_after, 3600) == just_after + 3600
+    assert expires_at("NOT_A_SERIES", just_after, 3600) == just_after + 3600
+
+    monkeypatch.setattr(settings, "cache_cadence_aware", False)
+    fri = datetime(2025, 3, 7, 10, 0, tzinfo=ET).timestamp()
+    assert expires_at("WALCL", fri, 3600) == fri + 3600
+
+
+def test_csv_stats_report_next_refresh(tmp_path):
+    l2 = CSVCache(cache_dir=str(tmp_path))
+    l2.write("WALCL", [{"date": "2025-03-05", "value": 1.0}])
+    stats = l2.stats()
+    entry = stats["series"]["WALCL"]
+    assert set(entry) == {"fetched_at", "next_refresh", "fresh"}
+    assert datetime.fromisoformat(entry["next_refresh"]).timestamp() == l2.expires_at("WALCL")
+    assert stats["valid_files"] == 1
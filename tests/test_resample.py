@@ -0,0 +1,37 @@
+from datetime import date
+
+import numpy as np
+
+from app.services import resample
+from app.services.formulas import compile_formula
+from app.services.timeseries import TimeSeries, to_ordinal
+
+
+def test_datetime64_and_ordinals_round_trip():
+    days = np.array(["1970-01-01", "2024-02-29", "2025-06-07"], dtype="datetime64[D]")
+    ordinals = resample.as_ordinals(days)
+    assert ordinals.tolist() == [date(1970, 1, 1).toordinal(), date(2024, 2, 29).toordinal(), date(2025, 6, 7).toordinal()]
+    assert (resample.as_datetime64(ordinals) == days).all()
+    assert resample.month_start(ordinals).tolist() == [to_ordinal(d) for d in ("1970-01-01", "2024-02-01", "2025-06-01")]
+    assert resample.month_end(ordinals).tolist() == [to_ordinal(d) for d in ("1970-01-31", "2024-02-29", "2025-06-30")]
+
+
+def test_bucket_sums_unsorted_columns_together():
+    days = np.array(["2025-06-10", "2025-06-02", "2025-06-07", "2025-06-02"], dtype="datetime64[D]")
+    values = np.array([[8.0, 1.0, 4.0, 2.0], [0.0, 1.0, 0.0, 0.0]])
+    weeks = resample.bucket(days, values, "W")
+    assert weeks.keys.tolist() == [to_ordinal("2025-06-02"), to_ordinal("2025-06-09")]
+    assert weeks.sums.tolist() == [[7.0, 8.0], [1.0, 0.0]]
+    assert weeks.last.tolist() == [to_ordinal("2025-06-07"), to_ordinal("2025-06-10")]
+
+    empty = resample.bucket(np.empty(0, int), np.empty((2, 0)))
+    assert empty.sums.shape == (2, 0)
+
+
+def test_monthly_sum_and_business_day_ffill():
+    ts = TimeSeries.from_pairs([("2025-01-30", 1.0), ("2025-01-31", 2.0), ("2025-02-03", 4.0), ("2025-02-05", 8.0)])
+    assert list(resample.monthly_sum(ts)) == [("2025-01-31", 3.0), ("2025-02-28", 12.0)]
+    assert list(resample.business_ffill(ts)) == [
+        ("2025-01-30", 1.0), ("2025-01-31", 2.0), ("2025-02-03", 4.0), ("2025-02-04", 4.0), ("2025-02-05", 8.0),
+    ]
+    assert list(compile_formula("monthly_sum(bday_ffill(A))").evaluate({"A": ts})) == [("2025-01-31", 3.0), ("2025-02-28", 16.0)]
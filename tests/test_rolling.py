@@ -0,0 +1,84 @@
+import math
+import random
+import statistics
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from app.llm.orchestrator import compute_z_score
+from app.services import market_data, rolling
+from app.services.market_data import SeriesWindow
+from app.services.timeseries import TimeSeries
+from app.stats import compute_z_from_points
+
+
+def test_rolling_stats_match_brute_force():
+    rng = random.Random(7)
+    # A large offset with small moves is where sums of squares lose precision
+    values = [1e9 + rng.choice([rng.uniform(-5, 5), 0.0, 3.0]) for _ in range(300)] + [2.0] * 25
+    stats = rolling.rolling_stats(values, 20)
+    for i in range(1, len(values)):
+        window = values[max(0, i - 19):i + 1]
+        point = stats.at(i)
+        assert point.count == len(window)
+        assert point.mean == pytest.approx(statistics.mean(window), rel=1e-12)
+        assert point.std == pytest.approx(statistics.stdev(window), rel=1e-6, abs=1e-9)
+        assert (point.min, point.max) == (min(window), max(window))
+        assert point.pctrank == 100 * sum(v <= values[i] for v in window) / len(window)
+        if point.std:
+            assert point.z == pytest.approx((values[i] - statistics.mean(window)) / statistics.stdev(window), rel=1e-6, abs=1e-6)
+    # A flat window has std exactly 0 and no z-score
+    assert stats.std[-1] == 0.0 and math.isnan(stats.z[-1])
+    assert math.isnan(stats.mean[0])
+
+
+def test_scalar_helpers_keep_their_edge_cases():
+    assert compute_z_score([1.0] * 19) is None
+    assert compute_z_score([5.0] * 20) == 0.0
+    values = [float(v) for v in range(30)]
+    expected = (29 - statistics.mean(values[-20:])) / statistics.stdev(values[-20:])
+    assert compute_z_score(values) == pytest.approx(expected)
+
+    points = [{"value_numeric": v} for v in values]
+    assert compute_z_from_points(points) == pytest.approx(expected)
+    assert compute_z_from_points(points[:2]) is None
+    assert compute_z_from_points([{"value_numeric": 100.0 + i * 1e-3} for i in range(5)]) is None
+
+
+def test_rolling_series_starts_at_first_full_window():
+    ts = TimeSeries.from_pairs([("2025-01-%02d" % d, float(d % 4)) for d in range(1, 11)])
+    z = rolling.rolling_series(ts, "z", 3)
+    assert z.first_date == "2025-01-03" and len(z) == 8
+    assert list(rolling.rolling_series(ts, "max", 3))[-1] == ("2025-01-10", 2.0)
+
+
+@pytest.mark.parametrize("token", ["z", "z1", "zz20", "median20", "z5000"])
+def test_bad_specs_are_rejected(token):
+    with pytest.raises(ValueError):
+        rolling.parse_specs([token])
+
+
+def test_indicator_endpoint_adds_rolling_series(monkeypatch):
+    series = TimeSeries.from_pairs([("2026-%02d-%02d" % (m, d), float((m * d) % 7)) for m in (8, 9, 10) for d in range(1, 29)])
+
+    leads = set()
+
+    async def fake_load(sid, days=180, lead_days=0):
+        leads.add(lead_days)
+        return SeriesWindow(sid, "test", series.since("2026-10-01"), None, series)
+
+    monkeypatch.setattr(market_data, "load_series", fake_load)
+    client = TestClient(app)
+
+    r = client.get("/live/indicators/net_liq", params={"days": 30, "with": "z20,pctrank5"})
+    assert r.status_code == 200, r.text
+    data = r.json()
+    # The full history behind the window fills the first windows
+    assert [i["date"] for i in data["z20"]] == [i["date"] for i in data["items"]]
+    assert all(0 < i["value"] <= 100 for i in data["pctrank5"])
+    # The inputs are loaded with room for 19 earlier daily points, not their whole history
+    assert leads == {market_data.indicator_lead_days({"net_liq": market_data.INDICATOR_PLANS["net_liq"]}, [20, 5])}
+    assert 19 * 1.5 <= leads.pop() < 60
+
+    assert client.get("/live/indicators/net_liq", params={"with": "median20"}).status_code == 400
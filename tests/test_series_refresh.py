@@ -0,0 +1,353 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import market_data
+from app.services.cache import BinarySeriesCache, CSVCache, DatasetCache, SQLiteSeriesCache, TTLCache
+from app.settings import settings
+
+
+def _day(offset: int) -> str:
+    return (datetime.now() - timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture(params=[CSVCache, BinarySeriesCache, SQLiteSeriesCache], ids=["csv", "binary", "sqlite"])
+def caches(request, tmp_path, monkeypatch):
+    # Plain TTL expiry so results do not depend on the wall clock vs release times
+    monkeypatch.setattr(settings, "cache_cadence_aware", False)
+    l1 = TTLCache(ttl_seconds=3600)
+    l2 = request.param(cache_dir=str(tmp_path), ttl_seconds=3600)
+    monkeypatch.setattr(market_data, "memory_cache", l1)
+    monkeypatch.setattr(market_data, "series_cache", l2)
+    monkeypatch.setattr(market_data, "dataset_cache", DatasetCache(ttl_seconds=3600))
+    return l1, l2
+
+
+def _expire(l2: CSVCache, series_id: str, age_seconds: float = 2 * 86400) -> None:
+    """Age the stored series; by default far past the max staleness so reads refetch synchronously."""
+    l2._set_fetched_at(series_id, time.time() - age_seconds)
+
+
+@pytest.mark.asyncio
+async def test_fred_refresh_requests_only_tail_with_overlap(caches, monkeypatch):
+    _, l2 = caches
+    history = [{"date": _day(d), "value": float(d)} for d in range(400, 10, -1)]
+    l2.write("SOFR", history)
+    _expire(l2, "SOFR")
+
+    calls = []
+
+    async def fake_fetch_series(series_id, observation_start=None, last_n=200, **kwargs):
+        calls.append(observation_start)
+        return {"observations": [{"date": _day(5), "value": "4.33"}, {"date": _day(11), "value": "11"}]}
+
+    monkeypatch.setattr(settings, "fred_api_key", "test")
+    monkeypatch.setattr(market_data.fred, "fetch_series", fake_fetch_series)
+
+    res = await market_data.get_series("SOFR", days=90)
+
+    expected_start = (datetime.strptime(_day(11), "%Y-%m-%d") - timedelta(days=settings.refresh_overlap_days)).strftime("%Y-%m-%d")
+    assert calls == [expected_start]
+    assert res["items"][-1] == {"date": _day(5), "value": 4.33}
+    assert res["items"][0]["date"] >= _day(90)
+    stored = l2.read("SOFR")
+    assert len(stored) == len(history) + 1
+    assert l2.is_valid("SOFR")
+
+
+@pytest.mark.asyncio
+async def test_treasury_refresh_uses_record_date_gt(caches, monkeypatch):
+    _, l2 = caches
+    l2.write("TGA", [{"date": _day(d), "value": 1.0} for d in range(200, 2, -1)])
+    _expire(l2, "TGA")
+
+    seen = {}
+
+    async def fake_fetch_tga(limit=1000, pages=50, start_date=None, tga_only=False, after_date=None):
+        seen.update(start_date=start_date, after_date=after_date)
+        return {"data": [{"record_date": _day(1), "account_type": "Treasury General Account (TGA) Closing Balance", "open_today_bal": "800"}]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_tga_latest", fake_fetch_tga)
+
+    res = await market_data.get_series("TGA", days=30)
+    assert seen == {"start_date": None, "after_date": _day(3)}
+    assert res["items"][-1]["date"] == _day(1)
+    assert res["items"][-1]["value"] == 800.0 * 1e6
+
+
+@pytest.mark.asyncio
+async def test_auction_refresh_picks_up_issues_settling_before_a_future_tail(caches, monkeypatch):
+    _, l2 = caches
+    # The stored tail is the future issue date of an already announced auction
+    l2.write("UST_AUCTION_ISSUES", [{"date": _day(d), "value": 10.0} for d in (90, 60, 20, -5)])
+    _expire(l2, "UST_AUCTION_ISSUES")
+    calls = []
+
+    async def fake_fetch_auctions(limit=1000, pages=50, start_date=None, end_date=None):
+        calls.append(start_date)
+        return {"data": [
+            {"auction_date": _day(25), "issue_date": _day(20), "security_type": "Bill", "offering_amt": "10"},
+            {"auction_date": _day(3), "issue_date": _day(-5), "security_type": "Note", "offering_amt": "10"},
+            # Announced after the last refresh, settles before the stored tail (T+3)
+            {"auction_date": _day(1), "issue_date": _day(-2), "security_type": "Bill", "offering_amt": "7"},
+        ]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_auction_schedules", fake_fetch_auctions)
+
+    res = await market_data.get_series("UST_AUCTION_ISSUES", days=60)
+    assert calls == [_day(55)]
+    assert {"date": _day(-2), "value": 7.0} in res["items"]
+    assert l2.read("UST_AUCTION_ISSUES") == [
+        {"date": _day(d), "value": v} for d, v in ((90, 10.0), (60, 10.0), (20, 10.0), (-2, 7.0), (-5, 10.0))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_refresh_after_release_skips_cached_dataset_parse(caches, monkeypatch):
+    _, l2 = caches
+    l2.write("UST_AUCTION_ISSUES", [{"date": _day(97), "value": 50.0}, {"date": _day(14), "value": 40.0}])
+    _expire(l2, "UST_AUCTION_ISSUES")
+    # Wide parse from before the release (bill share, 180 days), still inside the dataset TTL
+    old = market_data.treasury.parse_auction_rows([
+        {"auction_date": _day(100), "issue_date": _day(97), "security_type": "Bill", "offering_amt": "50"},
+        {"auction_date": _day(17), "issue_date": _day(14), "security_type": "Note", "offering_amt": "40"},
+    ])
+    market_data.dataset_cache.set(market_data.treasury.TREASURY_AUCTIONS_URL, _day(210), old, "auction_date")
+
+    calls = []
+
+    async def fake_fetch_auctions(limit=1000, pages=50, start_date=None, end_date=None):
+        calls.append(start_date)
+        return {"data": [
+            {"auction_date": _day(17), "issue_date": _day(14), "security_type": "Note", "offering_amt": "40"},
+            {"auction_date": _day(3), "issue_date": _day(1), "security_type": "Bill", "offering_amt": "60"},
+        ]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_auction_schedules", fake_fetch_auctions)
+
+    res = await market_data.get_series("UST_AUCTION_ISSUES", days=60)
+    assert calls == [_day(74)]
+    assert res["items"][-1] == {"date": _day(1), "value": 60.0}
+    assert l2.last_date("UST_AUCTION_ISSUES") == _day(1)
+
+    # The narrow refresh was merged into the wide parse: bill share reads it without a download
+    share = await market_data.get_series("UST_BILL_SHARE", days=180)
+    assert len(calls) == 1
+    assert [i["value"] for i in share["items"]] == [100.0, 0.0, 100.0]
+
+
+def test_merge_appends_new_tail_and_rewrites_on_revision(tmp_path):
+    l2 = CSVCache(cache_dir=str(tmp_path))
+    l2.write("X", [{"date": "2025-01-01", "value": 1.0}, {"date": "2025-01-02", "value": 2.0}])
+
+    merged = l2.merge("X", [{"date": "2025-01-02", "value": 2.0}, {"date": "2025-01-03", "value": 3.0}])
+    assert [d for d, _ in merged] == ["2025-01-01", "2025-01-02", "2025-01-03"]
+
+    merged = l2.merge("X", [{"date": "2025-01-02", "value": 2.5}])
+    assert [v for _, v in merged] == [1.0, 2.5, 3.0]
+    assert l2.read("X") == merged.to_items()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_upstream_fetch(caches, monkeypatch):
+    import asyncio
+
+    calls = []
+
+    async def fake_fetch_tga(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return {"data": [{"record_date": _day(1), "account_type": "Federal Reserve Account", "open_today_bal": "1"}]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_tga_latest", fake_fetch_tga)
+    flight = market_data.SingleFlight()
+    monkeypatch.setattr(market_data, "series_flight", flight)
+
+    results = await asyncio.gather(*(market_data.get_series("TGA", days=60) for _ in range(3)))
+    assert len(calls) == 1
+    assert all(r["items"] == results[0]["items"] for r in results)
+    assert flight.stats() == {"upstream_calls": 1, "coalesced_calls": 2, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_narrower_miss_joins_a_wider_fetch_in_flight(caches, monkeypatch):
+    import asyncio
+
+    calls = []
+
+    async def fake_fetch_series(series_id, observation_start=None, last_n=200, **kwargs):
+        calls.append(observation_start)
+        await asyncio.sleep(0.01)
+        return {"observations": [{"date": _day(d), "value": str(d)} for d in range(200, 0, -1)]}
+
+    monkeypatch.setattr(settings, "fred_api_key", "test")
+    monkeypatch.setattr(market_data.fred, "fetch_series", fake_fetch_series)
+    monkeypatch.setattr(market_data, "series_flight", market_data.SingleFlight())
+
+    wide, narrow = await asyncio.gather(market_data.get_series("SOFR", days=180), market_data.get_series("SOFR", days=60))
+    assert len(calls) == 1
+    assert narrow["items"] == [i for i in wide["items"] if i["date"] >= _day(60)]
+    assert narrow["items"][0]["date"] == _day(60)
+
+
+@pytest.mark.asyncio
+async def test_auction_series_share_one_dataset_download(caches, monkeypatch):
+    import asyncio
+
+    calls = []
+
+    async def fake_fetch_auctions(limit=1000, pages=50, start_date=None, end_date=None):
+        calls.append(start_date)
+        await asyncio.sleep(0.01)
+        return {"data": [
+            {"auction_date": _day(10), "issue_date": _day(7), "security_type": "Bill", "offering_amt": "60"},
+            {"auction_date": _day(10), "issue_date": _day(7), "security_type": "Note", "offering_amt": "40"},
+        ]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_auction_schedules", fake_fetch_auctions)
+
+    issues, share = await asyncio.gather(
+        market_data.get_series("UST_AUCTION_ISSUES", days=60),
+        market_data.get_series("UST_BILL_SHARE", days=60),
+    )
+    assert len(calls) == 1
+    assert issues["items"] == [{"date": _day(7), "value": 100.0}]
+    assert [i["value"] for i in share["items"]] == [60.0]
+
+    # A narrower window is served from the cached dataset
+    await market_data.get_series("UST_BILL_SHARE", days=30)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_not_modified_extends_freshness_without_rewrite(caches, monkeypatch):
+    from app.sources.http import NotModified
+
+    _, l2 = caches
+    history = [{"date": _day(d), "value": 1.5} for d in range(400, 1, -1)]
+    l2.write("OFR_LIQ_IDX", history)
+    l2.set_meta("OFR_LIQ_IDX", {"validators": {"etag": '"v1"'}})
+    _expire(l2, "OFR_LIQ_IDX")
+
+    seen = []
+
+    async def fake_fetch(url, validators=None, **kwargs):
+        seen.append(validators)
+        raise NotModified(url)
+
+    monkeypatch.setattr(market_data.ofr, "stream_liquidity_stress_points", fake_fetch)
+
+    res = await market_data.get_series("OFR_LIQ_IDX", days=30)
+    assert seen == [{"etag": '"v1"'}]
+    assert res["items"][-1]["date"] == _day(2)
+    assert l2.is_valid("OFR_LIQ_IDX")
+    assert l2.read("OFR_LIQ_IDX") == history
+
+
+@pytest.mark.asyncio
+async def test_stale_l2_served_immediately_and_refreshed_once(caches, monkeypatch):
+    import asyncio
+
+    _, l2 = caches
+    l2.write("TGA", [{"date": _day(d), "value": 1.0} for d in range(200, 2, -1)])
+    _expire(l2, "TGA", age_seconds=2 * 3600)
+
+    calls = []
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def fake_fetch_tga(**kwargs):
+        calls.append(kwargs)
+        started.set()
+        await release.wait()
+        return {"data": [{"record_date": _day(1), "account_type": "Federal Reserve Account", "open_today_bal": "2"}]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_tga_latest", fake_fetch_tga)
+
+    first = await market_data.get_series("TGA", days=30)
+    second = await market_data.get_series("TGA", days=60)
+    assert first["stale"] is True and second["stale"] is True
+    assert first["items"][-1]["date"] == _day(3)
+
+    await asyncio.wait_for(started.wait(), 1)
+    assert len(calls) == 1
+    release.set()
+    await asyncio.gather(*market_data._refresh_tasks.values())
+
+    fresh = await market_data.get_series("TGA", days=30)
+    assert "stale" not in fresh
+    assert fresh["items"][-1] == {"date": _day(1), "value": 2.0 * 1e6}
+
+
+@pytest.mark.asyncio
+async def test_stale_beyond_max_staleness_fetches_synchronously(caches, monkeypatch):
+    _, l2 = caches
+    l2.write("TGA", [{"date": _day(d), "value": 1.0} for d in range(200, 2, -1)])
+    _expire(l2, "TGA", age_seconds=2 * 3600)
+    monkeypatch.setattr(settings, "cache_max_staleness_seconds", 1800)
+
+    async def fake_fetch_tga(**kwargs):
+        return {"data": [{"record_date": _day(1), "account_type": "Federal Reserve Account", "open_today_bal": "2"}]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_tga_latest", fake_fetch_tga)
+
+    res = await market_data.get_series("TGA", days=30)
+    assert "stale" not in res
+    assert res["items"][-1]["date"] == _day(1)
+    assert not market_data._refresh_tasks
+
+
+@pytest.mark.asyncio
+async def test_windows_are_sliced_from_one_l1_history(caches, monkeypatch):
+    l1, _ = caches
+    calls = []
+
+    async def fake_fetch_series(series_id, observation_start=None, last_n=200, **kwargs):
+        calls.append(observation_start)
+        return {"observations": [{"date": _day(d), "value": str(d)} for d in range(400, 0, -1)]}
+
+    monkeypatch.setattr(settings, "fred_api_key", "test")
+    monkeypatch.setattr(market_data.fred, "fetch_series", fake_fetch_series)
+
+    wide = await market_data.get_series("SOFR", days=365)
+    narrow = await market_data.get_series("SOFR", days=30)
+    assert len(calls) == 1
+    assert narrow["items"] == [i for i in wide["items"] if i["date"] >= _day(30)]
+    assert list(l1._cache) == ["SOFR"]
+
+
+@pytest.mark.asyncio
+async def test_short_history_is_not_refetched_for_the_same_window(caches, monkeypatch):
+    l1, _ = caches
+    calls = []
+
+    async def fake_fetch_tga(**kwargs):
+        calls.append(kwargs)
+        return {"data": [{"record_date": _day(5), "account_type": "Federal Reserve Account", "open_today_bal": "1"}]}
+
+    monkeypatch.setattr(market_data.treasury, "fetch_tga_latest", fake_fetch_tga)
+
+    await market_data.get_series("TGA", days=60)
+    l1.clear()
+    res = await market_data.get_series("TGA", days=60)
+    assert len(calls) == 1
+    assert [i["date"] for i in res["items"]] == [_day(5)]
+
+
+@pytest.mark.asyncio
+async def test_l2_reads_start_at_the_window_plus_the_requested_lead(caches, monkeypatch):
+    l1, l2 = caches
+    l2.write("SOFR", [{"date": _day(d), "value": float(d)} for d in range(900, 0, -1)])
+
+    async def no_fetch(*args, **kwargs):
+        raise AssertionError("fresh L2 data must not be refetched")
+
+    monkeypatch.setattr(market_data.fred, "fetch_series", no_fetch)
+
+    narrow = await market_data.load_series("SOFR", days=30, lead_days=100)
+    assert narrow.series.first_date == _day(30) and narrow.full.first_date == _day(130)
+    assert (await market_data.load_series("SOFR", days=30)).full.first_date == _day(130)
+    # A wider window is not covered by the L1 history, but is by the store
+    wide = await market_data.load_series("SOFR", days=600)
+    assert wide.series.first_date == _day(600) and wide.full.first_date == _day(600)
+    assert l1.get("SOFR").covered_from == _day(600)
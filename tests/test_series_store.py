@@ -0,0 +1,165 @@
+import os
+
+import numpy as np
+
+from app.services.cache import BinarySeriesCache, CSVCache, SQLiteSeriesCache
+
+
+ROWS = [
+    {"date": "2025-01-02", "value": 1.5},
+    {"date": "2025-01-03", "value": 2.0},
+    {"date": "2025-01-06", "value": -0.25},
+]
+
+
+def test_binary_roundtrip_and_windowed_read(tmp_path):
+    store = BinarySeriesCache(cache_dir=str(tmp_path))
+    store.write("x", ROWS)
+
+    assert store.read("X") == ROWS
+    assert store.read("X", start="2025-01-03") == ROWS[1:]
+    assert store.read("X", start="2025-01-04") == ROWS[2:]
+    assert store.read("X", start="2025-02-01") == []
+    assert store.first_date("X") == "2025-01-02"
+
+    dates, values = store.read_arrays("X", start="2025-01-03")
+    assert isinstance(dates, np.memmap) and dates.dtype == np.dtype("<i4")
+    assert values.tolist() == [2.0, -0.25]
+
+
+def test_binary_append_and_merge_revision(tmp_path):
+    store = BinarySeriesCache(cache_dir=str(tmp_path))
+    store.write("X", ROWS[:2])
+
+    merged = store.merge("X", [{"date": "2025-01-03", "value": 2.0}, ROWS[2]])
+    assert merged.to_items() == ROWS
+    assert store.read("X") == ROWS
+
+    store.merge("X", [{"date": "2025-01-02", "value": 9.0}])
+    assert [i["value"] for i in store.read("X")] == [9.0, 2.0, -0.25]
+
+
+def test_missing_or_empty_binary_series(tmp_path):
+    store = BinarySeriesCache(cache_dir=str(tmp_path))
+    assert store.read("NOPE") is None
+    assert store.first_date("NOPE") is None
+    store.write("EMPTY", [])
+    assert store.read("EMPTY") == []
+
+
+def test_migrate_from_csv_keeps_freshness(tmp_path):
+    csv_store = CSVCache(cache_dir=str(tmp_path))
+    csv_store.write("TGA", ROWS)
+    csv_store.set_meta("TGA", {"validators": {"etag": '"a"'}})
+    old = csv_store._get_path("TGA").stat().st_mtime - 100
+    os.utime(csv_store._get_path("TGA"), (old, old))
+
+    store = BinarySeriesCache(cache_dir=str(tmp_path))
+    assert store.migrate_from(csv_store) == 1
+    assert store.read("TGA") == ROWS
+    assert store.get_meta("TGA") == {"validators": {"etag": '"a"'}}
+    assert store._get_path("TGA").stat().st_mtime == old
+    # One-shot: already migrated series are left alone
+    assert store.migrate_from(csv_store) == 0
+
+    assert store.clear() == 1
+    assert store.read("TGA") is None
+    assert csv_store.read("TGA") == ROWS
+
+
+def test_sqlite_range_reads_upserts_and_meta(tmp_path):
+    store = SQLiteSeriesCache(cache_dir=str(tmp_path))
+    assert store._query("PRAGMA journal_mode")[0][0] == "wal"
+    assert store.read("TGA") is None
+
+    store.write("TGA", ROWS)
+    assert store.read("TGA", start="2025-01-03") == ROWS[1:]
+    assert store.first_date("TGA") == "2025-01-02"
+
+    merged = store.merge("TGA", [{"date": "2025-01-03", "value": 5.0}, {"date": "2025-01-07", "value": 1.0}])
+    assert list(merged) == [
+        ("2025-01-02", 1.5), ("2025-01-03", 5.0), ("2025-01-06", -0.25), ("2025-01-07", 1.0),
+    ]
+
+    store.set_meta("TGA", {"validators": {"etag": '"b"'}})
+    assert store.get_meta("TGA") == {"source": "TREASURY_TGA", "validators": {"etag": '"b"'}}
+    assert store.is_valid("TGA")
+
+    # A second connection (e.g. another worker) sees the committed rows
+    other = SQLiteSeriesCache(cache_dir=str(tmp_path))
+    assert other.read("TGA") == merged.to_items()
+    assert other.stats()["series"].keys() == {"TGA"}
+
+    assert store.clear("TGA") == 1
+    assert other.read("TGA") is None
+
+
+def test_sqlite_migrates_csv_once(tmp_path):
+    csv_store = CSVCache(cache_dir=str(tmp_path))
+    csv_store.write("SOFR", ROWS)
+    fetched = csv_store._fetched_at("SOFR")
+
+    store = SQLiteSeriesCache(cache_dir=str(tmp_path))
+    assert store.migrate_from(csv_store) == 1
+    assert store.migrate_from(csv_store) == 0
+    assert store.read("SOFR") == ROWS
+    assert store._fetched_at("SOFR") == fetched
+
+
+def test_csv_append_recovers_from_torn_tail(tmp_path):
+    store = CSVCache(cache_dir=str(tmp_path))
+    store.write("X", ROWS[:2])
+    path = store._get_path("X")
+    with open(path, "ab") as f:
+        f.write(b"2025-01-0")  # interrupted append
+
+    assert store.read("X") == ROWS[:2]
+    assert store.last_date("X") == "2025-01-03"
+    store.merge("X", ROWS[1:])
+    assert store.read("X") == ROWS
+    assert [p.name for p in tmp_path.joinpath("series").iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_merge_rereads_when_another_writer_moved_the_tail(tmp_path):
+    store = CSVCache(cache_dir=str(tmp_path))
+    store.write("X", ROWS[:1])
+    stale_view = store.read_series("X")
+    # Another worker appends in the meantime
+    CSVCache(cache_dir=str(tmp_path)).append("X", ROWS[1:2])
+
+    merged = store.merge("X", ROWS[2:], existing=stale_view)
+    assert merged.to_items() == ROWS
+    assert store.read("X") == ROWS
+
+
+def test_binary_append_drops_torn_record(tmp_path):
+    store = BinarySeriesCache(cache_dir=str(tmp_path))
+    store.write("X", ROWS[:1])
+    with open(store._get_path("X"), "ab") as f:
+        f.write(np.array([7.0], "<f8").tobytes())  # interrupted mid-record
+
+    assert store.read("X") == ROWS[:1]
+    store.append("X", ROWS[1:])
+    assert store.read("X") == ROWS
+
+
+def test_binary_rewrite_replaces_dates_and_values_together(tmp_path):
+    store = BinarySeriesCache(cache_dir=str(tmp_path))
+    store.write("X", ROWS[1:])
+    before = store.read_arrays("X")
+    store.merge("X", ROWS[:1])  # back-fill rewrites the file
+
+    assert sorted(p.name for p in store._cache_dir.iterdir() if not p.name.endswith(".lock")) == ["X.bin"]
+    assert store.read("X") == ROWS
+    # A reader holding the old mapping still sees a consistent old version
+    assert [float(v) for v in before[1]] == [2.0, -0.25] and len(before[0]) == 2
+
+
+def test_rewrite_from_a_windowed_read_keeps_older_points(tmp_path):
+    for store in (CSVCache(cache_dir=str(tmp_path / "csv")), BinarySeriesCache(cache_dir=str(tmp_path / "bin"))):
+        store.write("X", ROWS)
+        window = store.read_series("X", start="2025-01-03")
+
+        merged = store.merge("X", [{"date": "2025-01-03", "value": 5.0}], existing=window)
+        assert [i["value"] for i in merged.to_items()] == [1.5, 5.0, -0.25]
+        assert store.read("X") == [ROWS[0], {"date": "2025-01-03", "value": 5.0}, ROWS[2]]
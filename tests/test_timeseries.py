@@ -0,0 +1,52 @@
+from datetime import date
+
+from app.services.cache import approx_size
+from app.services.market_data import compute_indicator
+from app.services.timeseries import TimeSeries, iso, to_ordinal, week_ending_friday, week_start
+
+
+def test_from_pairs_sorts_and_keeps_last_duplicate():
+    ts = TimeSeries.from_pairs([("2025-01-03", 3.0), ("2025-01-01", 1.0), ("2025-01-03", 4.0)])
+    assert list(ts) == [("2025-01-01", 1.0), ("2025-01-03", 4.0)]
+    assert ts.first_date == "2025-01-01" and ts.last_date == "2025-01-03"
+    assert ts.to_items() == [{"date": "2025-01-01", "value": 1.0}, {"date": "2025-01-03", "value": 4.0}]
+
+
+def test_windows_are_views_and_upsert_prefers_new_values():
+    ts = TimeSeries.from_pairs([("2025-01-01", 1.0), ("2025-01-02", 2.0), ("2025-01-03", 3.0)])
+    window = ts.since("2025-01-02")
+    assert [d for d, _ in window] == ["2025-01-02", "2025-01-03"]
+    assert window.values.base is ts.values
+    assert len(ts.after("2025-01-03")) == 0
+
+    merged = ts.upsert(TimeSeries.from_pairs([("2025-01-02", 9.0), ("2025-01-04", 4.0)]))
+    assert [v for _, v in merged] == [1.0, 9.0, 3.0, 4.0]
+
+
+def test_week_helpers_match_calendar():
+    for day in range(1, 15):  # 2025-06-01 (Sun) .. 2025-06-14 (Sat)
+        d = date(2025, 6, day)
+        monday = week_start(d.toordinal())
+        assert date.fromordinal(monday).isocalendar()[:2] == d.isocalendar()[:2]
+        assert date.fromordinal(monday).weekday() == 0
+        friday = date.fromordinal(week_ending_friday(d.toordinal()))
+        assert friday.weekday() == 4 and 0 <= (friday - d).days < 7
+    assert iso(to_ordinal("2025-06-06")) == "2025-06-06"
+
+
+def test_points_are_compact():
+    ts = TimeSeries.from_pairs((date.fromordinal(739000 + i), float(i)) for i in range(1000))
+    assert ts.nbytes == 12_000
+    assert approx_size(ts) < approx_size(ts.to_items()) / 10
+
+
+def test_compute_indicator_on_timeseries():
+    walcl = TimeSeries.from_pairs([("2025-01-01", 100.0), ("2025-01-08", 110.0)])
+    tga = TimeSeries.from_pairs([("2025-01-01", 10.0), ("2025-01-02", 11.0), ("2025-01-08", 12.0)])
+    rrp = TimeSeries.from_pairs([("2025-01-01", 1.0), ("2025-01-02", 2.0), ("2025-01-08", 3.0)])
+    net = compute_indicator("net_liq", {"formula": "ffill(WALCL) - TGA - RRPONTSYD"}, {"WALCL": walcl, "TGA": tga, "RRPONTSYD": rrp})
+    assert list(net) == [("2025-01-01", 89.0), ("2025-01-02", 87.0), ("2025-01-08", 95.0)]
+
+    sofr = TimeSeries.from_pairs([("2025-01-01", 4.33), ("2025-01-02", 4.31)])
+    iorb = TimeSeries.from_pairs([("2025-01-02", 4.4)])
+    assert list(compute_indicator("sofr_iorb", {"formula": "spread(SOFR, IORB)"}, {"SOFR": sofr, "IORB": iorb})) == [("2025-01-02", -0.09)]
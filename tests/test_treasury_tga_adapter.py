@@ -1,8 +1,9 @@
+import httpx
 import pytest
 import respx
 from httpx import Response
 
-from app.sources.treasury import DTS_TGA_URL, fetch_tga_latest
+from app.sources.treasury import DTS_REDEMPTIONS_URL, DTS_TGA_URL, fetch_redemptions, fetch_tga_latest
 
 
 @pytest.mark.asyncio
@@ -22,3 +23,54 @@ async def test_fetch_tga_latest_paginates_and_stops():
     assert len(data["data"]) == 1
 
 
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_tga_latest_fetches_remaining_pages_from_meta_in_order():
+    requested = []
+
+    def page_response(request):
+        page = int(request.url.params["page[number]"])
+        requested.append(page)
+        rows = [{"record_date": f"2025-08-{20 - page:02d}", "account_type": "Federal Reserve Account"}]
+        return Response(200, json={"data": rows, "meta": {"total-pages": 4, "total-count": 4}})
+
+    respx.get(DTS_TGA_URL).mock(side_effect=page_response)
+
+    data = await fetch_tga_latest(limit=1, pages=10)
+    assert sorted(requested) == [1, 2, 3, 4]
+    assert [r["record_date"] for r in data["data"]] == ["2025-08-19", "2025-08-18", "2025-08-17", "2025-08-16"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_tga_latest_filters_dates_server_side_and_accounts_by_substring():
+    rows = [
+        {"record_date": "2025-01-03", "account_type": "Treasury General Account (TGA) Closing Balance"},
+        {"record_date": "2025-01-03", "account_type": "Treasury General Account (TGA) Opening Balance"},
+        {"record_date": "2025-01-02", "account_type": "Federal Reserve Account (Closing Balance)"},
+        {"record_date": "2025-01-02", "account_type": "Tax and Loan Note Accounts"},
+    ]
+    route = respx.get(DTS_TGA_URL).mock(return_value=Response(200, json={"data": rows}))
+
+    data = await fetch_tga_latest(start_date="2025-01-01", tga_only=True)
+    assert route.calls.last.request.url.params["filter"] == "record_date:gte:2025-01-01"
+    assert [r["account_type"] for r in data["data"]] == [rows[0]["account_type"], rows[2]["account_type"]]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_rejected_first_page_raises_instead_of_returning_no_rows():
+    respx.get(DTS_TGA_URL).mock(return_value=Response(400, json={"error": "Invalid filter"}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch_tga_latest(start_date="2025-01-01")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_redemptions_filters_transaction_type_server_side():
+    route = respx.get(DTS_REDEMPTIONS_URL).mock(return_value=Response(200, json={"data": []}))
+
+    await fetch_redemptions(start_date="2025-06-01")
+    assert route.calls.last.request.url.params["filter"] == "record_date:gte:2025-06-01,transaction_type:eq:Redemptions"
@@ -0,0 +1,60 @@
+import pytest
+import respx
+from httpx import Response
+
+from app.settings import settings
+from app.sources import upstream
+from app.sources.fred import FRED_BASE, fetch_series
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_retries_transient_errors_then_succeeds():
+    route = respx.get(FRED_BASE).mock(side_effect=[
+        Response(503),
+        Response(429),
+        Response(200, json={"observations": []}),
+    ])
+
+    data = await fetch_series("WALCL")
+    assert data == {"observations": []}
+    assert route.call_count == 3
+    stats = upstream.stats()["api.stlouisfed.org"]
+    assert stats["retries"] == 2 and stats["failures"] == 0 and stats["state"] == "closed"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_client_errors_are_not_retried():
+    route = respx.get(FRED_BASE).mock(return_value=Response(400))
+    with pytest.raises(Exception):
+        await fetch_series("WALCL")
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_circuit_breaker_fails_fast_after_repeated_failures(monkeypatch):
+    monkeypatch.setattr(settings, "upstream_max_retries", 0)
+    monkeypatch.setattr(settings, "upstream_breaker_threshold", 2)
+    route = respx.get(FRED_BASE).mock(return_value=Response(502))
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            await fetch_series("WALCL")
+    with pytest.raises(upstream.UpstreamUnavailable):
+        await fetch_series("WALCL")
+    assert route.call_count == 2
+    stats = upstream.stats()["api.stlouisfed.org"]
+    assert stats["state"] == "open" and stats["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_requests(monkeypatch):
+    import time
+
+    bucket = upstream.TokenBucket(rate=50, capacity=1)
+    t0 = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - t0 >= 0.03